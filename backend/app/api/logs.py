@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+from app.core import log
+
+router = APIRouter(prefix="/logs", tags=["logs"])
+
+@router.get("/stats")
+async def get_log_stats():
+    """로그 queue 깊이, drop 수 및 hot path 카테고리별 샘플링 통계"""
+    return log.get_stats()
+
+@router.post("/capture")
+async def set_log_capture(category: str, enabled: bool = True, sample_every: Optional[int] = None,
+                          max_per_sec: Optional[float] = None):
+    """hot path 로그 카테고리(ws_raw/tick/chart) 디버그 캡처 런타임 전환"""
+    target = log.CATEGORIES.get(category)
+    if target is None:
+        raise HTTPException(status_code=400, detail=f"unknown log category: {category}")
+    if sample_every is not None and sample_every < 1:
+        raise HTTPException(status_code=400, detail="sample_every must be >= 1")
+    if max_per_sec is not None and max_per_sec <= 0:
+        raise HTTPException(status_code=400, detail="max_per_sec must be > 0")
+    target.configure(enabled, sample_every, max_per_sec)
+    return target.get_stats()
+
+@router.post("/level")
+async def set_log_level(level: str):
+    """root 로그 레벨 런타임 변경 (DEBUG/INFO/WARNING/ERROR)"""
+    if level.upper() not in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"):
+        raise HTTPException(status_code=400, detail=f"unknown log level: {level}")
+    log.set_level(level)
+    return log.get_stats()
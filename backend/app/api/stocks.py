@@ -1,20 +1,67 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from app.services.kiwoom_client import kiwoom_client
-from app.services.stock_master import search_stocks, get_all_stock_names
-from typing import Any, Dict, List
+from app.services.market import market
+from app.services.stock_master import search_stocks, get_names_payload
+from app.core.rate_limiter import kiwoom_scheduler
+from typing import Any, Dict, List, Optional
 
 router = APIRouter(prefix="/stocks", tags=["stocks"])
 
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 비교 (weak 비교: W/ 접두 무시, 목록/와일드카드 지원)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
 @router.get("/names")
-async def get_stock_names():
-    """전체 종목 코드→이름 매핑 반환"""
-    return get_all_stock_names()
+async def get_stock_names(request: Request, v: Optional[str] = None):
+    """전체 종목 코드→이름 매핑 반환
+    [Decision] 마스터 버전당 1회 직렬화/압축한 payload를 그대로 전송. ETag 일치 시 304(본문 없음).
+    ?v=<내용 해시(X-Master-Version)>로 요청하면 불변 URL로 간주해 장기 캐시 허용.
+    [Fix] 버전은 프로세스별 카운터가 아닌 내용 해시 → 재시작/worker 간에도 같은 URL은 항상 같은 내용."""
+    payload = get_names_payload()
+    headers = {
+        "ETag": payload.etag,
+        "X-Master-Version": payload.digest,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "public, max-age=31536000, immutable" if v == payload.digest else "no-cache",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), payload.etag):
+        return Response(status_code=304, headers=headers)
+
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=payload.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=payload.body, media_type="application/json", headers=headers)
 
 @router.get("/search")
 async def search_stock_list(q: str = Query(..., min_length=1)):
     """종목 코드 또는 이름으로 검색"""
     return search_stocks(q)
 
+@router.get("/quotes")
+async def get_quotes(symbols: str = Query(..., min_length=1)):
+    """여러 종목의 당일 최신 시세 일괄 조회 (?symbols=005930,000660). 당일 체결이 없는 종목은 결과에서 제외"""
+    codes = [s.strip() for s in symbols.split(",") if s.strip()]
+    if len(codes) > 500:
+        raise HTTPException(status_code=400, detail="too many symbols (max 500)")
+    return await market.get_quotes(codes)
+
+@router.get("/cache/stats")
+async def get_chart_cache_stats():
+    """차트 스냅샷 캐시 hit/miss/coalesced 통계"""
+    return kiwoom_client.get_chart_cache_stats()
+
+@router.get("/scheduler/stats")
+async def get_scheduler_stats():
+    """키움 REST 스케줄러 우선순위별 대기 시간 통계"""
+    return kiwoom_scheduler.get_stats()
+
 @router.get("/{symbol}/chart")
 async def get_chart_data(symbol: str, timeframe: str = "D"):
     """특정 종목의 차트 데이터를 조회합니다. (실시간 구독은 WS에서 처리)"""
@@ -1,40 +1,461 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Set, Deque, Optional, Callable, Union
+from collections import deque
+import asyncio
 import json
 import logging
+import time
+from app.core import json_codec
+from app.core.chart_codec import (
+    CHART_FORMAT_JSON, CHART_FORMAT_COLUMNAR, CHART_FORMAT_BINARY, CHART_FORMATS,
+    encode_columnar, encode_binary,
+)
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# 송신 큐 overflow 정책
+OVERFLOW_DROP_OLDEST = "drop_oldest"   # 가장 오래된 프레임 폐기
+OVERFLOW_CONFLATE = "conflate"         # 종목별 최신 값만 유지 (대기 중인 동일 종목 프레임 교체)
+OVERFLOW_DISCONNECT = "disconnect"     # 큐가 가득 차면 클라이언트 연결 종료
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_CONFLATE, OVERFLOW_DISCONNECT)
+
+
+class ClientSession:
+    """클라이언트별 bounded 송신 큐 + 전용 writer task.
+    느린 클라이언트의 전송 지연이 다른 클라이언트나 키움 수신 루프로 전파되지 않도록 격리."""
+    def __init__(self, websocket: WebSocket, max_queue: int, policy: str,
+                 on_error: Callable[[WebSocket], None], delta_refresh_sec: float = 30.0):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.policy = policy
+        self._on_error = on_error
+        # entry = [key, frame, droppable, live] — conflate 시 frame을 제자리 교체하기 위해 list 사용
+        # 폐기된 entry는 live=False로 표시만 하고 writer가 건너뜀 (deque 중간 삭제 O(n) 회피)
+        self._queue: Deque[list] = deque()
+        # 아직 전송되지 않은 droppable entry (적재 순서) → 가장 오래된 droppable 프레임을 O(1)로 폐기
+        self._droppable: Deque[list] = deque()
+        self._size = 0
+        self._pending_by_key: Dict[str, list] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+        # hello 메시지로 협상한 차트 스냅샷 포맷
+        self.chart_format = CHART_FORMAT_JSON
+        # [Decision] delta tick (hello로 opt-in): 종목별 마지막으로 "실제 전송한" 상태 [fields, full_sent_at]
+        # delta는 writer가 전송 직전에 계산 → 큐에서 conflate/drop된 tick이 있어도 클라이언트 상태와 어긋나지 않음
+        self.tick_delta = False
+        self.delta_refresh_sec = delta_refresh_sec
+        self._tick_state: Dict[str, list] = {}
+        # 모니터링 카운터
+        self.sent = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.max_depth = 0
+        self.full_ticks = 0
+        self.delta_ticks = 0
+
+    def start(self):
+        self._task = asyncio.create_task(self._writer())
+
+    def stop(self):
+        self.closed = True
+        if self._task and self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    @property
+    def depth(self) -> int:
+        return self._size
+
+    def enqueue(self, frame: Union[str, bytes, dict], key: Optional[str] = None, droppable: bool = True) -> bool:
+        """프레임을 송신 큐에 적재. 큐가 가득 찼는데 disconnect 정책이거나 폐기할 droppable 프레임이 없으면 False 반환."""
+        if self.closed:
+            return True
+
+        # [Decision] conflate: 아직 전송되지 않은 동일 종목 프레임이 있으면 최신 값으로 교체 (큐 길이 불변)
+        if key is not None and self.policy == OVERFLOW_CONFLATE:
+            entry = self._pending_by_key.get(key)
+            if entry is not None:
+                entry[1] = frame
+                self.conflated += 1
+                return True
+
+        if self._size >= self.max_queue:
+            # [Fix] 폐기할 droppable 프레임이 없으면(차트/chartChunk만 가득) 큐를 늘리지 않고 disconnect 정책과 동일하게 처리
+            if self.policy == OVERFLOW_DISCONNECT or not self._drop_oldest():
+                return False
+
+        entry = [key, frame, droppable, True]
+        self._queue.append(entry)
+        self._size += 1
+        if droppable:
+            self._droppable.append(entry)
+        if key is not None and self.policy == OVERFLOW_CONFLATE:
+            self._pending_by_key[key] = entry
+        if self._size > self.max_depth:
+            self.max_depth = self._size
+        self._wakeup.set()
+        return True
+
+    def _drop_oldest(self) -> bool:
+        """가장 오래된 droppable 프레임 폐기 (차트 스냅샷 등 non-droppable 프레임은 보존). 폐기할 프레임이 없으면 False"""
+        while self._droppable:
+            entry = self._droppable.popleft()
+            if not entry[3]:
+                continue
+            entry[3] = False
+            self._size -= 1
+            self._forget(entry)
+            self.dropped += 1
+            # 폐기 표시된 entry가 쌓이면 한 번에 정리 (적재 횟수 대비 amortized O(1))
+            if len(self._queue) > 2 * self.max_queue:
+                self._queue = deque(e for e in self._queue if e[3])
+            return True
+        return False
+
+    def _forget(self, entry: list):
+        key = entry[0]
+        if key is not None and self._pending_by_key.get(key) is entry:
+            del self._pending_by_key[key]
+
+    def forget_tick_state(self, symbol: Optional[str] = None):
+        """delta 기준 상태 삭제 (symbol 미지정 시 전체) → 해당 종목의 다음 tick은 전체 전송"""
+        if symbol is None:
+            self._tick_state.clear()
+        else:
+            self._tick_state.pop(symbol, None)
+
+    def _encode_tick(self, tick: dict) -> Optional[str]:
+        """delta 클라이언트용 tick 인코딩: 최초/주기적 전체 tick, 그 외에는 변경 필드만. 변경 없으면 None."""
+        symbol = tick["symbol"]
+        now = time.monotonic()
+        state = self._tick_state.get(symbol)
+        if state is None or now - state[1] >= self.delta_refresh_sec:
+            # tick dict는 다른 클라이언트와 공유되므로 복사본을 기준 상태로 보관
+            self._tick_state[symbol] = [dict(tick), now]
+            self.full_ticks += 1
+            return json_codec.dumps({"type": "tick", "data": tick})
+
+        last = state[0]
+        changed = {k: v for k, v in tick.items() if last.get(k) != v}
+        if not changed:
+            return None
+        last.update(changed)
+        self.delta_ticks += 1
+        return json_codec.dumps({"type": "tickDelta", "symbol": symbol, "data": changed})
+
+    async def _writer(self):
+        try:
+            while True:
+                while not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                entry = self._queue.popleft()
+                if not entry[3]:
+                    continue
+                entry[3] = False
+                self._size -= 1
+                if entry[2]:
+                    # writer는 적재 순서대로 전송하므로 전송한 droppable entry는 _droppable의 맨 앞
+                    while self._droppable and not self._droppable[0][3]:
+                        self._droppable.popleft()
+                self._forget(entry)
+                frame = entry[1]
+                if isinstance(frame, dict):
+                    frame = self._encode_tick(frame)
+                    if frame is None:
+                        continue
+                if isinstance(frame, bytes):
+                    await self.websocket.send_bytes(frame)
+                else:
+                    await self.websocket.send_text(frame)
+                self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending to client: {str(e)}")
+            self._on_error(self.websocket)
+
+    def get_stats(self) -> Dict[str, Any]:
+        client = getattr(self.websocket, "client", None)
+        return {
+            "client": f"{client.host}:{client.port}" if client else None,
+            "policy": self.policy,
+            "chart_format": self.chart_format,
+            "tick_delta": self.tick_delta,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "conflated": self.conflated,
+            "full_ticks": self.full_ticks,
+            "delta_ticks": self.delta_ticks,
+        }
+
+
 class ConnectionManager:
     """WebSocket 연결 관리 및 메시지 브로드캐스트"""
-    def __init__(self):
+    def __init__(self, max_queue: Optional[int] = None, overflow_policy: Optional[str] = None):
         # 활성 연결 목록
         self.active_connections: List[WebSocket] = []
+        # [Decision] 종목별 라우팅 인덱스: tick은 해당 종목을 구독한 클라이언트에게만 전송
+        # symbol → clients / client → symbols 양방향으로 유지해 해제·연결 종료 시 O(구독 수)로 정리
+        self.symbol_clients: Dict[str, Set[WebSocket]] = {}
+        self.client_symbols: Dict[WebSocket, Set[str]] = {}
+        # [Decision] 호가(depth)는 opt-in 종목별 별도 라우팅 인덱스 (체결 구독과 독립)
+        self.depth_clients: Dict[str, Set[WebSocket]] = {}
+        self.client_depth: Dict[WebSocket, Set[str]] = {}
+        # 전 종목 순위(movers) 구독 클라이언트
+        self.scanner_clients: Set[WebSocket] = set()
+        # [Decision] 클라이언트별 송신 큐/writer task: 브로드캐스트는 큐 적재만 하고 즉시 반환
+        self.sessions: Dict[WebSocket, ClientSession] = {}
+        self.max_queue = max_queue or settings.WS_CLIENT_QUEUE_SIZE
+        self.overflow_policy = overflow_policy or settings.WS_OVERFLOW_POLICY
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            logger.warning(f"알 수 없는 overflow 정책 '{self.overflow_policy}' → '{OVERFLOW_CONFLATE}' 사용")
+            self.overflow_policy = OVERFLOW_CONFLATE
+        self.evicted = 0
+        # 연결 종료(정상 종료/overflow 강제 종료 모두) 시 (websocket, 체결 구독 종목, 호가 구독 종목, 순위 구독 여부)로 호출
+        # → 실시간 구독 참조 반환이 종료 경로와 무관하게 1회 수행됨
+        self.release_hooks: List[Callable[[WebSocket, Set[str], Set[str], bool], None]] = []
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
         self.active_connections.append(websocket)
+        self.client_symbols[websocket] = set()
+        session = ClientSession(websocket, self.max_queue, self.overflow_policy, self.disconnect,
+                                settings.WS_TICK_DELTA_REFRESH_SEC)
+        self.sessions[websocket] = session
+        session.start()
         logger.info(f"New client connected. Total clients: {len(self.active_connections)}")
 
     def disconnect(self, websocket: WebSocket):
+        session = self.sessions.pop(websocket, None)
+        if session is not None:
+            session.stop()
+        # 연결 종료 시 해당 클라이언트의 모든 구독을 인덱스에서 제거
+        symbols = self.client_symbols.pop(websocket, set())
+        for symbol in symbols:
+            self._discard_symbol_client(symbol, websocket)
+        depth_symbols = self.client_depth.pop(websocket, set())
+        for symbol in depth_symbols:
+            self._discard_depth_client(symbol, websocket)
+        scanner = websocket in self.scanner_clients
+        self.scanner_clients.discard(websocket)
+        if symbols or depth_symbols or scanner:
+            for hook in self.release_hooks:
+                hook(websocket, symbols, depth_symbols, scanner)
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
             logger.info(f"Client disconnected. Total clients: {len(self.active_connections)}")
 
+    def subscribe(self, websocket: WebSocket, symbol: str) -> bool:
+        """클라이언트의 종목 구독을 라우팅 인덱스에 등록. 새로 추가된 구독이면 True"""
+        symbols = self.client_symbols.setdefault(websocket, set())
+        if symbol in symbols:
+            return False
+        symbols.add(symbol)
+        self.symbol_clients.setdefault(symbol, set()).add(websocket)
+        return True
+
+    def unsubscribe(self, websocket: WebSocket, symbol: str) -> bool:
+        """클라이언트의 종목 구독을 라우팅 인덱스에서 해제. 구독 중이던 종목이면 True"""
+        symbols = self.client_symbols.get(websocket)
+        subscribed = symbols is not None and symbol in symbols
+        if symbols is not None:
+            symbols.discard(symbol)
+        session = self.sessions.get(websocket)
+        if session is not None:
+            session.forget_tick_state(symbol)
+        self._discard_symbol_client(symbol, websocket)
+        return subscribed
+
+    def _discard_symbol_client(self, symbol: str, websocket: WebSocket):
+        clients = self.symbol_clients.get(symbol)
+        if clients is None:
+            return
+        clients.discard(websocket)
+        if not clients:
+            # 구독자가 없는 종목은 인덱스에서 삭제해 메모리가 관심 종목 수에 비례하도록 유지
+            del self.symbol_clients[symbol]
+
+    def get_subscribers(self, symbol: str) -> Set[WebSocket]:
+        return self.symbol_clients.get(symbol, set())
+
+    def subscribe_depth(self, websocket: WebSocket, symbol: str) -> bool:
+        """클라이언트의 호가 opt-in 등록. 새로 추가된 구독이면 True"""
+        if websocket not in self.sessions:
+            return False
+        symbols = self.client_depth.setdefault(websocket, set())
+        if symbol in symbols:
+            return False
+        symbols.add(symbol)
+        self.depth_clients.setdefault(symbol, set()).add(websocket)
+        return True
+
+    def unsubscribe_depth(self, websocket: WebSocket, symbol: str) -> bool:
+        """클라이언트의 호가 opt-in 해제. 구독 중이던 종목이면 True"""
+        symbols = self.client_depth.get(websocket)
+        if symbols is None or symbol not in symbols:
+            return False
+        symbols.discard(symbol)
+        self._discard_depth_client(symbol, websocket)
+        return True
+
+    def _discard_depth_client(self, symbol: str, websocket: WebSocket):
+        clients = self.depth_clients.get(symbol)
+        if clients is None:
+            return
+        clients.discard(websocket)
+        if not clients:
+            del self.depth_clients[symbol]
+
+    def subscribe_scanner(self, websocket: WebSocket) -> bool:
+        """클라이언트의 순위(movers) 구독 등록. 새로 추가된 구독이면 True"""
+        if websocket not in self.sessions or websocket in self.scanner_clients:
+            return False
+        self.scanner_clients.add(websocket)
+        return True
+
+    def unsubscribe_scanner(self, websocket: WebSocket) -> bool:
+        """클라이언트의 순위 구독 해제. 구독 중이었으면 True"""
+        if websocket not in self.scanner_clients:
+            return False
+        self.scanner_clients.discard(websocket)
+        return True
+
     async def send_personal_message(self, message: dict, websocket: WebSocket):
-        await websocket.send_json(message)
+        """단일 클라이언트 전송. 차트 스냅샷 등 유실되면 안 되는 메시지는 drop 대상에서 제외."""
+        session = self.sessions.get(websocket)
+        if session is None:
+            await websocket.send_json(message)
+            return
+        if not session.enqueue(json_codec.dumps(message), droppable=False):
+            self._evict(websocket)
+
+    def set_chart_format(self, websocket: WebSocket, chart_format: str) -> str:
+        """클라이언트의 차트 스냅샷 포맷 협상. 지원하지 않는 포맷은 json으로 응답."""
+        session = self.sessions.get(websocket)
+        if chart_format not in CHART_FORMATS or session is None:
+            chart_format = CHART_FORMAT_JSON
+        if session is not None:
+            session.chart_format = chart_format
+        return chart_format
+
+    def set_tick_delta(self, websocket: WebSocket, enabled: bool) -> bool:
+        """클라이언트의 delta tick 사용 여부 협상 (전환 시 기준 상태 초기화 → 다음 tick은 전체 전송)"""
+        session = self.sessions.get(websocket)
+        if session is None:
+            return False
+        session.tick_delta = bool(enabled)
+        session.forget_tick_state()
+        return session.tick_delta
+
+    async def send_chart(self, message: dict, websocket: WebSocket):
+        """chart/chartChunk 메시지를 클라이언트가 협상한 포맷으로 인코딩해 전송 (미협상 클라이언트는 기존 JSON)"""
+        session = self.sessions.get(websocket)
+        chart_format = session.chart_format if session is not None else CHART_FORMAT_JSON
+        if chart_format == CHART_FORMAT_BINARY:
+            if not session.enqueue(encode_binary(message), droppable=False):
+                self._evict(websocket)
+            return
+        if chart_format == CHART_FORMAT_COLUMNAR:
+            message = encode_columnar(message)
+        await self.send_personal_message(message, websocket)
+
+    def send_tick(self, websocket: WebSocket, tick: dict):
+        """단일 클라이언트에 tick 전송 (broadcast와 동일하게 delta 상태/종목별 conflate 적용)"""
+        session = self.sessions.get(websocket)
+        if session is None:
+            return
+        payload = tick if session.tick_delta else json_codec.dumps({"type": "tick", "data": tick})
+        if not session.enqueue(payload, key=tick["symbol"]):
+            self._evict(websocket)
 
     async def broadcast(self, message: dict):
         """모든 클라이언트에게 메시지 전송 (멀티플렉싱 데이터)"""
         if not self.active_connections:
             return
 
-        # 연결이 끊긴 소켓을 처리하기 위한 복사본 사용
-        for connection in self.active_connections[:]:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting to client: {str(e)}")
-                self.disconnect(connection)
+        # [Decision] 메시지를 1회만 직렬화하고 동일한 텍스트 프레임을 모든 클라이언트에 전송
+        self._send_frame(self.active_connections[:], json_codec.dumps(message))
+
+    async def broadcast_to_symbol(self, symbol: str, message: dict):
+        """해당 종목을 구독 중인 클라이언트에게만 메시지 전송"""
+        clients = self.symbol_clients.get(symbol)
+        if not clients:
+            return
+
+        # delta tick 클라이언트에는 tick dict를 그대로 적재 (writer가 전송 직전 변경 필드만 인코딩)
+        delta_payload = message["data"] if message.get("type") == "tick" else None
+        frame = None
+        # 전송 중 disconnect로 인덱스가 변경될 수 있으므로 복사본 사용
+        for connection in list(clients):
+            session = self.sessions.get(connection)
+            if session is None:
+                continue
+            if delta_payload is not None and session.tick_delta:
+                payload = delta_payload
+            else:
+                if frame is None:
+                    frame = json_codec.dumps(message)
+                payload = frame
+            if not session.enqueue(payload, key=symbol):
+                self._evict(connection)
+
+    def broadcast_depth(self, symbol: str, message: dict):
+        """호가 스냅샷을 opt-in 클라이언트에 전송 (1회 직렬화, 송신 큐에서 종목별 최신 호가로 conflate)"""
+        clients = self.depth_clients.get(symbol)
+        if not clients:
+            return
+        self._send_frame(list(clients), json_codec.dumps(message), key=f"depth:{symbol}")
+
+    def broadcast_scanner(self, message: dict):
+        """순위 메시지를 구독 클라이언트에 전송 (1회 직렬화, 송신 큐에서 최신 순위로 conflate)"""
+        if self.scanner_clients:
+            self._send_frame(list(self.scanner_clients), json_codec.dumps(message), key="movers")
+
+    def broadcast_to(self, connections: List[WebSocket], message: dict, key: Optional[str] = None,
+                     droppable: bool = True):
+        """지정한 클라이언트들에 메시지 전송 (1회 직렬화, key 지정 시 송신 큐에서 최신 값으로 conflate)"""
+        if connections:
+            self._send_frame(list(connections), json_codec.dumps(message), key=key, droppable=droppable)
+
+    def _send_frame(self, connections: List[WebSocket], frame: str, key: Optional[str] = None,
+                    droppable: bool = True):
+        """사전 직렬화된 프레임을 대상 클라이언트들의 송신 큐에 적재 (네트워크 대기 없음)"""
+        for connection in connections:
+            session = self.sessions.get(connection)
+            if session is None:
+                continue
+            if not session.enqueue(frame, key=key, droppable=droppable):
+                self._evict(connection)
+
+    def _evict(self, websocket: WebSocket):
+        """disconnect 정책 (또는 폐기할 droppable 프레임이 없는 overflow): 큐가 넘친 느린 클라이언트 연결 종료"""
+        self.evicted += 1
+        logger.warning("송신 큐 overflow → 느린 클라이언트 연결 종료")
+        self.disconnect(websocket)
+        asyncio.create_task(self._close_quietly(websocket))
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket):
+        try:
+            # 1013 = Try Again Later
+            await websocket.close(code=1013)
+        except Exception:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """클라이언트별 송신 큐 깊이 및 drop/conflate 카운터"""
+        return {
+            "clients": len(self.active_connections),
+            "policy": self.overflow_policy,
+            "max_queue": self.max_queue,
+            "evicted": self.evicted,
+            "depth_symbols": len(self.depth_clients),
+            "scanner_clients": len(self.scanner_clients),
+            "sessions": [s.get_stats() for s in self.sessions.values()],
+        }
 
 ws_manager = ConnectionManager()
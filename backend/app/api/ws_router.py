@@ -1,6 +1,17 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
+from typing import Optional
 from app.api.websocket import ws_manager
 from app.services.kiwoom_client import kiwoom_client
+from app.services.streamer import multiplexer
+from app.services.candle_builder import candle_builder
+from app.services.bus import bus_server, remote_market
+from app.services.market import market
+from app.services.quote_store import quote_store
+from app.services.order_book import order_book_store
+from app.services.indicators import indicator_engine
+from app.services.scanner import market_scanner
+from app.core.chart_codec import time_to_dt
+from app.core.log import chart_log
 import json
 import logging
 import asyncio
@@ -8,30 +19,144 @@ import asyncio
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# [Fix] 동시 차트 API 요청을 최대 3개로 제한 → 429 Rate Limit 방지
-_chart_semaphore = asyncio.Semaphore(3)
+async def _send_quote(websocket: WebSocket, symbol: str):
+    """[Decision] 당일 최신 시세를 차트 직후 tick으로 전송 → 체결이 드문 종목도 다음 체결을 기다리지 않고 현재가 표시.
+    차트 뒤에 보내야 프론트가 차트 마지막 봉에 반영 (차트 전에는 tick을 무시)"""
+    quote = (await market.get_quotes([symbol])).get(symbol)
+    if quote is not None:
+        ws_manager.send_tick(websocket, quote)
 
 
 async def _send_chart(websocket: WebSocket, symbol: str, timeframe: str):
-    """차트 데이터를 Semaphore로 제한하며 백그라운드에서 조회 후 전송.
+    """차트 데이터를 백그라운드에서 조회 후 전송 (캐시 miss만 REST 스케줄러 경유).
     WS 수신 루프를 블록하지 않아 16개 subscribe를 즉시 받을 수 있음."""
-    async with _chart_semaphore:
-        chart_data = await kiwoom_client.get_stock_chart(symbol, timeframe)
+    # [Decision] 구독 중인 종목의 실시간 봉이 있으면 REST 호출 없이 메모리에서 즉시 응답
+    chart_data = candle_builder.get_snapshot(symbol, timeframe)
+    if chart_data is None:
+        # [Decision] 캐시 miss면 로컬 저장소 데이터를 먼저 전송해 즉시 렌더 → 증분 backfill 후 최신본 재전송
+        if not market.is_chart_cached(symbol, timeframe):
+            stored = await market.get_stored_chart(symbol, timeframe)
+            if stored:
+                await ws_manager.send_chart({
+                    "type": "chart",
+                    "symbol": symbol,
+                    "timeframe": timeframe,
+                    "data": stored
+                }, websocket)
+                await _send_quote(websocket, symbol)
+        chart_data = await market.get_stock_chart(symbol, timeframe)
+        if ws_manager.get_subscribers(symbol):
+            candle_builder.seed(symbol, timeframe, chart_data.get("output", []))
     try:
-        await websocket.send_json({
+        # 클라이언트 송신 큐 경유 (writer task가 순서대로 전송, 협상된 포맷으로 인코딩)
+        await ws_manager.send_chart({
             "type": "chart",
             "symbol": symbol,
+            "timeframe": timeframe,
             "data": chart_data
-        })
-        rows = len(chart_data.get('output', []))
-        logger.info(f"차트 전송 완료: {symbol} (tf={timeframe}, rows={rows})")
+        }, websocket)
+        await _send_quote(websocket, symbol)
+        if chart_log.allow():
+            logger.info("차트 전송 완료", extra=chart_log.fields(
+                symbol=symbol, tf=timeframe, rows=len(chart_data.get('output', []))))
     except Exception as e:
         logger.error(f"차트 전송 실패: {symbol} - {e}")
 
 
+def _history_before(value, timeframe: str) -> Optional[str]:
+    """requestHistory의 before(클라이언트가 가진 가장 오래된 봉: 차트 time(초) 또는 dt 문자열) → dt"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)) and value > 0:
+        return time_to_dt(int(value), timeframe)
+    if isinstance(value, str) and value.isdigit() and len(value) in (8, 12, 14):
+        return value
+    return None
+
+
+async def _stream_history(websocket: WebSocket, symbol: str, timeframe: str, max_bars: int,
+                          before: Optional[str] = None):
+    """[Decision] 과거 차트를 페이지 도착 즉시 chartChunk로 전송 → 첫 페이지는 바로 렌더, 이후 페이지는 점진 보강.
+    before가 있으면 그 이전 구간만 전송 (저장소에 있는 구간은 REST 없이)"""
+    page = 0
+    try:
+        async for rows, has_more in market.stream_chart_history(symbol, timeframe, max_bars, before):
+            await ws_manager.send_chart({
+                "type": "chartChunk",
+                "symbol": symbol,
+                "timeframe": timeframe,
+                "page": page,
+                "done": not has_more,
+                "data": {"output": rows}
+            }, websocket)
+            page += 1
+        logger.info(f"과거 차트 전송 완료: {symbol} (tf={timeframe}, pages={page})")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"과거 차트 전송 실패: {symbol} - {e}")
+
+
+def _release_depth(symbols):
+    """클라이언트가 해제한 종목의 호가 구독 참조 반환"""
+    for symbol in symbols:
+        market.release_depth(symbol)
+
+
+def _release_symbols(symbols):
+    """클라이언트가 해제한 종목의 실시간 구독 참조 반환 + 구독자가 남지 않은 종목의 서버 측 실시간 봉 해제"""
+    for symbol in symbols:
+        market.release_symbol(symbol)
+        if not ws_manager.get_subscribers(symbol):
+            candle_builder.drop(symbol)
+
+
+def _on_client_released(websocket: WebSocket, symbols, depth_symbols, scanner):
+    indicator_engine.release(websocket)
+    _release_symbols(symbols)
+    _release_depth(depth_symbols)
+    if scanner:
+        market.release_scanner()
+
+
+# 연결 종료 경로(수신 루프 종료/송신 큐 overflow 강제 종료)와 무관하게 구독 참조 반환
+ws_manager.release_hooks.append(_on_client_released)
+
+
+@router.get("/ws/stats")
+async def websocket_stats():
+    """클라이언트별 송신 큐 깊이, drop 카운터 및 tick conflation 통계 조회"""
+    return {
+        "fanout": ws_manager.get_stats(),
+        "multiplexer": multiplexer.get_stats(),
+        "candles": candle_builder.get_stats(),
+        "subscriptions": market.get_subscription_stats(),
+        "quotes": quote_store.get_stats(),
+        "order_books": order_book_store.get_stats(),
+        "indicators": indicator_engine.get_stats(),
+        "scanner": market_scanner.get_stats(),
+        "ingest": kiwoom_client.ingest.get_stats(),
+        "bus": remote_market.get_stats() if market is remote_market else bus_server.get_stats(),
+    }
+
+
+@router.post("/ws/tick-mode")
+async def set_tick_mode(mode: str, flush_hz: Optional[float] = None):
+    """tick 전송 모드(raw/conflated) 및 flush 주기 런타임 전환"""
+    if flush_hz is not None and not (0 < flush_hz <= 100):
+        raise HTTPException(status_code=400, detail="flush_hz must be in (0, 100]")
+    try:
+        multiplexer.set_mode(mode, flush_hz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return multiplexer.get_stats()
+
+
 @router.websocket("/ws/stocks")
 async def websocket_endpoint(websocket: WebSocket):
     await ws_manager.connect(websocket)
+    # 종목별 진행 중인 과거 차트 스트리밍 task (재요청/해제/연결 종료 시 취소)
+    history_tasks = {}
     try:
         while True:
             data = await websocket.receive_text()
@@ -39,19 +164,28 @@ async def websocket_endpoint(websocket: WebSocket):
                 msg = json.loads(data)
                 msg_type = msg.get("type", "")
 
+                # [Decision] hello: 차트 스냅샷 wire 포맷(json/columnar/binary) 및 delta tick 협상, 미전송 클라이언트는 기존 포맷 유지
+                if msg_type == "hello":
+                    chart_format = ws_manager.set_chart_format(websocket, msg.get("chartFormat", "json"))
+                    tick_delta = ws_manager.set_tick_delta(websocket, msg.get("tickDelta") is True)
+                    await ws_manager.send_personal_message(
+                        {"type": "hello", "chartFormat": chart_format, "tickDelta": tick_delta}, websocket)
+
                 # [Decision] subscribe: ① 차트 스냅샷 전송(background) → ② 실시간 REG 등록
-                if msg_type == "subscribe":
+                elif msg_type == "subscribe":
                     symbol = msg.get("symbol", "")
                     timeframe = msg.get("timeframe", "D")
                     if symbol:
+                        # [Decision] 라우팅 인덱스 등록 → 이 종목의 tick만 이 클라이언트로 전송
+                        newly = ws_manager.subscribe(websocket, symbol)
+
                         # ① 차트 요청을 background task로 → WS 루프 블록 없이 즉시 다음 메시지 처리
                         asyncio.create_task(_send_chart(websocket, symbol, timeframe))
 
-                        # ② 실시간 구독 등록 (중복 방지) — subscribed_symbols는 _AL 코드로 관리됨
-                        sor_symbol = symbol if symbol.endswith('_AL') else f"{symbol}_AL"
-                        if sor_symbol not in kiwoom_client.subscribed_symbols:
-                            await kiwoom_client.subscribe_symbol(symbol)
-                            logger.info(f"실시간 구독 등록 (SOR): {sor_symbol}")
+                        # ② 실시간 구독 참조 추가 (클라이언트당 종목별 1회, 첫 참조일 때만 REG 전송)
+                        if newly:
+                            await market.subscribe_symbol(symbol)
+                            logger.info(f"실시간 구독 참조 추가: {symbol}")
 
                 # [Decision] requestChart: 타임프레임 변경 시 차트 데이터만 재전송
                 elif msg_type == "requestChart":
@@ -60,8 +194,70 @@ async def websocket_endpoint(websocket: WebSocket):
                     if symbol:
                         asyncio.create_task(_send_chart(websocket, symbol, timeframe))
 
+                # [Decision] requestHistory: before(클라이언트의 가장 오래된 봉) 이전 maxBars개를 chartChunk로 스트리밍
+                elif msg_type == "requestHistory":
+                    symbol = msg.get("symbol", "")
+                    timeframe = msg.get("timeframe", "D")
+                    max_bars = msg.get("maxBars", 2000)
+                    before = _history_before(msg.get("before"), timeframe)
+                    if symbol and isinstance(max_bars, int) and max_bars > 0:
+                        prev = history_tasks.pop(symbol, None)
+                        if prev:
+                            prev.cancel()
+                        history_tasks[symbol] = asyncio.create_task(
+                            _stream_history(websocket, symbol, timeframe, max_bars, before))
+
+                # [Decision] subscribeDepth: 호가 opt-in (체결 구독과 별도, 구독한 클라이언트에만 flush 주기당 1건)
+                elif msg_type == "subscribeDepth":
+                    symbol = msg.get("symbol", "")
+                    if symbol and ws_manager.subscribe_depth(websocket, symbol):
+                        await market.subscribe_depth(symbol)
+                        book = order_book_store.get(symbol)
+                        if book is not None:
+                            # 이미 호가를 받고 있는 종목이면 현재 호가를 즉시 전송
+                            await ws_manager.send_personal_message(
+                                {"type": "depth", "symbol": symbol, "data": book.to_dict()}, websocket)
+
+                elif msg_type == "unsubscribeDepth":
+                    symbol = msg.get("symbol", "")
+                    if symbol and ws_manager.unsubscribe_depth(websocket, symbol):
+                        _release_depth([symbol])
+
+                # [Decision] subscribeIndicators: (종목, 타임프레임) 지표를 서버에서 계산 → 전체 시계열(indicators) 후 flush 주기마다 최신 값(indicator)
+                # 구독 중인 종목만 허용 (종목 해제/연결 종료 시 함께 해제)
+                elif msg_type == "subscribeIndicators":
+                    symbol = msg.get("symbol", "")
+                    timeframe = msg.get("timeframe", "D")
+                    if symbol and symbol in ws_manager.client_symbols.get(websocket, ()):
+                        asyncio.create_task(indicator_engine.subscribe(
+                            websocket, symbol, timeframe, msg.get("indicators"), market.get_stock_chart))
+
+                elif msg_type == "unsubscribeIndicators":
+                    symbol = msg.get("symbol", "")
+                    if symbol:
+                        indicator_engine.release(websocket, symbol, msg.get("timeframe"))
+
+                # [Decision] subscribeMovers: 전 종목 순위(등락률/거래량 급증/갭) 상위 N 스트림 (순위가 바뀔 때만 전송)
+                elif msg_type == "subscribeMovers":
+                    if ws_manager.subscribe_scanner(websocket):
+                        await market.subscribe_scanner()
+                        if market_scanner.last is not None:
+                            await ws_manager.send_personal_message(
+                                {"type": "movers", "data": market_scanner.last}, websocket)
+
+                elif msg_type == "unsubscribeMovers":
+                    if ws_manager.unsubscribe_scanner(websocket):
+                        market.release_scanner()
+
                 elif msg_type == "unsubscribe":
                     symbol = msg.get("symbol", "")
+                    if symbol:
+                        prev = history_tasks.pop(symbol, None)
+                        if prev:
+                            prev.cancel()
+                        indicator_engine.release(websocket, symbol)
+                        if ws_manager.unsubscribe(websocket, symbol):
+                            _release_symbols([symbol])
                     logger.info(f"클라이언트 구독 해제 요청: {symbol}")
 
                 else:
@@ -75,3 +271,6 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
         ws_manager.disconnect(websocket)
+    finally:
+        for task in history_tasks.values():
+            task.cancel()
@@ -0,0 +1,100 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+def _consume_exception(task: asyncio.Task):
+    # 대기자가 모두 취소된 뒤 loader가 실패해도 "exception was never retrieved" 경고 방지
+    if not task.cancelled():
+        task.exception()
+
+
+class AsyncTTLCache:
+    """TTL + LRU 메모리 캐시 (동일 키 동시 miss는 1건의 요청으로 병합 = singleflight)"""
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int] = lambda v: 1):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        # key → (expires_at, size, value), 끝쪽이 최근 사용
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.total_bytes = 0
+        # 모니터링 카운터
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        if key in self._entries:
+            self._remove(key)
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self.total_bytes += size
+        # LRU: 메모리 한도를 넘으면 가장 오래 사용되지 않은 항목부터 제거
+        while self.total_bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        if key in self._entries:
+            self._remove(key)
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float,
+                          cacheable: Callable[[Any], bool] = lambda v: True) -> Any:
+        """캐시 hit이면 즉시 반환, miss면 loader 실행. 진행 중인 동일 키 요청이 있으면 그 결과를 공유."""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # [Fix] loader를 첫 호출자의 task가 아닌 별도 task로 실행 → 호출자 1명이 취소돼도
+            # 병합된 다른 대기자에게 CancelledError가 전파되지 않고, 조회 결과도 캐시에 반영
+            task = asyncio.create_task(self._load(key, loader, ttl, cacheable))
+            task.add_done_callback(_consume_exception)
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float,
+                    cacheable: Callable[[Any], bool]) -> Any:
+        try:
+            value = await loader()
+            if cacheable(value):
+                self.set(key, value, ttl)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,87 @@
+import struct
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, List
+
+# 차트 스냅샷 wire 포맷 (클라이언트가 hello 메시지로 선택, 미선택 시 json)
+CHART_FORMAT_JSON = "json"          # 기존: 봉마다 {"dt","open",...} dict
+CHART_FORMAT_COLUMNAR = "columnar"  # 필드별 배열 1개 + 정수 가격
+CHART_FORMAT_BINARY = "binary"      # 바이너리 프레임 (typed array로 바로 읽는 struct-packed 컬럼)
+CHART_FORMATS = (CHART_FORMAT_JSON, CHART_FORMAT_COLUMNAR, CHART_FORMAT_BINARY)
+
+# 바이너리 프레임 종류
+BINARY_KIND_CHART = 1
+BINARY_KIND_CHUNK = 2
+
+# kind(u8), flags(u8: bit0=done), page(u16), count(u32)
+_HEADER = struct.Struct("<BBHI")
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+@lru_cache(maxsize=65536)
+def dt_to_time(dt: str) -> int:
+    """dt(YYYYMMDD / YYYYMMDDHHMM[SS]) → 차트 time(초). 프론트 parseTime과 동일하게 KST 시각을 UTC로 간주.
+    종목이 달라도 같은 날짜/시각의 dt가 반복되므로 변환 결과를 캐시."""
+    n = len(dt)
+    if n != 8 and n < 12:
+        return 0
+    try:
+        seconds = (date(int(dt[0:4]), int(dt[4:6]), int(dt[6:8])).toordinal() - _EPOCH_ORDINAL) * 86400
+        if n >= 12:
+            seconds += int(dt[8:10]) * 3600 + int(dt[10:12]) * 60 + (int(dt[12:14]) if n >= 14 else 0)
+        return seconds
+    except ValueError:
+        return 0
+
+
+def time_to_dt(seconds: int, timeframe: str) -> str:
+    """차트 time(초) → dt (dt_to_time의 역변환). 일/주봉은 YYYYMMDD, 분봉은 YYYYMMDDHHMMSS"""
+    moment = datetime.fromtimestamp(int(seconds), timezone.utc)
+    return moment.strftime('%Y%m%d%H%M%S' if timeframe.isdigit() else '%Y%m%d')
+
+
+def to_columns(output: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """봉 dict 리스트 → 필드별 배열 (dt는 time(초)로 변환, 가격/거래량은 정수)"""
+    return {
+        "time": [dt_to_time(b.get("dt") or "") for b in output],
+        "open": [int(b["open"]) for b in output],
+        "high": [int(b["high"]) for b in output],
+        "low": [int(b["low"]) for b in output],
+        "close": [int(b["close"]) for b in output],
+        "volume": [int(b["volume"]) for b in output],
+    }
+
+
+def encode_columnar(message: Dict[str, Any]) -> Dict[str, Any]:
+    """chart/chartChunk 메시지의 data.output을 컬럼 형태로 교체"""
+    data = dict(message.get("data") or {})
+    data["columns"] = to_columns(data.pop("output", None) or [])
+    return {**message, "format": CHART_FORMAT_COLUMNAR, "data": data}
+
+
+def encode_binary(message: Dict[str, Any]) -> bytes:
+    """chart/chartChunk 메시지 → 바이너리 프레임 (little-endian).
+    header(8B) | symbol 길이(u8)+ASCII | timeframe 길이(u8)+ASCII | 8바이트 정렬 padding |
+    time f64[n] | volume f64[n] | open i32[n] | high i32[n] | low i32[n] | close i32[n]
+    → 프론트는 오프셋만 계산해 Float64Array/Int32Array로 복사 없이 읽음."""
+    output = (message.get("data") or {}).get("output") or []
+    kind = BINARY_KIND_CHUNK if message.get("type") == "chartChunk" else BINARY_KIND_CHART
+    flags = 1 if message.get("done", True) else 0
+    symbol = str(message.get("symbol", "")).encode("ascii", "replace")[:255]
+    timeframe = str(message.get("timeframe", "")).encode("ascii", "replace")[:255]
+
+    n = len(output)
+    head = (_HEADER.pack(kind, flags, int(message.get("page", 0)) & 0xFFFF, n)
+            + bytes((len(symbol),)) + symbol + bytes((len(timeframe),)) + timeframe)
+    head += b"\x00" * (-len(head) % 8)
+
+    cols = to_columns(output)
+    return b"".join((
+        head,
+        struct.pack(f"<{n}d", *cols["time"]),
+        struct.pack(f"<{n}d", *cols["volume"]),
+        struct.pack(f"<{n}i", *cols["open"]),
+        struct.pack(f"<{n}i", *cols["high"]),
+        struct.pack(f"<{n}i", *cols["low"]),
+        struct.pack(f"<{n}i", *cols["close"]),
+    ))
@@ -9,6 +9,45 @@ class Settings(BaseSettings):
     KIWOOM_API_URL: str = "https://api.kiwoom.com:8443"
     KIWOOM_WS_URL: str = "wss://api.kiwoom.com:8443"
 
+    # WebSocket Fan-out Settings
+    WS_CLIENT_QUEUE_SIZE: int = 256          # 클라이언트별 송신 큐 최대 프레임 수
+    WS_OVERFLOW_POLICY: str = "conflate"     # drop_oldest | conflate | disconnect
+    WS_TICK_DELTA_REFRESH_SEC: float = 30.0  # delta tick 협상 클라이언트에 전체 tick을 재전송하는 주기
+    TICK_MODE: str = "conflated"             # raw | conflated
+    TICK_FLUSH_HZ: float = 10.0              # conflated 모드 flush 주기 (4~20Hz 권장)
+    REG_DEBOUNCE_SEC: float = 0.05           # 실시간 REG 배치 debounce (마지막 구독 요청 후 대기)
+    REG_MAX_WAIT_SEC: float = 0.3            # 첫 구독 요청 후 REG 전송까지 최대 대기 (연속 요청에도 보장)
+    REG_CHUNK_SIZE: int = 100                # REG 요청 1건당 최대 종목 수
+    REG_GROUPS: int = 4                      # 분산 등록할 grp_no 개수 (1..N)
+    REALTIME_RELEASE_GRACE_SEC: float = 30.0 # 구독자가 모두 떠난 종목의 실시간 등록 해지(REMOVE) 유예 시간
+    INGEST_QUEUE_SIZE: int = 10000           # 키움 실시간 수신 파이프라인 단계별 큐 한도 (초과 시 오래된 항목 폐기)
+    TICK_VALIDATE: bool = False              # 실시간 tick pydantic 검증 (디버깅용, hot path 비용 증가)
+
+    # Deployment Settings
+    DEPLOY_MODE: str = "single"              # single | ingest (키움 세션 전용) | web (ingest에 연결하는 fan-out worker)
+    BUS_SOCKET_PATH: str = "data/bus.sock"   # ingest ↔ web worker 로컬 pub/sub Unix socket
+    WEB_WORKERS: int = 1                     # web 모드 worker 프로세스 수 (코어 수 권장)
+    SERVER_PORT: int = 8000
+
+    # Chart Cache Settings
+    CHART_CACHE_MAX_MB: int = 64             # 차트 스냅샷 캐시 메모리 한도 (LRU)
+    CANDLE_STORE_PATH: str = "data/candles.db"  # 로컬 OHLCV 저장소 (SQLite)
+    CHART_HISTORY_MAX_PAGES: int = 20        # 과거 차트 연속조회 최대 페이지 수
+    CHART_HISTORY_MAX_BARS: int = 10000      # 과거 차트 요청당 최대 봉 수
+
+    # Stock Master Settings
+    STOCK_MASTER_SNAPSHOT_PATH: str = "data/stock_master.json"  # 종목 마스터 로컬 스냅샷
+
+    # Market Scanner Settings
+    SCANNER_TOP_N: int = 20                  # 순위별 전송 종목 수
+    SCANNER_CHUNK_SIZE: int = 100            # 다종목 시세 요청 1건당 종목 수
+    SCANNER_SWEEP_SEC: float = 60.0          # 전 종목 순환 조회 최소 주기 (구독자가 있을 때만)
+
+    # Logging Settings
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"                 # text | json (구조화 필드 포함 한 줄 JSON)
+    LOG_CAPTURE: str = ""                    # 시작 시 활성화할 hot path 로그 카테고리 (예: "ws_raw,tick")
+
     # Security Settings
     SECURITY_SALT: str = "default_salt_for_dev_change_me"
 
@@ -0,0 +1,23 @@
+import json
+from typing import Any
+
+# [Decision] orjson이 설치되어 있으면 사용 (표준 json 대비 수 배 빠름), 없으면 표준 json으로 fallback
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 선택 의존성
+    orjson = None
+
+
+def dumps(obj: Any) -> str:
+    """객체를 WebSocket 텍스트 프레임용 JSON 문자열로 직렬화"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    # send_json과 동일하게 공백 없는 compact 포맷 사용
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def loads(data: Any) -> Any:
+    """JSON 문자열/바이트를 객체로 역직렬화"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,169 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from typing import Any, Dict, Optional
+
+# 로그 레코드 queue 최대 길이 (가득 차면 새 레코드를 버리고 dropped 카운트 증가)
+LOG_QUEUE_SIZE = 10000
+
+
+class LogCategory:
+    """[Decision] hot path 로그 카테고리 (WS 원본 프레임, tick 등).
+    비활성 카테고리는 allow()가 속성 1회 확인 후 False → 메시지 포맷팅 비용도 발생하지 않음.
+    활성 시 N건 중 1건 샘플링 + 초당 최대 건수 제한, 생략된 건수는 다음 로그의 suppressed 필드로 보고."""
+    __slots__ = ("name", "enabled", "sample_every", "max_per_sec",
+                 "seen", "emitted", "suppressed", "_window_start", "_window_count")
+
+    def __init__(self, name: str, enabled: bool = False, sample_every: int = 1, max_per_sec: float = 5.0):
+        self.name = name
+        self.enabled = enabled
+        self.sample_every = max(1, sample_every)
+        self.max_per_sec = max_per_sec
+        self.seen = 0
+        self.emitted = 0
+        self.suppressed = 0
+        self._window_start = 0.0
+        self._window_count = 0
+
+    def allow(self) -> bool:
+        if not self.enabled:
+            return False
+        self.seen += 1
+        if self.seen % self.sample_every:
+            self.suppressed += 1
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= 1.0:
+            self._window_start = now
+            self._window_count = 0
+        if self._window_count >= self.max_per_sec:
+            self.suppressed += 1
+            return False
+        self._window_count += 1
+        self.emitted += 1
+        return True
+
+    def fields(self, **fields: Any) -> Dict[str, Any]:
+        """logger 호출의 extra 인자 (category/suppressed + 구조화 필드)"""
+        fields["category"] = self.name
+        if self.suppressed:
+            fields["suppressed"] = self.suppressed
+            self.suppressed = 0
+        return {"fields": fields}
+
+    def configure(self, enabled: Optional[bool] = None, sample_every: Optional[int] = None,
+                  max_per_sec: Optional[float] = None):
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_every is not None:
+            self.sample_every = max(1, sample_every)
+        if max_per_sec is not None:
+            self.max_per_sec = max_per_sec
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_every": self.sample_every,
+            "max_per_sec": self.max_per_sec,
+            "seen": self.seen,
+            "emitted": self.emitted,
+        }
+
+
+# hot path 카테고리 (기본: 원본 프레임/tick 로그는 끔, 차트는 초당 2건까지)
+ws_raw_log = LogCategory("ws_raw", sample_every=100, max_per_sec=5)
+tick_log = LogCategory("tick", sample_every=50, max_per_sec=5)
+chart_log = LogCategory("chart", enabled=True, max_per_sec=2)
+CATEGORIES: Dict[str, LogCategory] = {c.name: c for c in (ws_raw_log, tick_log, chart_log)}
+
+
+class StructuredFormatter(logging.Formatter):
+    """메시지 뒤에 구조화 필드를 key=value로 덧붙이는 포매터 (json=True면 JSON 한 줄)"""
+    def __init__(self, as_json: bool = False):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        self.as_json = as_json
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None)
+        if self.as_json:
+            payload = {
+                "ts": round(record.created, 3),
+                "level": record.levelname,
+                "logger": record.name,
+                "msg": record.getMessage(),
+            }
+            if fields:
+                payload.update(fields)
+            if record.exc_info:
+                payload["exc"] = self.formatException(record.exc_info)
+            return json.dumps(payload, ensure_ascii=False, default=str)
+        line = super().format(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """queue가 가득 차면 호출 스레드를 막지 않고 레코드를 버림 (과부하 시 로그보다 실시간 처리 우선)"""
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[_DroppingQueueHandler] = None
+
+
+def setup_logging(level: str = "INFO", fmt: str = "text", capture: str = ""):
+    """[Decision] root logger를 queue 기반으로 구성: 이벤트 루프 스레드는 레코드 적재만, 포맷/stdout 쓰기는 listener 스레드.
+    capture: 시작 시 활성화할 hot path 카테고리 (콤마 구분, 예: "ws_raw,tick")"""
+    global _listener, _queue_handler
+    stop_logging()
+
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(StructuredFormatter(as_json=(fmt == "json")))
+    _queue_handler = _DroppingQueueHandler(log_queue)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+
+    for name in filter(None, (c.strip() for c in capture.split(","))):
+        if name in CATEGORIES:
+            CATEGORIES[name].enabled = True
+
+
+def stop_logging():
+    """listener 스레드 종료 (queue에 남은 레코드는 모두 출력 후 종료)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def set_level(level: str):
+    logging.getLogger().setLevel(level.upper())
+
+
+def get_stats() -> Dict[str, Any]:
+    return {
+        "level": logging.getLevelName(logging.getLogger().level),
+        "queue_depth": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0,
+        "categories": {name: c.get_stats() for name, c in CATEGORIES.items()},
+    }
@@ -1,6 +1,10 @@
 import asyncio
+import heapq
+import itertools
 import time
-from typing import Optional
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional
 
 class TokenBucket:
     """비동기 토큰 버킷 기반 Rate Limiter (초당 N회 제한)"""
@@ -11,22 +15,97 @@ class TokenBucket:
         self.last_update = time.monotonic()
         self.lock = asyncio.Lock()
 
+    def _refill(self):
+        now = time.monotonic()
+        # 경과 시간만큼 토큰 보충
+        elapsed = now - self.last_update
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.last_update = now
+
     async def consume(self, tokens: int = 1):
         """토큰을 소비할 때까지 대기합니다."""
         while True:
             async with self.lock:
-                now = time.monotonic()
-                # 경과 시간만큼 토큰 보충
-                elapsed = now - self.last_update
-                self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
-                self.last_update = now
-
+                self._refill()
                 if self.tokens >= tokens:
                     self.tokens -= tokens
                     return True
-            
-            # 토큰이 부족하면 짧게 대기 후 재시도
-            await asyncio.sleep(0.1)
+                # 부족한 토큰이 채워질 때까지의 시간만큼 대기 (최대 0.1초 단위로 재확인)
+                wait = min((tokens - self.tokens) / self.rate, 0.1)
+
+            await asyncio.sleep(wait)
+
+    def refund(self, tokens: int = 1):
+        """사용하지 않은 토큰 반환"""
+        self.tokens = min(self.capacity, self.tokens + tokens)
+
+class AdaptiveTokenBucket(TokenBucket):
+    """[Decision] 429 응답으로 서버 한도를 학습하는 AIMD 토큰 버킷.
+    429 수신 시 공유 속도를 배수 감소(+Retry-After 동안 전송 중단), 성공 시 가산 증가로 한도 근처까지 재탐색."""
+    def __init__(self, rate_per_sec: float, capacity: int, min_rate: float = 0.5,
+                 max_rate: Optional[float] = None, decrease_factor: float = 0.5,
+                 increase_per_sec: float = 0.1):
+        super().__init__(rate_per_sec, capacity)
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate_per_sec
+        self.decrease_factor = decrease_factor
+        self.increase_per_sec = increase_per_sec
+        self.blocked_until = 0.0
+        self._last_decrease = 0.0
+        # 모니터링 카운터
+        self.throttled = 0
+
+    async def consume(self, tokens: int = 1):
+        # Retry-After 대기 중이면 전송 재개 시점까지 대기
+        while True:
+            remaining = self.blocked_until - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(remaining)
+        return await super().consume(tokens)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        """429 수신: 속도 배수 감소. 같은 버스트에서 동시에 돌아온 429들은 1회로 간주."""
+        now = time.monotonic()
+        self.throttled += 1
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+        # 동시 요청들이 각자 감소시키지 않도록 현재 속도 기준 1주기(최소 1초) 안의 추가 429는 무시
+        if now - self._last_decrease < max(1.0, 1.0 / self.rate):
+            return
+        self._last_decrease = now
+        self._refill()
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        # 남은 버스트 토큰도 비워 즉시 재폭주 방지
+        self.tokens = 0.0
+
+    def on_success(self):
+        """성공 응답: 속도 가산 증가 (초당 increase_per_sec 만큼 회복되도록 요청당 증가분 환산)"""
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.increase_per_sec / self.rate)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_sec": round(self.rate, 3),
+            "min_rate": self.min_rate,
+            "max_rate": self.max_rate,
+            "throttled": self.throttled,
+            "blocked_for_sec": round(max(0.0, self.blocked_until - time.monotonic()), 2),
+        }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After 헤더(초 또는 HTTP-date)를 대기 초로 변환"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
 
 async def staggered_request(items, func, interval=0.2):
     """항목들을 순차적으로 처리하며 간격을 둠 (Staggering)"""
@@ -37,5 +116,91 @@ async def staggered_request(items, func, interval=0.2):
         await asyncio.sleep(interval)
     return results
 
-# 전역 API 제한기 (초당 5회 제한)
-kiwoom_rate_limiter = TokenBucket(rate_per_sec=5.0, capacity=5)
+
+# 요청 우선순위 (숫자가 작을수록 먼저 처리)
+PRIORITY_INTERACTIVE = 0   # 화면에 보이는 그리드 차트, 토큰 발급
+PRIORITY_BACKFILL = 1      # 과거 차트 연속조회, 선행 로딩
+PRIORITY_MASTER = 2        # 종목 마스터 갱신 등 대량 백그라운드 작업
+PRIORITY_SCAN = 3          # 전 종목 스캐너 순환 조회 (남는 요청 예산만 사용)
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BACKFILL: "backfill",
+    PRIORITY_MASTER: "master",
+    PRIORITY_SCAN: "scan",
+}
+
+
+class RequestScheduler:
+    """[Decision] 모든 키움 REST 요청이 거치는 우선순위 스케줄러.
+    계정 단위 토큰 버킷으로 속도를 제한하고, 토큰이 생길 때마다 가장 높은 우선순위 대기자에게 배정.
+    → 대량 백그라운드 작업이 쌓여 있어도 화면 차트 요청이 먼저 처리됨."""
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        # (priority, seq, enqueued_at, future)
+        self._queue: List[tuple] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # 우선순위별 대기 시간 통계
+        self._stats: Dict[int, Dict[str, float]] = {
+            p: {"granted": 0, "total_wait": 0.0, "max_wait": 0.0} for p in PRIORITY_NAMES
+        }
+
+    def _ensure_dispatcher(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._dispatch())
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE):
+        """요청 1건 전송 허가를 받을 때까지 대기"""
+        self._ensure_dispatcher()
+        enqueued_at = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), enqueued_at, future))
+        self._wakeup.set()
+        await future
+
+        wait = time.monotonic() - enqueued_at
+        stats = self._stats.setdefault(priority, {"granted": 0, "total_wait": 0.0, "max_wait": 0.0})
+        stats["granted"] += 1
+        stats["total_wait"] += wait
+        if wait > stats["max_wait"]:
+            stats["max_wait"] = wait
+
+    async def _dispatch(self):
+        while True:
+            while not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            await self.bucket.consume()
+            # 토큰 확보 시점의 최우선 대기자에게 배정 (취소된 대기자는 건너뜀)
+            while self._queue:
+                _, _, _, future = heapq.heappop(self._queue)
+                if not future.done():
+                    future.set_result(None)
+                    break
+            else:
+                self.bucket.refund()
+
+    def get_stats(self) -> Dict[str, Any]:
+        waiting: Dict[int, int] = {}
+        for priority, _, _, future in self._queue:
+            if not future.done():
+                waiting[priority] = waiting.get(priority, 0) + 1
+        result = {}
+        for priority, s in self._stats.items():
+            granted = int(s["granted"])
+            result[PRIORITY_NAMES.get(priority, str(priority))] = {
+                "granted": granted,
+                "waiting": waiting.get(priority, 0),
+                "avg_wait_ms": round(s["total_wait"] / granted * 1000, 1) if granted else 0.0,
+                "max_wait_ms": round(s["max_wait"] * 1000, 1),
+            }
+        limiter = self.bucket.get_stats() if hasattr(self.bucket, "get_stats") else {"rate_per_sec": self.bucket.rate}
+        return {"limiter": limiter, "queues": result}
+
+
+# 전역 API 제한기 (초당 5회 제한, 429 수신 시 자동 감속 후 재탐색)
+kiwoom_rate_limiter = AdaptiveTokenBucket(rate_per_sec=5.0, capacity=5)
+# 전역 키움 REST 스케줄러 (모든 REST 호출은 전송 직전 acquire)
+kiwoom_scheduler = RequestScheduler(kiwoom_rate_limiter)
@@ -0,0 +1,555 @@
+import asyncio
+import itertools
+import logging
+import os
+import struct
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from app.core import json_codec
+from app.services.candle_builder import candle_builder
+from app.services.indicators import indicator_engine
+from app.services.scanner import market_scanner
+from app.services.stock_master import apply_remote_master, get_master_status, get_stock_master, master_listeners
+from app.services.streamer import multiplexer
+from app.services.tick_decoder import Tick
+
+logger = logging.getLogger(__name__)
+
+# 배포 모드 (DEPLOY_MODE)
+DEPLOY_SINGLE = "single"   # 1 프로세스가 키움 세션 + 클라이언트 fan-out 모두 담당 (기존)
+DEPLOY_INGEST = "ingest"   # 키움 WS 세션/REST 스케줄러 전용 프로세스, 로컬 bus로 tick/차트 결과 publish
+DEPLOY_WEB = "web"         # ingest에 bus로 연결하는 stateless /ws/stocks worker (N개 실행)
+DEPLOY_MODES = (DEPLOY_SINGLE, DEPLOY_INGEST, DEPLOY_WEB)
+
+# 프레임 = 길이(u32 big-endian) + JSON
+_LEN = struct.Struct(">I")
+# worker 소켓 송신 버퍼가 이 크기를 넘으면 tick 프레임 폐기 (느린 worker가 ingest를 막지 않도록)
+BUS_MAX_BUFFER = 4 * 1024 * 1024
+_RECONNECT_SEC = 1.0
+
+
+def encode_frame(obj: Any) -> bytes:
+    body = json_codec.dumps(obj).encode()
+    return _LEN.pack(len(body)) + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Any:
+    size = _LEN.unpack(await reader.readexactly(_LEN.size))[0]
+    return json_codec.loads(await reader.readexactly(size))
+
+
+def _tick_row(tick: Tick) -> list:
+    # tick은 필드 순서 고정 배열로 전송 (dict 대비 키 문자열 인코딩/파싱 생략)
+    return [tick.symbol, tick.price, tick.open, tick.high, tick.low,
+            tick.volume, tick.change_rate, tick.timestamp]
+
+
+def _plain(symbol: str) -> str:
+    return symbol[:-3] if symbol.endswith('_AL') else symbol
+
+
+class _Peer:
+    """ingest에 연결된 web worker 1개"""
+    __slots__ = ("writer", "symbols", "depth", "scanner", "tasks", "sent", "dropped")
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.symbols: Set[str] = set()
+        self.depth: Set[str] = set()
+        self.scanner = False
+        self.tasks: Dict[int, asyncio.Task] = {}
+        self.sent = 0
+        self.dropped = 0
+
+
+class BusServer:
+    """[Decision] ingest 프로세스 측 로컬 pub/sub (Unix socket).
+    키움 세션/REST 스케줄러/차트 캐시는 이 프로세스 1곳에만 존재하고, worker는 요청(sub/chart/stored/history)만 전달.
+    tick은 구독한 worker에만 전송하며 프레임은 tick당 1회 인코딩해 공유."""
+    def __init__(self, max_buffer: int = BUS_MAX_BUFFER):
+        self.max_buffer = max_buffer
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._market = None
+        self._peers: Set[_Peer] = set()
+        self._by_symbol: Dict[str, Set[_Peer]] = {}
+        self._depth_by_symbol: Dict[str, Set[_Peer]] = {}
+        self.published = 0
+
+    @property
+    def running(self) -> bool:
+        return self._server is not None
+
+    async def start(self, path: str, market):
+        """market: 요청을 처리할 클라이언트 (KiwoomClient와 동일 메서드 제공)"""
+        self._market = market
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            os.unlink(path)
+        self._server = await asyncio.start_unix_server(self._on_connect, path=path)
+        # 호가는 ingest의 멀티플렉서에서 conflate된 스냅샷을 그대로 publish
+        multiplexer.depth_listeners.append(self.publish_depth)
+        # 전 종목 순위도 ingest의 스캐너가 1곳에서 계산해 구독 worker에 publish
+        market_scanner.listeners.append(self.publish_movers)
+        # [Fix] 종목 마스터 갱신(ka10099)은 ingest만 수행 → 교체될 때마다 worker에 전달
+        master_listeners.append(self.publish_master)
+        logger.info(f"Bus server listening: {path}")
+
+    async def stop(self):
+        if self._server is None:
+            return
+        self._server.close()
+        if self.publish_depth in multiplexer.depth_listeners:
+            multiplexer.depth_listeners.remove(self.publish_depth)
+        if self.publish_movers in market_scanner.listeners:
+            market_scanner.listeners.remove(self.publish_movers)
+        if self.publish_master in master_listeners:
+            master_listeners.remove(self.publish_master)
+        for peer in list(self._peers):
+            self._drop_peer(peer)
+        await self._server.wait_closed()
+        self._server = None
+
+    def publish_tick(self, tick: Tick):
+        """해당 종목을 구독한 worker에 tick 전송 (대기 없음, 버퍼 초과 worker는 폐기)"""
+        peers = self._by_symbol.get(tick.symbol)
+        if not peers:
+            return
+        self.published += 1
+        frame = encode_frame({"op": "tick", "d": _tick_row(tick)})
+        for peer in peers:
+            if peer.writer.transport.get_write_buffer_size() > self.max_buffer:
+                peer.dropped += 1
+                continue
+            peer.writer.write(frame)
+            peer.sent += 1
+
+    def publish_depth(self, symbol: str, data: Dict[str, Any]):
+        """호가 스냅샷(flush 주기당 1건)을 호가 구독 worker에 전송"""
+        peers = self._depth_by_symbol.get(symbol)
+        if not peers:
+            return
+        frame = encode_frame({"op": "depth", "s": symbol, "d": data})
+        for peer in peers:
+            if peer.writer.transport.get_write_buffer_size() > self.max_buffer:
+                peer.dropped += 1
+                continue
+            peer.writer.write(frame)
+
+    def publish_movers(self, data: Dict[str, Any]):
+        """순위 변경 시 순위 구독 worker에 전송"""
+        peers = [p for p in self._peers if p.scanner]
+        if not peers:
+            return
+        frame = encode_frame({"op": "movers", "d": data})
+        for peer in peers:
+            if peer.writer.transport.get_write_buffer_size() > self.max_buffer:
+                peer.dropped += 1
+                continue
+            peer.writer.write(frame)
+
+    def publish_master(self, stocks: List[Dict[str, str]], source: str):
+        """종목 마스터 교체 시 모든 worker에 전송 (갱신 빈도가 낮으므로 버퍼 한도와 무관하게 전송)"""
+        if not self._peers:
+            return
+        frame = encode_frame({"op": "master", "source": source, "d": stocks})
+        for peer in self._peers:
+            peer.writer.write(frame)
+
+    async def _on_connect(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = _Peer(writer)
+        self._peers.add(peer)
+        logger.info(f"Bus worker 연결 (총 {len(self._peers)})")
+        if get_master_status()["count"]:
+            # 새로 연결된 worker는 현재 마스터로 시작 (스냅샷이 없는 신규 설치/재시작 중 갱신 대비)
+            writer.write(encode_frame({"op": "master", "source": get_master_status()["source"],
+                                       "d": get_stock_master()}))
+        try:
+            while True:
+                msg = await read_frame(reader)
+                op = msg.get("op")
+                if op == "sub":
+                    await self._subscribe(peer, msg.get("symbols") or [])
+                elif op == "unsub":
+                    for symbol in msg.get("symbols") or []:
+                        self._unsubscribe(peer, _plain(symbol))
+                elif op == "sub_depth":
+                    for symbol in msg.get("symbols") or []:
+                        await self._subscribe_depth(peer, _plain(symbol))
+                elif op == "unsub_depth":
+                    for symbol in msg.get("symbols") or []:
+                        self._unsubscribe_depth(peer, _plain(symbol))
+                elif op == "sub_scan":
+                    await self._subscribe_scanner(peer)
+                elif op == "unsub_scan":
+                    self._unsubscribe_scanner(peer)
+                elif op == "cancel":
+                    task = peer.tasks.pop(msg.get("id"), None)
+                    if task:
+                        task.cancel()
+                elif op in ("chart", "stored", "history", "quotes"):
+                    req_id = msg.get("id")
+                    peer.tasks[req_id] = asyncio.create_task(self._serve(peer, req_id, op, msg))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"Bus worker 처리 에러: {e}")
+        finally:
+            self._drop_peer(peer)
+            logger.info(f"Bus worker 연결 종료 (총 {len(self._peers)})")
+
+    async def _subscribe(self, peer: _Peer, symbols: List[str]):
+        # worker 1개 = 종목당 구독 참조 1개 (worker 내부 클라이언트 수는 worker가 집계)
+        for symbol in symbols:
+            symbol = _plain(symbol)
+            if symbol in peer.symbols:
+                continue
+            peer.symbols.add(symbol)
+            self._by_symbol.setdefault(symbol, set()).add(peer)
+            await self._market.subscribe_symbol(symbol)
+
+    def _unsubscribe(self, peer: _Peer, symbol: str):
+        if symbol not in peer.symbols:
+            return
+        peer.symbols.discard(symbol)
+        peers = self._by_symbol.get(symbol)
+        if peers is not None:
+            peers.discard(peer)
+            if not peers:
+                del self._by_symbol[symbol]
+        self._market.release_symbol(symbol)
+
+    async def _subscribe_depth(self, peer: _Peer, symbol: str):
+        if symbol in peer.depth:
+            return
+        peer.depth.add(symbol)
+        self._depth_by_symbol.setdefault(symbol, set()).add(peer)
+        await self._market.subscribe_depth(symbol)
+
+    def _unsubscribe_depth(self, peer: _Peer, symbol: str):
+        if symbol not in peer.depth:
+            return
+        peer.depth.discard(symbol)
+        peers = self._depth_by_symbol.get(symbol)
+        if peers is not None:
+            peers.discard(peer)
+            if not peers:
+                del self._depth_by_symbol[symbol]
+        self._market.release_depth(symbol)
+
+    async def _subscribe_scanner(self, peer: _Peer):
+        if peer.scanner:
+            return
+        peer.scanner = True
+        await self._market.subscribe_scanner()
+        if market_scanner.last is not None:
+            # 이미 계산된 순위가 있으면 다음 변경을 기다리지 않고 전송
+            peer.writer.write(encode_frame({"op": "movers", "d": market_scanner.last}))
+
+    def _unsubscribe_scanner(self, peer: _Peer):
+        if not peer.scanner:
+            return
+        peer.scanner = False
+        self._market.release_scanner()
+
+    def _drop_peer(self, peer: _Peer):
+        if peer not in self._peers:
+            return
+        self._peers.discard(peer)
+        for symbol in list(peer.symbols):
+            self._unsubscribe(peer, symbol)
+        for symbol in list(peer.depth):
+            self._unsubscribe_depth(peer, symbol)
+        self._unsubscribe_scanner(peer)
+        for task in peer.tasks.values():
+            task.cancel()
+        peer.tasks.clear()
+        peer.writer.close()
+
+    async def _serve(self, peer: _Peer, req_id: int, op: str, msg: Dict[str, Any]):
+        """요청 1건 처리: 결과를 part 프레임(0개 이상)으로 보내고 end로 종료"""
+        market = self._market
+        symbol = msg.get("symbol", "")
+        timeframe = msg.get("timeframe", "D")
+        error = None
+        try:
+            if op == "chart":
+                await self._reply(peer, req_id, await market.get_stock_chart(symbol, timeframe))
+            elif op == "quotes":
+                await self._reply(peer, req_id, await market.get_quotes(msg.get("symbols") or []))
+            elif op == "stored":
+                # 차트 캐시가 이미 있으면 저장소 선전송이 불필요하므로 None
+                stored = None if market.is_chart_cached(symbol, timeframe) \
+                    else await market.get_stored_chart(symbol, timeframe)
+                await self._reply(peer, req_id, stored)
+            else:
+                async for rows, has_more in market.stream_chart_history(
+                        symbol, timeframe, msg.get("maxBars", 2000), msg.get("before")):
+                    await self._reply(peer, req_id, [rows, has_more])
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Bus 요청 처리 실패 ({op} {symbol}): {e}")
+        finally:
+            peer.tasks.pop(req_id, None)
+        if not peer.writer.is_closing():
+            peer.writer.write(encode_frame({"op": "end", "id": req_id, "error": error}))
+
+    async def _reply(self, peer: _Peer, req_id: int, data: Any):
+        peer.writer.write(encode_frame({"op": "part", "id": req_id, "data": data}))
+        # 차트 결과는 크므로 worker가 읽는 속도에 맞춰 전송 (tick publish는 drain하지 않음)
+        await peer.writer.drain()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "role": DEPLOY_INGEST,
+            "workers": len(self._peers),
+            "symbols": len(self._by_symbol),
+            "depth_symbols": len(self._depth_by_symbol),
+            "scanner_workers": sum(1 for p in self._peers if p.scanner),
+            "published": self.published,
+            "peers": [
+                {"symbols": len(p.symbols), "sent": p.sent, "dropped": p.dropped,
+                 "buffer": p.writer.transport.get_write_buffer_size(), "requests": len(p.tasks)}
+                for p in self._peers
+            ],
+        }
+
+
+class RemoteMarketClient:
+    """[Decision] web worker 측 bus 클라이언트. ws_router가 사용하는 KiwoomClient 메서드와 동일한 인터페이스를 제공해
+    single/web 모드에서 라우터 코드가 같음. 수신한 tick은 worker의 실시간 봉/멀티플렉서로 전달 (fan-out은 worker별로 수행)."""
+    def __init__(self):
+        # KiwoomClient와 동일하게 _AL 코드로 관리 (재연결 시 ingest에 재구독)
+        self.subscribed_symbols: Set[str] = set()
+        # 이 worker 내 구독 참조 카운트: 0↔1 전환 시에만 ingest에 sub/unsub 전송
+        self._refcounts: Dict[str, int] = {}
+        self.depth_symbols: Set[str] = set()
+        self._depth_refcounts: Dict[str, int] = {}
+        self._scanner_refs = 0
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Queue] = {}
+        self._ids = itertools.count(1)
+        self._master_task: Optional[asyncio.Task] = None
+        self.ticks = 0
+        self.reconnects = 0
+        self.masters = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def start(self, path: str):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(path))
+
+    async def stop(self):
+        if self._master_task is not None:
+            self._master_task.cancel()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, path: str):
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(path)
+            except Exception as e:
+                logger.warning(f"Bus 연결 실패 ({path}): {e}, {_RECONNECT_SEC}초 후 재시도")
+                await asyncio.sleep(_RECONNECT_SEC)
+                continue
+            self._writer = writer
+            logger.info(f"Bus 연결 완료: {path}")
+            if self.subscribed_symbols:
+                self._send({"op": "sub", "symbols": [_plain(s) for s in self.subscribed_symbols]})
+            if self.depth_symbols:
+                self._send({"op": "sub_depth", "symbols": [_plain(s) for s in self.depth_symbols]})
+            if self._scanner_refs:
+                self._send({"op": "sub_scan"})
+            try:
+                while True:
+                    msg = await read_frame(reader)
+                    op = msg.get("op")
+                    if op == "tick":
+                        await self._on_tick(Tick(*msg["d"]))
+                    elif op == "depth":
+                        multiplexer.publish_depth(msg["s"], msg["d"])
+                    elif op == "movers":
+                        market_scanner.publish(msg["d"])
+                    elif op == "master":
+                        self._apply_master(msg.get("d") or [], msg.get("source") or "bus")
+                    else:
+                        queue = self._pending.get(msg.get("id"))
+                        if queue is not None:
+                            queue.put_nowait(msg)
+            except (asyncio.IncompleteReadError, ConnectionError) as e:
+                logger.warning(f"Bus 연결 종료: {e}")
+            except Exception as e:
+                # [Fix] 디코딩 에러 등 예기치 않은 예외도 재연결 루프를 끝내지 않음
+                logger.error(f"Bus 수신 처리 에러: {e}, 재연결")
+            finally:
+                self._writer = None
+                writer.close()
+                # 진행 중인 요청은 실패로 종료
+                for queue in self._pending.values():
+                    queue.put_nowait({"op": "end", "error": "bus disconnected"})
+            self.reconnects += 1
+            await asyncio.sleep(_RECONNECT_SEC)
+
+    def _apply_master(self, stocks: List[Dict[str, str]], source: str):
+        # 인덱스 생성은 스레드에서 (수신 루프 비차단), 더 새 마스터가 오면 이전 적용은 취소
+        if self._master_task is not None and not self._master_task.done():
+            self._master_task.cancel()
+        self._master_task = asyncio.create_task(apply_remote_master(stocks, source))
+        self.masters += 1
+
+    async def _on_tick(self, tick: Tick):
+        self.ticks += 1
+        candle_builder.on_tick(tick.symbol, tick.price, tick.open, tick.high, tick.low,
+                               tick.volume, tick.timestamp)
+        indicator_engine.on_tick(tick.symbol)
+        await multiplexer.handle_tick(tick)
+
+    def _send(self, msg: Dict[str, Any]):
+        if not self.connected:
+            raise ConnectionError("bus not connected")
+        self._writer.write(encode_frame(msg))
+
+    async def _call(self, op: str, **params) -> AsyncIterator[Any]:
+        """요청 1건을 보내고 part 데이터를 차례로 yield (중단 시 ingest에 cancel 전송)"""
+        req_id = next(self._ids)
+        queue: asyncio.Queue = asyncio.Queue()
+        self._pending[req_id] = queue
+        finished = False
+        try:
+            self._send({"op": op, "id": req_id, **params})
+            while True:
+                msg = await queue.get()
+                if msg["op"] == "end":
+                    finished = True
+                    if msg.get("error"):
+                        raise ConnectionError(msg["error"])
+                    return
+                yield msg.get("data")
+        finally:
+            self._pending.pop(req_id, None)
+            if not finished and self.connected:
+                self._send({"op": "cancel", "id": req_id})
+
+    async def _call_one(self, op: str, **params) -> Any:
+        result = None
+        async for data in self._call(op, **params):
+            result = data
+        return result
+
+    async def subscribe_symbol(self, symbol: str):
+        sor_symbol = symbol if symbol.endswith('_AL') else f"{symbol}_AL"
+        self._refcounts[sor_symbol] = self._refcounts.get(sor_symbol, 0) + 1
+        if sor_symbol in self.subscribed_symbols:
+            return
+        self.subscribed_symbols.add(sor_symbol)
+        # 미연결 상태면 연결 시 subscribed_symbols 전체를 재구독
+        if self.connected:
+            self._send({"op": "sub", "symbols": [_plain(symbol)]})
+
+    def release_symbol(self, symbol: str):
+        sor_symbol = symbol if symbol.endswith('_AL') else f"{symbol}_AL"
+        count = self._refcounts.get(sor_symbol, 0) - 1
+        if count > 0:
+            self._refcounts[sor_symbol] = count
+            return
+        self._refcounts.pop(sor_symbol, None)
+        if sor_symbol in self.subscribed_symbols:
+            self.subscribed_symbols.discard(sor_symbol)
+            # REMOVE 유예(grace)는 ingest의 키움 클라이언트가 처리
+            if self.connected:
+                self._send({"op": "unsub", "symbols": [_plain(symbol)]})
+
+    async def subscribe_depth(self, symbol: str):
+        sor_symbol = symbol if symbol.endswith('_AL') else f"{symbol}_AL"
+        self._depth_refcounts[sor_symbol] = self._depth_refcounts.get(sor_symbol, 0) + 1
+        if sor_symbol in self.depth_symbols:
+            return
+        self.depth_symbols.add(sor_symbol)
+        if self.connected:
+            self._send({"op": "sub_depth", "symbols": [_plain(symbol)]})
+
+    def release_depth(self, symbol: str):
+        sor_symbol = symbol if symbol.endswith('_AL') else f"{symbol}_AL"
+        count = self._depth_refcounts.get(sor_symbol, 0) - 1
+        if count > 0:
+            self._depth_refcounts[sor_symbol] = count
+            return
+        self._depth_refcounts.pop(sor_symbol, None)
+        if sor_symbol in self.depth_symbols:
+            self.depth_symbols.discard(sor_symbol)
+            if self.connected:
+                self._send({"op": "unsub_depth", "symbols": [_plain(symbol)]})
+
+    async def subscribe_scanner(self):
+        self._scanner_refs += 1
+        if self._scanner_refs == 1 and self.connected:
+            self._send({"op": "sub_scan"})
+
+    def release_scanner(self):
+        if self._scanner_refs == 0:
+            return
+        self._scanner_refs -= 1
+        if self._scanner_refs == 0 and self.connected:
+            self._send({"op": "unsub_scan"})
+
+    def get_subscription_stats(self) -> Dict[str, Any]:
+        return {"referenced": len(self._refcounts), "forwarded": len(self.subscribed_symbols),
+                "depth": len(self.depth_symbols), "scanner": self._scanner_refs}
+
+    def is_chart_cached(self, stock_code: str, timeframe: str) -> bool:
+        # 캐시 여부는 ingest가 stored 요청에서 판단
+        return False
+
+    async def get_stored_chart(self, stock_code: str, timeframe: str) -> Optional[Dict[str, Any]]:
+        try:
+            return await self._call_one("stored", symbol=stock_code, timeframe=timeframe)
+        except ConnectionError as e:
+            logger.warning(f"저장소 차트 요청 실패 (bus): {stock_code} - {e}")
+            return None
+
+    async def get_stock_chart(self, stock_code: str, timeframe: str = "D") -> Dict[str, Any]:
+        try:
+            return await self._call_one("chart", symbol=stock_code, timeframe=timeframe) or {"output": []}
+        except ConnectionError as e:
+            logger.error(f"차트 요청 실패 (bus): {stock_code} - {e}")
+            return {"output": []}
+
+    async def get_quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        try:
+            return await self._call_one("quotes", symbols=list(symbols)) or {}
+        except ConnectionError as e:
+            logger.warning(f"시세 요청 실패 (bus): {e}")
+            return {}
+
+    async def stream_chart_history(self, stock_code: str, timeframe: str, max_bars: int,
+                                   before: Optional[str] = None):
+        async for rows, has_more in self._call("history", symbol=stock_code, timeframe=timeframe,
+                                               maxBars=max_bars, before=before):
+            yield rows, has_more
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "role": DEPLOY_WEB,
+            "pid": os.getpid(),
+            "connected": self.connected,
+            "symbols": len(self.subscribed_symbols),
+            "ticks": self.ticks,
+            "pending_requests": len(self._pending),
+            "reconnects": self.reconnects,
+            "masters": self.masters,
+        }
+
+
+bus_server = BusServer()
+remote_market = RemoteMarketClient()
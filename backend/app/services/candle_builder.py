@@ -0,0 +1,160 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+KST = timezone(timedelta(hours=9))
+
+# 실시간 봉 생성 지원 타임프레임 (주봉은 REST 스냅샷 캐시 사용)
+LIVE_MINUTE_TIMEFRAMES = {"1": 1, "3": 3, "5": 5, "10": 10, "15": 15, "30": 30, "45": 45, "60": 60}
+LIVE_TIMEFRAMES = set(LIVE_MINUTE_TIMEFRAMES) | {"D"}
+
+# 시계열당 최대 봉 수 (초과 시 오래된 봉부터 제거)
+MAX_BARS_PER_SERIES = 2000
+
+
+class LiveSeries:
+    """단일 (종목, 타임프레임)의 봉 시계열. bars는 dt 오름차순, REST 차트 응답과 동일한 dict 스키마."""
+    __slots__ = ("timeframe", "base_dt", "bars")
+
+    def __init__(self, timeframe: str, base_dt: str, bars: List[Dict[str, Any]]):
+        self.timeframe = timeframe
+        self.base_dt = base_dt
+        self.bars = bars
+
+
+class SymbolCandles:
+    """종목별 타임프레임 시계열 묶음. 누적거래량(13) 직전 값은 타임프레임 간 공유 (당일 기준)."""
+    __slots__ = ("series", "last_acc_volume", "acc_volume_dt")
+
+    def __init__(self):
+        self.series: Dict[str, LiveSeries] = {}
+        self.last_acc_volume = -1
+        # last_acc_volume이 속한 거래일 — 날짜가 바뀌면 누적거래량이 0부터 다시 시작하므로 초기화
+        self.acc_volume_dt = ""
+
+
+class CandleBuilder:
+    """실시간 체결 스트림으로 종목별 OHLCV 봉을 증분 생성 (REST 스냅샷으로 seed).
+    seed된 (종목, 타임프레임)의 requestChart는 REST 호출 없이 메모리에서 응답."""
+    def __init__(self):
+        self._symbols: Dict[str, SymbolCandles] = {}
+        # 모니터링 카운터
+        self.ticks = 0
+        self.served = 0
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(KST).strftime('%Y%m%d')
+
+    def seed(self, symbol: str, timeframe: str, output: List[Dict[str, Any]], base_dt: Optional[str] = None):
+        """REST 차트 스냅샷으로 시계열 초기화 (미지원 타임프레임/빈 데이터는 무시)"""
+        if timeframe not in LIVE_TIMEFRAMES or not output:
+            return
+        # 캐시에 보관된 REST 응답이 변경되지 않도록 봉 dict를 복사
+        bars = sorted((dict(bar) for bar in output if bar.get("dt")), key=lambda b: b["dt"])
+        if len(bars) > MAX_BARS_PER_SERIES:
+            bars = bars[-MAX_BARS_PER_SERIES:]
+        candles = self._symbols.setdefault(symbol, SymbolCandles())
+        candles.series[timeframe] = LiveSeries(timeframe, base_dt or self._today(), bars)
+        logger.debug(f"실시간 봉 seed: {symbol} tf={timeframe} bars={len(bars)}")
+
+    def get_snapshot(self, symbol: str, timeframe: str) -> Optional[Dict[str, Any]]:
+        """메모리 시계열을 REST 차트 응답 포맷으로 반환. 없거나 날짜가 바뀌었으면 None."""
+        candles = self._symbols.get(symbol)
+        if candles is None:
+            return None
+        series = candles.series.get(timeframe)
+        if series is None or series.base_dt != self._today():
+            return None
+        self.served += 1
+        return {"output": list(series.bars)}
+
+    def get_series(self, symbol: str, timeframe: str) -> Optional[LiveSeries]:
+        """당일 실시간 봉 시계열 (복사 없이 내부 소비용: 지표 엔진). 없거나 날짜가 바뀌었으면 None"""
+        candles = self._symbols.get(symbol)
+        series = candles.series.get(timeframe) if candles is not None else None
+        if series is None or series.base_dt != self._today():
+            return None
+        return series
+
+    def drop(self, symbol: str):
+        """구독자가 없는 종목의 시계열 해제"""
+        self._symbols.pop(symbol, None)
+
+    def on_tick(self, symbol: str, price: int, open_: int, high: int, low: int,
+                acc_volume: int, timestamp: str):
+        """체결 1건을 seed된 모든 타임프레임 시계열에 반영"""
+        candles = self._symbols.get(symbol)
+        if candles is None:
+            return
+        today = self._today()
+        live = [(tf, series) for tf, series in candles.series.items() if series.base_dt == today]
+        # [Fix] 모든 시계열이 전일 seed면 누적거래량 기준값도 갱신하지 않음 (재seed 후 첫 tick부터 당일 기준)
+        if not live:
+            return
+        self.ticks += 1
+
+        # [Decision] 봉 거래량 = 누적거래량(13) 증분. 당일 첫 tick은 직전 값이 없으므로 0 (REST 봉 거래량 유지)
+        if candles.acc_volume_dt != today:
+            candles.last_acc_volume = -1
+            candles.acc_volume_dt = today
+        delta = 0 if candles.last_acc_volume < 0 else max(0, acc_volume - candles.last_acc_volume)
+        candles.last_acc_volume = max(candles.last_acc_volume, acc_volume)
+
+        ts = timestamp.zfill(6)
+        if not ts[:4].isdigit():
+            ts = datetime.now(KST).strftime('%H%M%S')
+        for tf, series in live:
+            if tf == "D":
+                self._update_daily(series, today, price, open_, high, low, acc_volume)
+            else:
+                self._update_minute(series, today, ts, LIVE_MINUTE_TIMEFRAMES[tf], price, delta)
+
+    @staticmethod
+    def _update_daily(series: LiveSeries, today: str, price: int, open_: int, high: int,
+                      low: int, acc_volume: int):
+        # 일봉은 tick의 당일 시/고/저/누적거래량을 그대로 사용 → REST 대비 drift 없음
+        bars = series.bars
+        if bars and bars[-1]["dt"] == today:
+            bar = bars[-1]
+        else:
+            bar = {"dt": today, "open": open_ or price, "high": price, "low": price, "close": price, "volume": 0}
+            bars.append(bar)
+        bar["open"] = open_ or bar["open"]
+        bar["high"] = max(bar["high"], high or price)
+        bar["low"] = min(bar["low"], low or price)
+        bar["close"] = price
+        bar["volume"] = max(bar["volume"], acc_volume)
+
+    @staticmethod
+    def _update_minute(series: LiveSeries, today: str, ts: str, minutes: int, price: int, delta: int):
+        # 봉 시작 시각 = 자정 기준 분을 타임프레임 단위로 내림 (프론트 onTick과 동일 규칙)
+        total = int(ts[0:2]) * 60 + int(ts[2:4])
+        bucket = total // minutes * minutes
+        dt = f"{today}{bucket // 60:02d}{bucket % 60:02d}00"
+
+        bars = series.bars
+        if bars and bars[-1]["dt"] == dt:
+            bar = bars[-1]
+            bar["high"] = max(bar["high"], price)
+            bar["low"] = min(bar["low"], price)
+            bar["close"] = price
+            bar["volume"] += delta
+        elif not bars or dt > bars[-1]["dt"]:
+            bars.append({"dt": dt, "open": price, "high": price, "low": price, "close": price, "volume": delta})
+            if len(bars) > MAX_BARS_PER_SERIES:
+                del bars[0]
+        # dt가 마지막 봉보다 과거인 지연 체결은 무시
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "symbols": len(self._symbols),
+            "series": sum(len(c.series) for c in self._symbols.values()),
+            "ticks": self.ticks,
+            "served_from_memory": self.served,
+        }
+
+
+candle_builder = CandleBuilder()
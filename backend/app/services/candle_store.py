@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    symbol    TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    dt        TEXT NOT NULL,
+    open      REAL NOT NULL,
+    high      REAL NOT NULL,
+    low       REAL NOT NULL,
+    close     REAL NOT NULL,
+    volume    REAL NOT NULL,
+    PRIMARY KEY (symbol, timeframe, dt)
+) WITHOUT ROWID
+"""
+
+
+class CandleStore:
+    """로컬 SQLite OHLCV 저장소 ((종목, 타임프레임, dt) 단위 upsert).
+    [Decision] 외부 서비스 없이 미니 서버 로컬 디스크(data/)에 저장. 쿼리는 스레드에서 실행해 이벤트 루프 비차단."""
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # 모니터링 카운터
+        self.reads = 0
+        self.writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            conn.commit()
+            self._conn = conn
+            logger.info(f"캔들 저장소 열기: {self.path}")
+        return self._conn
+
+    def _load(self, symbol: str, timeframe: str, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT dt, open, high, low, close, volume FROM candles "
+                "WHERE symbol = ? AND timeframe = ? ORDER BY dt DESC LIMIT ?",
+                (symbol, timeframe, limit),
+            ).fetchall()
+        self.reads += 1
+        # 최신순으로 LIMIT 후 오름차순으로 반환
+        return [
+            {"dt": dt, "open": o, "high": h, "low": l, "close": c, "volume": v}
+            for dt, o, h, l, c, v in reversed(rows)
+        ]
+
+    def _load_before(self, symbol: str, timeframe: str, before: str, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT dt, open, high, low, close, volume FROM candles "
+                "WHERE symbol = ? AND timeframe = ? AND dt < ? ORDER BY dt DESC LIMIT ?",
+                (symbol, timeframe, before, limit),
+            ).fetchall()
+        self.reads += 1
+        return [
+            {"dt": dt, "open": o, "high": h, "low": l, "close": c, "volume": v}
+            for dt, o, h, l, c, v in reversed(rows)
+        ]
+
+    def _load_at(self, symbol: str, timeframe: str, dt: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT dt, open, high, low, close, volume FROM candles "
+                "WHERE symbol = ? AND timeframe = ? AND dt = ?",
+                (symbol, timeframe, dt),
+            ).fetchone()
+        if row is None:
+            return None
+        dt, o, h, l, c, v = row
+        return {"dt": dt, "open": o, "high": h, "low": l, "close": c, "volume": v}
+
+    def _last_dt(self, symbol: str, timeframe: str) -> Optional[str]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT MAX(dt) FROM candles WHERE symbol = ? AND timeframe = ?",
+                (symbol, timeframe),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _upsert(self, symbol: str, timeframe: str, bars: List[Dict[str, Any]]):
+        # 마지막 봉은 장중 미완성 봉이므로 같은 dt는 덮어씀
+        params = [
+            (symbol, timeframe, b["dt"], b["open"], b["high"], b["low"], b["close"], b["volume"])
+            for b in bars if b.get("dt")
+        ]
+        if not params:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.executemany("INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", params)
+            conn.commit()
+        self.writes += len(params)
+
+    def _delete(self, symbol: str, timeframe: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM candles WHERE symbol = ? AND timeframe = ?", (symbol, timeframe))
+            conn.commit()
+
+    async def load(self, symbol: str, timeframe: str, limit: int = 2000) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._load, symbol, timeframe, limit)
+
+    async def load_before(self, symbol: str, timeframe: str, before: str, limit: int) -> List[Dict[str, Any]]:
+        """dt < before 인 봉 중 최신 limit개 (오름차순)"""
+        return await asyncio.to_thread(self._load_before, symbol, timeframe, before, limit)
+
+    async def load_at(self, symbol: str, timeframe: str, dt: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._load_at, symbol, timeframe, dt)
+
+    async def last_dt(self, symbol: str, timeframe: str) -> Optional[str]:
+        return await asyncio.to_thread(self._last_dt, symbol, timeframe)
+
+    async def upsert(self, symbol: str, timeframe: str, bars: List[Dict[str, Any]]):
+        await asyncio.to_thread(self._upsert, symbol, timeframe, bars)
+
+    async def delete(self, symbol: str, timeframe: str):
+        await asyncio.to_thread(self._delete, symbol, timeframe)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "reads": self.reads, "rows_written": self.writes}
+
+
+candle_store = CandleStore(settings.CANDLE_STORE_PATH)
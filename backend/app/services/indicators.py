@@ -0,0 +1,558 @@
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from fastapi import WebSocket
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.api.websocket import ws_manager
+from app.services.candle_builder import MAX_BARS_PER_SERIES, LiveSeries, candle_builder
+
+logger = logging.getLogger(__name__)
+
+MAX_INDICATORS = 8     # 구독 1건당 최대 지표 수
+MAX_PERIOD = 500
+# 지표 종류 → 기본 파라미터 (spec "ma:20", "bb:20:2", "vwap" 형태)
+_DEFAULT_PARAMS = {"ma": (20,), "ema": (20,), "rsi": (14,), "bb": (20, 2.0), "vwap": ()}
+# EWM 블록 closed form의 블록 길이 (beta^-블록길이가 float64 범위를 넘지 않도록 제한)
+_EWM_BLOCK = 64
+
+Value = Optional[Tuple[Optional[float], ...]]
+
+
+def parse_spec(spec: Any) -> Optional[str]:
+    """지표 spec을 정규화된 이름으로 변환 ("MA:20" → "ma:20", "bb" → "bb:20:2"). 지원하지 않거나 범위를 벗어나면 None"""
+    if not isinstance(spec, str):
+        return None
+    kind, *args = spec.strip().lower().split(":")
+    defaults = _DEFAULT_PARAMS.get(kind)
+    if defaults is None or len(args) > len(defaults):
+        return None
+    try:
+        params = [float(a) for a in args] + list(defaults[len(args):])
+    except ValueError:
+        return None
+    if params:
+        if params[0] != int(params[0]) or not 1 <= params[0] <= MAX_PERIOD:
+            return None
+        params[0] = int(params[0])
+    if kind == "bb" and not 0 < params[1] <= 10:
+        return None
+    return ":".join([kind] + [f"{p:g}" for p in params])
+
+
+# === 벡터화 계산 (초기 시계열) ===
+
+def _sma(x: np.ndarray, n: int) -> np.ndarray:
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        c = np.concatenate(([0.0], np.cumsum(x)))
+        out[n - 1:] = (c[n:] - c[:-n]) / n
+    return out
+
+
+def _ewm(x: np.ndarray, alpha: float, init: float) -> np.ndarray:
+    """y[i] = y[i-1] + alpha * (x[i] - y[i-1]), y[-1] = init.
+    블록마다 y_i = beta^(i+1) * (init + alpha * cumsum(x_j / beta^(j+1))) closed form으로 계산 (원소별 Python 루프 없음)"""
+    out = np.empty(len(x))
+    beta = 1.0 - alpha
+    prev = init
+    for start in range(0, len(x), _EWM_BLOCK):
+        block = x[start:start + _EWM_BLOCK]
+        if beta == 0.0:
+            y = block.astype(float)
+        else:
+            decay = beta ** np.arange(1, len(block) + 1)
+            y = decay * (prev + alpha * np.cumsum(block / decay))
+        out[start:start + len(block)] = y
+        prev = y[-1]
+    return out
+
+
+def _rsi(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+
+
+def _columns(bars: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    return {
+        "close": np.array([b["close"] for b in bars], dtype=float),
+        "high": np.array([b["high"] for b in bars], dtype=float),
+        "low": np.array([b["low"] for b in bars], dtype=float),
+        "volume": np.array([b["volume"] for b in bars], dtype=float),
+        "session": np.array([b["dt"][:8] for b in bars]),
+    }
+
+
+# === 지표 상태 ===
+# seed(cols, bars): 확정 봉 전체를 벡터화 계산해 라인별 시계열을 반환하고 증분 상태를 초기화
+# value(bar): 진행 중인 봉의 값 (확정 상태 + 현재 봉, O(1))
+# commit(bar): 마감된 봉을 확정 상태에 반영 (O(1))
+
+class _SMA:
+    lines = ("value",)
+
+    def __init__(self, period: int):
+        self.n = period
+        self.window: deque = deque()
+        self.total = 0
+
+    def seed(self, cols, bars) -> List[np.ndarray]:
+        self.window = deque(b["close"] for b in bars[max(0, len(bars) - self.n + 1):]) if self.n > 1 else deque()
+        self.total = sum(self.window)
+        return [_sma(cols["close"], self.n)]
+
+    def value(self, bar) -> Value:
+        if len(self.window) < self.n - 1:
+            return None
+        return ((self.total + bar["close"]) / self.n,)
+
+    def commit(self, bar):
+        if self.n == 1:
+            return
+        self.window.append(bar["close"])
+        self.total += bar["close"]
+        if len(self.window) > self.n - 1:
+            self.total -= self.window.popleft()
+
+
+class _Bollinger(_SMA):
+    lines = ("mid", "upper", "lower")
+
+    def __init__(self, period: int, mult: float):
+        super().__init__(period)
+        self.mult = mult
+        self.total_sq = 0
+
+    def seed(self, cols, bars) -> List[np.ndarray]:
+        (mid,) = super().seed(cols, bars)
+        self.total_sq = sum(c * c for c in self.window)
+        std = np.full(len(mid), np.nan)
+        if len(mid) >= self.n:
+            # 프론트 계산과 동일한 모표준편차 (ddof=0)
+            std[self.n - 1:] = sliding_window_view(cols["close"], self.n).std(axis=1)
+        return [mid, mid + self.mult * std, mid - self.mult * std]
+
+    def value(self, bar) -> Value:
+        if len(self.window) < self.n - 1:
+            return None
+        c = bar["close"]
+        mean = (self.total + c) / self.n
+        std = max(0.0, (self.total_sq + c * c) / self.n - mean * mean) ** 0.5
+        return (mean, mean + self.mult * std, mean - self.mult * std)
+
+    def commit(self, bar):
+        if self.n == 1:
+            return
+        c = bar["close"]
+        self.total_sq += c * c
+        if len(self.window) == self.n - 1:
+            self.total_sq -= self.window[0] * self.window[0]
+        super().commit(bar)
+
+
+class _EMA:
+    """SMA(period)로 시작하는 EMA (프론트 calculateEMA와 동일 규칙)"""
+    lines = ("value",)
+
+    def __init__(self, period: int):
+        self.n = period
+        self.alpha = 2.0 / (period + 1)
+        self.prev: Optional[float] = None
+        self.warm: List[int] = []
+
+    def seed(self, cols, bars) -> List[np.ndarray]:
+        close = cols["close"]
+        out = np.full(len(close), np.nan)
+        self.prev, self.warm = None, []
+        if len(close) >= self.n:
+            out[self.n - 1] = close[:self.n].mean()
+            out[self.n:] = _ewm(close[self.n:], self.alpha, out[self.n - 1])
+            self.prev = float(out[-1])
+        else:
+            self.warm = [b["close"] for b in bars]
+        return [out]
+
+    def value(self, bar) -> Value:
+        c = bar["close"]
+        if self.prev is None:
+            return ((sum(self.warm) + c) / self.n,) if len(self.warm) == self.n - 1 else None
+        return (self.prev + self.alpha * (c - self.prev),)
+
+    def commit(self, bar):
+        c = bar["close"]
+        if self.prev is not None:
+            self.prev += self.alpha * (c - self.prev)
+            return
+        self.warm.append(c)
+        if len(self.warm) == self.n:
+            self.prev = sum(self.warm) / self.n
+            self.warm = []
+
+
+class _RSI:
+    """Wilder RSI (첫 평균은 period개 변화량의 단순평균, 프론트 calculateRSI와 동일 규칙)"""
+    lines = ("value",)
+
+    def __init__(self, period: int):
+        self.n = period
+        self.prev_close: Optional[int] = None
+        self.avg_gain: Optional[float] = None
+        self.avg_loss: Optional[float] = None
+        self.warm: List[Tuple[int, int]] = []
+
+    def seed(self, cols, bars) -> List[np.ndarray]:
+        close = cols["close"]
+        out = np.full(len(close), np.nan)
+        self.prev_close = bars[-1]["close"] if bars else None
+        self.avg_gain = self.avg_loss = None
+        self.warm = []
+        diff = np.diff(close)
+        gains, losses = np.maximum(diff, 0.0), np.maximum(-diff, 0.0)
+        if len(diff) >= self.n:
+            ag0, al0 = gains[:self.n].mean(), losses[:self.n].mean()
+            ag = np.concatenate(([ag0], _ewm(gains[self.n:], 1.0 / self.n, ag0)))
+            al = np.concatenate(([al0], _ewm(losses[self.n:], 1.0 / self.n, al0)))
+            out[self.n:] = _rsi(ag, al)
+            self.avg_gain, self.avg_loss = float(ag[-1]), float(al[-1])
+        else:
+            self.warm = [(max(d, 0), max(-d, 0)) for d in
+                         (bars[i]["close"] - bars[i - 1]["close"] for i in range(1, len(bars)))]
+        return [out]
+
+    def _next(self, c) -> Optional[Tuple[float, float]]:
+        d = c - self.prev_close
+        g, l = max(d, 0), max(-d, 0)
+        if self.avg_gain is None:
+            if len(self.warm) < self.n - 1:
+                return None
+            return ((sum(w[0] for w in self.warm) + g) / self.n, (sum(w[1] for w in self.warm) + l) / self.n)
+        return (self.avg_gain + (g - self.avg_gain) / self.n, self.avg_loss + (l - self.avg_loss) / self.n)
+
+    def value(self, bar) -> Value:
+        if self.prev_close is None:
+            return None
+        avg = self._next(bar["close"])
+        if avg is None:
+            return None
+        return (100.0 if avg[1] == 0 else 100.0 - 100.0 / (1.0 + avg[0] / avg[1]),)
+
+    def commit(self, bar):
+        c = bar["close"]
+        if self.prev_close is not None:
+            avg = self._next(c)
+            if avg is not None:
+                self.avg_gain, self.avg_loss = avg
+                self.warm = []
+            else:
+                d = c - self.prev_close
+                self.warm.append((max(d, 0), max(-d, 0)))
+        self.prev_close = c
+
+
+class _VWAP:
+    """일자(dt 앞 8자리)별로 누적하는 VWAP (대표가 = (고+저+종)/3)"""
+    lines = ("value",)
+
+    def __init__(self):
+        self.session = ""
+        self.pv = 0.0
+        self.vol = 0.0
+
+    def seed(self, cols, bars) -> List[np.ndarray]:
+        n = len(cols["close"])
+        tp = (cols["high"] + cols["low"] + cols["close"]) / 3.0
+        vol = cols["volume"]
+        # 세션 시작 위치를 앞으로 전파해 누적합에서 세션 이전 구간을 차감
+        start = np.zeros(n, dtype=np.int64)
+        if n:
+            changes = np.flatnonzero(cols["session"][1:] != cols["session"][:-1]) + 1
+            start[changes] = changes
+            start = np.maximum.accumulate(start)
+        cpv = np.concatenate(([0.0], np.cumsum(tp * vol)))
+        cvol = np.concatenate(([0.0], np.cumsum(vol)))
+        pv = cpv[1:] - cpv[start]
+        sv = cvol[1:] - cvol[start]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = np.where(sv > 0, pv / sv, tp)
+        if n:
+            self.session, self.pv, self.vol = str(cols["session"][-1]), float(pv[-1]), float(sv[-1])
+        else:
+            self.session, self.pv, self.vol = "", 0.0, 0.0
+        return [out]
+
+    def _sums(self, bar) -> Tuple[float, float, float]:
+        tp = (bar["high"] + bar["low"] + bar["close"]) / 3.0
+        if bar["dt"][:8] != self.session:
+            return tp, 0.0, 0.0
+        return tp, self.pv, self.vol
+
+    def value(self, bar) -> Value:
+        tp, pv, vol = self._sums(bar)
+        v = bar["volume"]
+        return ((pv + tp * v) / (vol + v) if vol + v > 0 else tp,)
+
+    def commit(self, bar):
+        tp, pv, vol = self._sums(bar)
+        self.session = bar["dt"][:8]
+        self.pv = pv + tp * bar["volume"]
+        self.vol = vol + bar["volume"]
+
+
+def _make_indicator(name: str):
+    kind, *params = name.split(":")
+    if kind == "ma":
+        return _SMA(int(params[0]))
+    if kind == "ema":
+        return _EMA(int(params[0]))
+    if kind == "rsi":
+        return _RSI(int(params[0]))
+    if kind == "bb":
+        return _Bollinger(int(params[0]), float(params[1]))
+    return _VWAP()
+
+
+def _round(v: Optional[float]) -> Optional[float]:
+    return None if v is None or v != v else round(v, 2)
+
+
+def _to_list(arr: np.ndarray) -> List[Optional[float]]:
+    return [None if v != v else v for v in np.round(arr, 2).tolist()]
+
+
+class IndicatorSeries:
+    """(종목, 타임프레임) 1개의 지표 상태. 같은 시계열을 보는 클라이언트들이 계산 결과를 공유.
+    history: 지표별 라인별 값 리스트 (dts와 길이 동일, 마지막 원소가 진행 중인 봉)"""
+    __slots__ = ("symbol", "timeframe", "indicators", "refs", "clients", "source", "bars",
+                 "dts", "history", "dirty")
+
+    def __init__(self, symbol: str, timeframe: str):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.indicators: Dict[str, Any] = {}
+        self.refs: Dict[str, int] = {}
+        self.clients: Dict[WebSocket, FrozenSet[str]] = {}
+        # 증분 갱신 원천 (CandleBuilder 시계열). None이면 REST 스냅샷 기준 초기 시계열만 제공
+        self.source: Optional[LiveSeries] = None
+        self.bars: List[Dict[str, Any]] = []
+        self.dts: Optional[List[str]] = None
+        self.history: Dict[str, List[List[Optional[float]]]] = {}
+        self.dirty = False
+
+    def seed(self, bars: List[Dict[str, Any]], source: Optional[LiveSeries]):
+        """전체 재계산: 확정 봉은 벡터화 계산, 진행 중인 마지막 봉은 증분 경로로 계산"""
+        self.bars = bars
+        self.source = source
+        closed, forming = bars[:-1], bars[-1] if bars else None
+        cols = _columns(closed)
+        self.dts = [b["dt"] for b in bars]
+        self.history = {}
+        for name, indicator in self.indicators.items():
+            lines = [_to_list(arr) for arr in indicator.seed(cols, closed)]
+            if forming is not None:
+                value = indicator.value(forming)
+                for i, line in enumerate(lines):
+                    line.append(_round(value[i]) if value else None)
+            self.history[name] = lines
+
+    def advance(self, bar: Dict[str, Any], closed: Optional[Dict[str, Any]]):
+        """tick 반영: closed가 있으면 마감 확정 후 새 봉 추가, 진행 중인 봉 값 갱신 (지표당 O(1))"""
+        if closed is not None:
+            for indicator in self.indicators.values():
+                indicator.commit(closed)
+            self.dts.append(bar["dt"])
+            for lines in self.history.values():
+                for line in lines:
+                    line.append(None)
+            if len(self.dts) > MAX_BARS_PER_SERIES:
+                del self.dts[0]
+                for lines in self.history.values():
+                    for line in lines:
+                        del line[0]
+        for name, indicator in self.indicators.items():
+            value = indicator.value(bar)
+            for i, line in enumerate(self.history[name]):
+                line[-1] = _round(value[i]) if value else None
+        self.dirty = True
+
+    def _format(self, name: str, index: Optional[int] = None) -> Any:
+        lines = self.history[name]
+        names = self.indicators[name].lines
+        if index is None:
+            return lines[0] if len(lines) == 1 else dict(zip(names, lines))
+        return lines[0][index] if len(lines) == 1 else {k: line[index] for k, line in zip(names, lines)}
+
+    def snapshot(self, names: Iterable[str]) -> Dict[str, Any]:
+        return {
+            "type": "indicators",
+            "symbol": self.symbol,
+            "timeframe": self.timeframe,
+            "data": {"dt": list(self.dts), "series": {n: self._format(n) for n in names if n in self.history}},
+        }
+
+    def update(self, names: Iterable[str]) -> Dict[str, Any]:
+        return {
+            "type": "indicator",
+            "symbol": self.symbol,
+            "timeframe": self.timeframe,
+            "dt": self.dts[-1],
+            "values": {n: self._format(n, -1) for n in names if n in self.history},
+        }
+
+
+class IndicatorEngine:
+    """[Decision] 서버 측 보조지표 엔진.
+    - 구독 단위는 (종목, 타임프레임) + 지표 목록. 같은 시계열의 지표는 클라이언트 수와 무관하게 1회 계산
+    - 초기 시계열은 차트 스냅샷 전체를 NumPy로 벡터화 계산, 이후 tick/봉 마감마다 지표당 O(1) 증분 갱신
+    - 갱신은 시계열별 dirty 표시 후 multiplexer flush 주기마다 1회 전송 (같은 지표 조합의 클라이언트는 1회 직렬화)
+    - 봉 원천(CandleBuilder 시계열)이 교체되거나 지표가 추가될 때만 전체 재계산"""
+    def __init__(self):
+        self._series: Dict[Tuple[str, str], IndicatorSeries] = {}
+        self._by_symbol: Dict[str, List[IndicatorSeries]] = {}
+        self._client_keys: Dict[WebSocket, Set[Tuple[str, str]]] = {}
+        # 모니터링 카운터
+        self.updates = 0
+        self.reseeds = 0
+        self.flushed = 0
+
+    async def subscribe(self, websocket: WebSocket, symbol: str, timeframe: str, specs: Any,
+                        load_chart: Callable[[str, str], Awaitable[Dict[str, Any]]]) -> List[str]:
+        """클라이언트의 (종목, 타임프레임) 지표 목록 설정 (기존 목록 대체). 적용된 지표 이름 목록 반환 후 전체 시계열 전송"""
+        names: List[str] = []
+        for spec in specs if isinstance(specs, list) else []:
+            name = parse_spec(spec)
+            if name and name not in names:
+                names.append(name)
+        names = names[:MAX_INDICATORS]
+        if not names:
+            self.release(websocket, symbol, timeframe)
+            return []
+
+        key = (symbol, timeframe)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = IndicatorSeries(symbol, timeframe)
+            self._by_symbol.setdefault(symbol, []).append(series)
+        added = self._set_client(series, websocket, frozenset(names))
+
+        if series.dts is None:
+            live = candle_builder.get_series(symbol, timeframe)
+            if live is not None and live.bars:
+                self._reseed(series, live.bars, live)
+            else:
+                chart = await load_chart(symbol, timeframe)
+                # 조회 중 해제/재시드되었으면 무시
+                if self._series.get(key) is not series or websocket not in series.clients:
+                    return names
+                if series.dts is None:
+                    self._reseed(series, sorted((b for b in chart.get("output", []) if b.get("dt")),
+                                                key=lambda b: b["dt"]), None)
+        elif added:
+            self._reseed(series, series.bars, series.source)
+        await ws_manager.send_personal_message(series.snapshot(names), websocket)
+        return names
+
+    def _set_client(self, series: IndicatorSeries, websocket: WebSocket, names: FrozenSet[str]) -> bool:
+        """클라이언트 지표 목록 교체 + 지표별 참조 수 갱신. 새로 계산해야 할 지표가 생기면 True"""
+        previous = series.clients.get(websocket, frozenset())
+        series.clients[websocket] = names
+        self._client_keys.setdefault(websocket, set()).add((series.symbol, series.timeframe))
+        added = False
+        for name in names - previous:
+            series.refs[name] = series.refs.get(name, 0) + 1
+            if name not in series.indicators:
+                series.indicators[name] = _make_indicator(name)
+                added = True
+        for name in previous - names:
+            self._unref(series, name)
+        return added
+
+    @staticmethod
+    def _unref(series: IndicatorSeries, name: str):
+        count = series.refs.get(name, 0) - 1
+        if count > 0:
+            series.refs[name] = count
+            return
+        series.refs.pop(name, None)
+        series.indicators.pop(name, None)
+        series.history.pop(name, None)
+
+    def _reseed(self, series: IndicatorSeries, bars: List[Dict[str, Any]], source: Optional[LiveSeries]):
+        self.reseeds += 1
+        series.seed(bars, source)
+
+    def release(self, websocket: WebSocket, symbol: Optional[str] = None, timeframe: Optional[str] = None):
+        """클라이언트의 지표 구독 해제 (symbol/timeframe 미지정 시 전체). 구독자가 없는 시계열은 삭제"""
+        keys = self._client_keys.get(websocket)
+        if not keys:
+            return
+        for key in [k for k in keys if (symbol is None or k[0] == symbol) and (timeframe is None or k[1] == timeframe)]:
+            keys.discard(key)
+            series = self._series.get(key)
+            if series is None:
+                continue
+            for name in series.clients.pop(websocket, frozenset()):
+                self._unref(series, name)
+            if not series.clients:
+                del self._series[key]
+                siblings = self._by_symbol.get(key[0], [])
+                if series in siblings:
+                    siblings.remove(series)
+                if not siblings:
+                    self._by_symbol.pop(key[0], None)
+        if not keys:
+            del self._client_keys[websocket]
+
+    def on_tick(self, symbol: str):
+        """CandleBuilder가 tick을 반영한 직후 호출: 해당 종목의 지표 시계열을 증분 갱신"""
+        subscribed = self._by_symbol.get(symbol)
+        if not subscribed:
+            return
+        for series in subscribed:
+            live = candle_builder.get_series(symbol, series.timeframe)
+            if live is None or not live.bars or series.dts is None:
+                continue
+            if live is not series.source or not series.dts:
+                # 봉 원천이 새로 seed됨 (REST 스냅샷 → 실시간 시계열 전환 등) → 전체 재계산 후 재전송
+                self._reseed(series, live.bars, live)
+                for websocket, names in series.clients.items():
+                    ws_manager.broadcast_to([websocket], series.snapshot(sorted(names)), droppable=False)
+                continue
+            bars = live.bars
+            bar = bars[-1]
+            closed = None
+            if bar["dt"] != series.dts[-1]:
+                if len(bars) < 2 or bars[-2]["dt"] != series.dts[-1]:
+                    series.source = None   # 예상 밖 불연속 → 다음 tick에서 재계산
+                    continue
+                closed = bars[-2]
+            series.advance(bar, closed)
+            self.updates += 1
+
+    def flush(self):
+        """dirty 시계열의 최신 지표 값을 구독 클라이언트에 전송 (지표 조합별 1회 직렬화, 송신 큐에서 시계열별 conflate)"""
+        for series in self._series.values():
+            if not series.dirty:
+                continue
+            series.dirty = False
+            groups: Dict[FrozenSet[str], List[WebSocket]] = {}
+            for websocket, names in series.clients.items():
+                groups.setdefault(names, []).append(websocket)
+            for names, clients in groups.items():
+                ws_manager.broadcast_to(clients, series.update(sorted(names)),
+                                        key=f"ind:{series.symbol}:{series.timeframe}:{','.join(sorted(names))}")
+            self.flushed += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "series": len(self._series),
+            "indicators": sum(len(s.indicators) for s in self._series.values()),
+            "clients": len(self._client_keys),
+            "updates": self.updates,
+            "reseeds": self.reseeds,
+            "flushed": self.flushed,
+        }
+
+
+indicator_engine = IndicatorEngine()
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def peek_trnm(raw: str) -> Optional[str]:
+    """JSON 파싱 없이 프레임의 trnm 값만 추출 (수신 루프에서 제어 프레임 판별용)"""
+    i = raw.find('"trnm"')
+    if i < 0:
+        return None
+    start = raw.find('"', raw.find(':', i + 6) + 1)
+    end = raw.find('"', start + 1)
+    if start < 0 or end < 0:
+        return None
+    return raw[start + 1:end]
+
+
+class StageStats:
+    """파이프라인 단계별 처리량/폐기/지연 통계"""
+    __slots__ = ("processed", "dropped", "errors", "total_latency", "max_latency")
+
+    def __init__(self):
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, latency: float):
+        self.processed += 1
+        self.total_latency += latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+
+    def get_stats(self, depth: int) -> Dict[str, Any]:
+        return {
+            "depth": depth,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "avg_latency_ms": round(self.total_latency / self.processed * 1000, 3) if self.processed else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 3),
+        }
+
+
+class IngestPipeline:
+    """[Decision] 키움 실시간 수신 파이프라인: reader → (raw queue) → decode → (item queue) → distribute.
+    reader는 수신 시각과 원본 프레임을 큐에 적재만 하고 즉시 다음 프레임을 읽음 → 하위 단계가 느려도 PING 응답/소켓 읽기가 지연되지 않음.
+    과부하 정책: 각 큐가 가득 차면 가장 오래된 항목을 폐기 (실시간 시세는 최신 값이 우선, dropped로 보고)."""
+    def __init__(self, decode: Callable[[str], List[Any]], distribute: Callable[[Any], Awaitable[None]],
+                 raw_queue_size: int = 10000, item_queue_size: int = 10000):
+        self._decode = decode
+        self._distribute = distribute
+        self.raw_queue_size = raw_queue_size
+        self.item_queue_size = item_queue_size
+        # (수신 시각, 원본 프레임) / (수신 시각, 디코딩된 항목)
+        self._raw: Deque[Tuple[float, str]] = deque()
+        self._items: Deque[Tuple[float, Any]] = deque()
+        self._raw_ready: Optional[asyncio.Event] = None
+        self._items_ready: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        # reader: 적재 건수/폐기, decode: 큐 대기 지연, distribute: 수신→전달 완료(end-to-end) 지연
+        self.reader = StageStats()
+        self.decoder = StageStats()
+        self.distributor = StageStats()
+
+    def _ensure_workers(self):
+        if self._tasks and not any(t.done() for t in self._tasks):
+            return
+        for task in self._tasks:
+            task.cancel()
+        self._raw_ready = asyncio.Event()
+        self._items_ready = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._decode_worker()),
+            asyncio.create_task(self._distribute_worker()),
+        ]
+
+    def submit(self, raw: str):
+        """reader 단계: 원본 프레임을 큐에 적재 (대기 없음)"""
+        self._ensure_workers()
+        if len(self._raw) >= self.raw_queue_size:
+            self._raw.popleft()
+            self.reader.dropped += 1
+        self._raw.append((time.monotonic(), raw))
+        self.reader.processed += 1
+        self._raw_ready.set()
+
+    async def _decode_worker(self):
+        while True:
+            while not self._raw:
+                self._raw_ready.clear()
+                await self._raw_ready.wait()
+            received_at, raw = self._raw.popleft()
+            self.decoder.record(time.monotonic() - received_at)
+            try:
+                items = self._decode(raw)
+            except Exception as e:
+                self.decoder.errors += 1
+                logger.debug("실시간 프레임 디코딩 실패: %s", e)
+                items = ()
+            for item in items:
+                if len(self._items) >= self.item_queue_size:
+                    self._items.popleft()
+                    self.distributor.dropped += 1
+                self._items.append((received_at, item))
+            if items:
+                self._items_ready.set()
+            # 큐가 계속 차 있어도 reader/다른 task가 실행되도록 프레임마다 양보
+            await asyncio.sleep(0)
+
+    async def _distribute_worker(self):
+        while True:
+            while not self._items:
+                self._items_ready.clear()
+                await self._items_ready.wait()
+            received_at, item = self._items.popleft()
+            try:
+                await self._distribute(item)
+            except Exception as e:
+                self.distributor.errors += 1
+                logger.error(f"실시간 데이터 전달 실패: {e}")
+            self.distributor.record(time.monotonic() - received_at)
+            await asyncio.sleep(0)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "reader": {"received": self.reader.processed, "dropped": self.reader.dropped},
+            "decode": self.decoder.get_stats(len(self._raw)),
+            "distribute": self.distributor.get_stats(len(self._items)),
+        }
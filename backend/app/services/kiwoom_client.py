@@ -3,14 +3,77 @@ import logging
 import asyncio
 import websockets
 import json
-import re
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any, List, Set
 from app.core.config import settings
+from app.core.cache import AsyncTTLCache
+from app.core.log import chart_log, tick_log, ws_raw_log
+from app.core.rate_limiter import (
+    kiwoom_scheduler, kiwoom_rate_limiter, parse_retry_after, PRIORITY_INTERACTIVE, PRIORITY_BACKFILL,
+    PRIORITY_SCAN,
+)
 from app.services.streamer import multiplexer
+from app.services.candle_builder import candle_builder
+from app.services.indicators import indicator_engine
+from app.services.tick_decoder import Tick, decode_float, decode_numeric, decode_price
+from app.services.ingest import IngestPipeline, peek_trnm
+from app.services.bus import bus_server
+from app.services.reg_batcher import RegBatcher, REALTIME_TYPES, KIND_TRADE, KIND_DEPTH
+from app.services.order_book import OrderBook, order_book_store
+from app.services.candle_store import candle_store
+from app.services.quote_store import quote_store
+from app.services.scanner import market_scanner
 
 logger = logging.getLogger(__name__)
 
+MINUTE_TIMEFRAMES = ["1", "3", "5", "10", "15", "30", "45", "60"]
+
+# [Decision] 차트 스냅샷 캐시 TTL(초): 일/주봉은 장중에도 과거 봉이 변하지 않으므로 길게, 분봉은 짧게
+CHART_CACHE_TTL = {"D": 300.0, "W": 1800.0}
+CHART_CACHE_TTL_MINUTE = 5.0
+# 캐시 메모리 추정용 봉 1개당 바이트 (dict 6필드 + float/str 객체)
+_CHART_BAR_BYTES = 400
+
+
+def _chart_cache_sizeof(data: Dict[str, Any]) -> int:
+    return 256 + len(data.get("output", [])) * _CHART_BAR_BYTES
+
+# 로컬 저장소에서 차트 응답으로 돌려줄 최대 봉 수
+CHART_STORE_MAX_BARS = 2000
+# 과거 차트 연속조회 재개 위치 기억 한도
+_HISTORY_CURSOR_LIMIT = 4096
+# 수정주가 재계산(액면분할 등) 감지 임계치: 겹치는 봉의 종가 차이 비율
+_ADJUSTMENT_TOLERANCE = 0.005
+# 시세 갱신이 있을 수 있는 시간대 (KST HHMM, SOR = KRX + NXT 프리/애프터마켓 포함)
+SESSION_OPEN = "0800"
+SESSION_CLOSE = "2000"
+
+
+def _store_fresh_after(timeframe: str, now: datetime) -> float:
+    """저장소 tail이 이 시각(epoch) 이후에 REST와 동기화됐으면 더 받을 봉이 없음.
+    - 장외: 직전 세션 종료 시각 (다음 개장까지 새 봉/변경 없음)
+    - 장중 분봉: 현재 봉 시작 시각 (확정 봉은 모두 저장됨, 진행 중인 봉은 실시간 체결로 갱신)
+    - 장중 일/주봉: 진행 중인 봉이 계속 바뀌므로 항상 조회"""
+    hhmm = now.strftime('%H%M')
+    if now.weekday() < 5 and SESSION_OPEN <= hhmm < SESSION_CLOSE:
+        if timeframe not in MINUTE_TIMEFRAMES:
+            return now.timestamp()
+        minutes = int(timeframe)
+        total = now.hour * 60 + now.minute
+        bucket = total // minutes * minutes
+        return now.replace(hour=bucket // 60, minute=bucket % 60, second=0, microsecond=0).timestamp()
+    close = now.replace(hour=int(SESSION_CLOSE[:2]), minute=int(SESSION_CLOSE[2:]), second=0, microsecond=0)
+    if now.weekday() >= 5 or hhmm < SESSION_CLOSE:
+        close -= timedelta(days=1)
+    while close.weekday() >= 5:
+        close -= timedelta(days=1)
+    return close.timestamp()
+
+# 수신 루프에서 직접 처리하는 제어 프레임 (그 외는 실시간 데이터로 ingest 파이프라인에 적재)
+_CONTROL_TRNMS = frozenset({'LOGIN', 'PING', 'REG', 'REMOVE'})
+
 class KiwoomClient:
     """SOR(_AL) 지원 및 실시간 WebSocket 시세 수신 클라이언트"""
     _instance = None
@@ -35,10 +98,42 @@ class KiwoomClient:
         # [Decision] 실시간 등록 대기열: WS 연결 전 요청된 종목을 큐잉
         self._pending_symbols: Set[str] = set()
         self._ws_logged_in = False
-        # [Decision] REG 배치 처리: 개별 subscribe 요청을 모아서 한 번에 전송 (105110 초과 방지)
-        self._batch_pending: Set[str] = set()
-        self._batch_task: Optional[asyncio.Task] = None
+        # [Decision] REG 배치 처리: 개별 subscribe 요청을 모아서 전송 (105110 초과 방지)
+        # debounce + 최대 대기, 요청당 종목 수 분할/grp_no 분산, 응답 매칭 후 실패 종목 재시도
+        self.reg_batcher = RegBatcher(
+            self._send_ws, self._wants_registration,
+            debounce=settings.REG_DEBOUNCE_SEC, max_wait=settings.REG_MAX_WAIT_SEC,
+            chunk_size=settings.REG_CHUNK_SIZE, groups=settings.REG_GROUPS,
+            on_give_up=self._on_registration_given_up,
+        )
+        # [Decision] 실시간 구독 참조 카운트 (_AL 코드 → 구독 중인 클라이언트/worker 수)
+        # 0이 되면 grace 기간 후 REMOVE → 잠깐 화면을 바꿨다 돌아오는 경우 REMOVE/REG 반복 방지
+        self._refcounts: Dict[str, int] = {}
+        self._release_at: Dict[str, float] = {}
+        self._removal_task: Optional[asyncio.Task] = None
+        self.removed_count = 0
+        # [Decision] 호가(0D) 등록: opt-in 클라이언트가 있는 종목만, 참조 0이면 즉시 REMOVE (체결 대비 수 배 트래픽)
+        self.depth_symbols: Set[str] = set()
+        self._depth_refcounts: Dict[str, int] = {}
         self._ws_task: Optional[asyncio.Task] = None  # WS task 중복 방지
+        # [Decision] 차트 스냅샷 캐시: (종목, 타임프레임, base_dt) 키, 동시 miss는 1건의 REST 요청으로 병합
+        self.chart_cache = AsyncTTLCache(
+            max_bytes=settings.CHART_CACHE_MAX_MB * 1024 * 1024,
+            sizeof=_chart_cache_sizeof,
+        )
+        # 저장소 tail 마지막 REST 동기화 시각 ((종목, 타임프레임) → epoch). 재시작 후 첫 요청은 조회
+        self._store_synced: Dict[tuple, float] = {}
+        self.tail_fetches = 0
+        self.tail_skips = 0
+        # 과거 차트 연속조회 재개 위치 ((종목, 타임프레임, 받은 가장 오래된 dt) → next-key)
+        self._history_cursors: "OrderedDict[tuple, str]" = OrderedDict()
+        self.history_pages = 0
+        self.history_store_rows = 0
+        # [Decision] 실시간 수신 파이프라인: WS 수신 루프는 적재만, 디코딩/전달은 별도 worker
+        self.ingest = IngestPipeline(
+            self._decode_realtime, self._distribute,
+            raw_queue_size=settings.INGEST_QUEUE_SIZE, item_queue_size=settings.INGEST_QUEUE_SIZE,
+        )
         self._initialized = True
 
     async def get_http_client(self) -> httpx.AsyncClient:
@@ -55,6 +150,7 @@ class KiwoomClient:
             payload = {'grant_type': 'client_credentials', 'appkey': self.api_key, 'secretkey': self.secret_key}
             client = await self.get_http_client()
             try:
+                await kiwoom_scheduler.acquire(PRIORITY_INTERACTIVE)
                 resp = await client.post(url, json=payload)
                 if resp.status_code == 200:
                     self.access_token = resp.json().get("token")
@@ -67,44 +163,196 @@ class KiwoomClient:
                 return False
 
     def clean_val(self, val: Any) -> float:
-        if not val: return 0.0
-        cleaned = re.sub(r'[^\d.]', '', str(val))
-        return float(cleaned) if cleaned else 0.0
+        # 차트/fallback 가격 필드용: 부호(전일 대비 방향)를 제외한 크기 (정규식 없이 디코딩)
+        return abs(decode_float(val))
 
-    async def get_stock_chart(self, stock_code: str, timeframe: str = "D") -> Dict[str, Any]:
-        """SOR(_AL) 대응 및 거래량 포함 데이터 반환"""
-        if not self.access_token: await self.get_access_token()
-        url = f"{self.host}/api/dostk/chart"
+    async def get_stock_chart(self, stock_code: str, timeframe: str = "D",
+                              priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+        """차트 스냅샷 조회 (캐시 hit 시 REST 호출 없이 즉시 반환)"""
+        kst = timezone(timedelta(hours=9))
+        base_dt = datetime.now(kst).strftime('%Y%m%d')
+        symbol = stock_code[:-3] if stock_code.endswith('_AL') else stock_code
+        ttl = CHART_CACHE_TTL.get(timeframe, CHART_CACHE_TTL_MINUTE)
+        # 실패(빈 결과)나 REST 실패로 저장소 데이터만 반환한 경우(stale)는 캐시하지 않아 다음 요청에서 재시도
+        return await self.chart_cache.get_or_load(
+            (symbol, timeframe, base_dt),
+            lambda: self._load_chart_with_store(symbol, timeframe, base_dt, priority),
+            ttl,
+            cacheable=lambda data: bool(data.get("output")) and not data.get("stale"),
+        )
+
+    def is_chart_cached(self, stock_code: str, timeframe: str) -> bool:
         kst = timezone(timedelta(hours=9))
         base_dt = datetime.now(kst).strftime('%Y%m%d')
+        symbol = stock_code[:-3] if stock_code.endswith('_AL') else stock_code
+        return self.chart_cache.get((symbol, timeframe, base_dt)) is not None
+
+    async def get_stored_chart(self, stock_code: str, timeframe: str) -> Optional[Dict[str, Any]]:
+        """로컬 저장소에 있는 차트 데이터 (REST 호출 없음). 없으면 None."""
+        symbol = stock_code[:-3] if stock_code.endswith('_AL') else stock_code
+        bars = await candle_store.load(symbol, timeframe, CHART_STORE_MAX_BARS)
+        return {"output": bars} if bars else None
+
+    def get_chart_cache_stats(self) -> Dict[str, Any]:
+        return {"cache": self.chart_cache.get_stats(), "store": candle_store.get_stats(),
+                "tail_fetches": self.tail_fetches, "tail_skips": self.tail_skips,
+                "history_pages": self.history_pages, "history_store_rows": self.history_store_rows}
+
+    async def _load_chart_with_store(self, symbol: str, timeframe: str, base_dt: str,
+                                     priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+        """[Decision] 로컬 저장소 + 증분 backfill: REST로 저장소 이후 구간만 받아 병합한 뒤 저장소 기준으로 응답.
+        저장소 tail이 타임프레임 기준 최신이면 REST를 호출하지 않고, 아니면 저장된 마지막 봉에 닿을 때까지만
+        연속조회. 저장소에 쌓인 과거 봉은 다시 내려받지 않으며, REST 실패 시 저장된 데이터로 응답(stale)."""
+        key = (symbol, timeframe)
+        last_dt = await candle_store.last_dt(symbol, timeframe)
+        now = datetime.now(timezone(timedelta(hours=9)))
+        if last_dt and self._store_synced.get(key, 0.0) >= _store_fresh_after(timeframe, now):
+            self.tail_skips += 1
+            return {"output": await candle_store.load(symbol, timeframe, CHART_STORE_MAX_BARS)}
+
+        started = time.time()
+        rows = await self._fetch_tail(symbol, timeframe, base_dt, last_dt, priority)
+
+        if rows:
+            if last_dt and await self._is_price_adjusted(symbol, timeframe, rows):
+                # 수정주가 재계산으로 과거 봉 가격이 바뀌었으면 저장분을 폐기하고 새로 쌓음
+                logger.info(f"수정주가 변경 감지 → 저장소 초기화: {symbol} tf={timeframe}")
+                await candle_store.delete(symbol, timeframe)
+                last_dt = None
+            # 저장된 마지막 봉(미완성일 수 있음) 이후 구간만 기록
+            new_rows = [r for r in rows if not last_dt or r["dt"] >= last_dt]
+            await candle_store.upsert(symbol, timeframe, new_rows)
+            self._store_synced[key] = started
+        elif not last_dt:
+            return {"output": rows}
+
+        bars = await candle_store.load(symbol, timeframe, CHART_STORE_MAX_BARS)
+        result: Dict[str, Any] = {"output": bars}
+        if not rows:
+            result["stale"] = True
+        return result
+
+    async def _fetch_tail(self, symbol: str, timeframe: str, base_dt: str, last_dt: Optional[str],
+                          priority: int) -> List[Dict[str, Any]]:
+        """최신 페이지부터 연속조회해 저장된 마지막 봉(last_dt)에 닿으면 중단. 저장소가 비었으면 1페이지만."""
+        rows: List[Dict[str, Any]] = []
+        next_key = ""
+        for _ in range(settings.CHART_HISTORY_MAX_PAGES if last_dt else 1):
+            data = await self._fetch_stock_chart(symbol, timeframe, base_dt, next_key, priority)
+            self.tail_fetches += 1
+            page = data.get("output", [])
+            rows.extend(page)
+            next_key = data.get("next_key", "")
+            if not page or not next_key or not last_dt or min(r["dt"] for r in page) <= last_dt:
+                break
+        return rows
+
+    async def _is_price_adjusted(self, symbol: str, timeframe: str, rows: List[Dict[str, Any]]) -> bool:
+        """REST 응답과 저장소에서 겹치는 가장 오래된 봉의 종가를 비교"""
+        oldest = min(rows, key=lambda r: r["dt"])
+        stored = await candle_store.load_at(symbol, timeframe, oldest["dt"])
+        if stored is None or not stored["close"]:
+            return False
+        return abs(stored["close"] - oldest["close"]) / stored["close"] > _ADJUSTMENT_TOLERANCE
+
+    async def stream_chart_history(self, stock_code: str, timeframe: str, max_bars: int,
+                                   before: Optional[str] = None, max_pages: Optional[int] = None):
+        """[Decision] 클라이언트가 가진 가장 오래된 봉(before) 이전 구간만 max_bars개까지 yield.
+        (rows, has_more) 튜플을 반환. 로컬 저장소에 있는 구간은 REST 없이 먼저 보내고, 부족분만
+        연속조회(cont-yn/next-key)로 이어 받음 → 스크롤할 때마다 이미 받은 페이지를 다시 내려받지 않음.
+        연속조회 위치는 페이지의 가장 오래된 dt로 기억해 다음 요청을 그 페이지부터 재개,
+        기억이 없으면 base_dt=before 날짜부터 조회. 각 페이지는 저장소에도 병합."""
+        kst = timezone(timedelta(hours=9))
+        symbol = stock_code[:-3] if stock_code.endswith('_AL') else stock_code
+        max_bars = min(max_bars, settings.CHART_HISTORY_MAX_BARS)
+        max_pages = max_pages or settings.CHART_HISTORY_MAX_PAGES
+
+        total = 0
+        oldest = before
+        if before:
+            stored = await candle_store.load_before(symbol, timeframe, before, max_bars)
+            if stored:
+                total = len(stored)
+                oldest = stored[0]["dt"]
+                self.history_store_rows += total
+                yield stored, total < max_bars
+                if total >= max_bars:
+                    return
+
+        next_key = self._history_cursors.get((symbol, timeframe, oldest), "") if oldest else ""
+        base_dt = oldest[:8] if oldest and not next_key else datetime.now(kst).strftime('%Y%m%d')
+        for page in range(max_pages):
+            # 과거 차트는 backfill 우선순위 → 화면 차트 요청을 막지 않음
+            data = await self._fetch_stock_chart(symbol, timeframe, base_dt, next_key, PRIORITY_BACKFILL)
+            self.history_pages += 1
+            fetched = data.get("output", [])
+            next_key = data.get("next_key", "")
+            # base_dt 당일 구간 등 이미 가진 봉은 제외
+            rows = [r for r in fetched if not oldest or r["dt"] < oldest]
+            if rows:
+                await candle_store.upsert(symbol, timeframe, rows)
+                oldest = min(r["dt"] for r in rows)
+                self._remember_cursor(symbol, timeframe, oldest, next_key)
+            total += len(rows)
+            has_more = bool(fetched) and bool(next_key) and total < max_bars and page < max_pages - 1
+            if rows or not has_more:
+                yield rows, has_more
+            if not has_more:
+                break
+
+    def _remember_cursor(self, symbol: str, timeframe: str, oldest: str, next_key: str):
+        """(종목, 타임프레임, 페이지의 가장 오래된 dt) → 다음 페이지 next-key (LRU 한도 유지)"""
+        key = (symbol, timeframe, oldest)
+        if next_key:
+            self._history_cursors[key] = next_key
+            self._history_cursors.move_to_end(key)
+            while len(self._history_cursors) > _HISTORY_CURSOR_LIMIT:
+                self._history_cursors.popitem(last=False)
+        else:
+            self._history_cursors.pop(key, None)
+
+    async def _fetch_stock_chart(self, stock_code: str, timeframe: str, base_dt: str,
+                                 next_key: str = "", priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+        """SOR(_AL) 대응 및 거래량 포함 데이터 반환. next_key가 있으면 연속조회 페이지 요청."""
+        if not self.access_token: await self.get_access_token()
+        url = f"{self.host}/api/dostk/chart"
 
         # [Decision] SOR(NXT 포함) 데이터 수신을 위해 종목코드에 _AL 접미사 추가
         sor_code = stock_code if stock_code.endswith('_AL') else f"{stock_code}_AL"
-        logger.info(f"차트 요청 종목코드 (SOR): {sor_code}")
+        if chart_log.allow():
+            logger.info("차트 요청", extra=chart_log.fields(code=sor_code, tf=timeframe, next=bool(next_key)))
         payload = {'stk_cd': sor_code, 'upd_stkpc_tp': '1', 'base_dt': base_dt}
-        if timeframe in ["1", "3", "5", "10", "15", "30", "45", "60"]:
+        if timeframe in MINUTE_TIMEFRAMES:
             api_id = "ka10080"; payload['tic_scope'] = timeframe
         elif timeframe == "W": api_id = "ka10082"
         else: api_id = "ka10081"
 
-        headers = {'Content-Type': 'application/json', 'authorization': f'Bearer {self.access_token}', 'api-id': api_id}
+        headers = {'Content-Type': 'application/json', 'authorization': f'Bearer {self.access_token}', 'api-id': api_id,
+                   'cont-yn': 'Y' if next_key else 'N', 'next-key': next_key}
         client = await self.get_http_client()
 
-        # [Fix] 429 Rate Limit 재시도: 최대 3회, 지수 백오프 (1s→2s→4s)
+        # [Decision] 429는 요청별 고정 백오프 대신 공유 limiter에 알려 전체 속도를 낮춤(AIMD)
+        # → 동시 요청들이 같은 시점에 일제히 재시도하지 않고 스케줄러 순서대로 감속된 속도로 재전송
         for attempt in range(3):
             try:
+                # [Decision] 모든 REST 호출은 중앙 스케줄러에서 계정 단위 rate limit + 우선순위 배정 후 전송
+                await kiwoom_scheduler.acquire(priority)
                 resp = await client.post(url, headers=headers, json=payload)
 
                 if resp.status_code == 429:
-                    wait = 2 ** attempt  # 1, 2, 4초
-                    logger.warning(f"차트 API Rate Limit (429): {sor_code}, {wait}초 후 재시도 (attempt {attempt+1}/3)")
-                    await asyncio.sleep(wait)
+                    retry_after = parse_retry_after(resp.headers.get("retry-after"))
+                    kiwoom_rate_limiter.on_throttle(retry_after)
+                    logger.warning(
+                        f"차트 API Rate Limit (429): {sor_code}, 속도 {kiwoom_rate_limiter.rate:.2f}/s로 감속 "
+                        f"(retry-after={retry_after}, attempt {attempt+1}/3)"
+                    )
                     continue
+                kiwoom_rate_limiter.on_success()
 
                 data = resp.json()
                 raw_list = data.get("stk_min_pole_chart_qry") or data.get("stk_dt_pole_chart_qry") or data.get("stk_stk_pole_chart_qry", [])
 
-                is_minute = timeframe in ["1", "3", "5", "10", "15", "30", "45", "60"]
+                is_minute = timeframe in MINUTE_TIMEFRAMES
                 result = []
                 for d in raw_list:
                     raw_dt = d.get("cntr_tm") or d.get("dt") or ""
@@ -120,7 +368,9 @@ class KiwoomClient:
                         "close": self.clean_val(d.get("cur_prc") or d.get("stck_prpr") or d.get("stck_clpr")),
                         "volume": self.clean_val(d.get("trde_qty") or d.get("acc_trde_qty"))
                     })
-                return {"output": result}
+                # 연속조회 가능 여부: 응답 헤더 cont-yn=Y 이면 next-key로 다음(과거) 페이지 요청
+                resp_next = resp.headers.get("next-key", "") if resp.headers.get("cont-yn") == "Y" else ""
+                return {"output": result, "next_key": resp_next}
 
             except Exception as e:
                 logger.error(f"차트 API 요청 에러 ({sor_code}, attempt {attempt+1}): {e}")
@@ -130,6 +380,59 @@ class KiwoomClient:
         logger.error(f"차트 API 최대 재시도 초과: {sor_code}")
         return {"output": []}
 
+    async def fetch_multi_quotes(self, codes: List[str]) -> List[Dict[str, Any]]:
+        """[Decision] 다종목 시세 조회 (ka10095 관심종목정보, 요청 1건에 '|'로 연결한 여러 종목) → 스캐너용 행 목록.
+        종목당 1요청 대신 chunk 단위로 조회하며, 스캐너 우선순위로 스케줄러를 거쳐 화면 요청을 막지 않음."""
+        if not codes:
+            return []
+        if not self.access_token: await self.get_access_token()
+        url = f"{self.host}/api/dostk/stkinfo"
+        payload = {'stk_cd': '|'.join(codes)}
+        client = await self.get_http_client()
+
+        for attempt in range(3):
+            headers = {'Content-Type': 'application/json;charset=UTF-8', 'authorization': f'Bearer {self.access_token}',
+                       'api-id': 'ka10095'}
+            try:
+                await kiwoom_scheduler.acquire(PRIORITY_SCAN)
+                resp = await client.post(url, headers=headers, json=payload)
+                if resp.status_code == 429:
+                    kiwoom_rate_limiter.on_throttle(parse_retry_after(resp.headers.get("retry-after")))
+                    logger.warning(f"ka10095 Rate Limit (429): {len(codes)}종목, 감속 후 재시도 ({attempt+1}/3)")
+                    continue
+                if resp.status_code != 200:
+                    logger.warning(f"ka10095 응답 오류: {resp.status_code}")
+                    return []
+                kiwoom_rate_limiter.on_success()
+
+                data = resp.json()
+                raw_list = data.get("atn_stk_infr") or next(
+                    (v for v in data.values() if isinstance(v, list)), [])
+                rows = []
+                for d in raw_list:
+                    code = (d.get("stk_cd") or "").strip()
+                    if code.endswith('_AL'):
+                        code = code[:-3]
+                    rows.append({
+                        "code": code,
+                        "price": decode_price(d.get("cur_prc")),
+                        "open": decode_price(d.get("open_pric")),
+                        "high": decode_price(d.get("high_pric")),
+                        "low": decode_price(d.get("low_pric")),
+                        "volume": decode_price(d.get("trde_qty")),
+                        "change_rate": decode_float(d.get("flu_rt")),
+                        # 기준가 = 전일 종가
+                        "prev_close": decode_price(d.get("base_pric")),
+                        # 전일 대비 거래량 비율(%)
+                        "volume_ratio": decode_float(d.get("pred_trde_qty_pre")),
+                    })
+                return rows
+            except Exception as e:
+                logger.error(f"ka10095 요청 에러 (attempt {attempt+1}): {e}")
+                if attempt < 2:
+                    await asyncio.sleep(2 ** attempt)
+        return []
+
     # ──────────────────────────────────────────────────────────
     # [Decision] 키움 WebSocket 실시간 시세: LOGIN → REG → 수신 루프
     # 사용자 제공 프로토콜: trnm=LOGIN/REG/PING, type='00'(주식체결)
@@ -161,10 +464,17 @@ class KiwoomClient:
                     await ws.send(json.dumps(login_msg))
                     logger.info("키움 WebSocket LOGIN 패킷 전송")
 
-                    # 수신 루프
+                    # 수신 루프 (reader): 제어 프레임만 직접 처리, 실시간 데이터는 ingest 파이프라인에 적재
                     async for raw_msg in ws:
-                        # [Debug] 키움 WS 수신 RAW 전체 로깅 (포맷 파악용)
-                        logger.info(f"[WS RAW] {str(raw_msg)[:400]}")
+                        # [Debug] 키움 WS 수신 RAW 로깅 (포맷 파악용) — 기본 비활성, /logs/capture로 샘플링 캡처
+                        if ws_raw_log.allow():
+                            logger.info("[WS RAW]", extra=ws_raw_log.fields(frame=str(raw_msg)[:400]))
+                        if isinstance(raw_msg, bytes):
+                            raw_msg = raw_msg.decode('utf-8', 'replace')
+                        # [Decision] JSON 파싱 없이 trnm만 확인 → 실시간 데이터는 적재 후 즉시 다음 프레임(PING 등) 수신
+                        if peek_trnm(raw_msg) not in _CONTROL_TRNMS:
+                            self.ingest.submit(raw_msg)
+                            continue
                         try:
                             msg = json.loads(raw_msg)
                         except json.JSONDecodeError:
@@ -196,13 +506,17 @@ class KiwoomClient:
                         elif trnm == 'PING':
                             await ws.send(raw_msg)
 
-                        # REG 등록 응답
+                        # REG 등록 응답 → 전송한 배치와 매칭 (실패 종목은 재시도)
                         elif trnm == 'REG':
-                            logger.info(f"실시간 등록 응답: return_code={msg.get('return_code')}, msg={msg.get('return_msg')}")
+                            self.reg_batcher.on_ack(msg)
+
+                        # REMOVE 해지 응답
+                        elif trnm == 'REMOVE':
+                            logger.info(f"실시간 해지 응답: return_code={msg.get('return_code')}, msg={msg.get('return_msg')}")
 
-                        # 실시간 체결 데이터 수신
+                        # 그 외 프레임은 실시간 데이터로 간주
                         else:
-                            await self._handle_realtime_data(msg)
+                            self.ingest.submit(raw_msg)
 
             except websockets.ConnectionClosed as e:
                 logger.warning(f"키움 WebSocket 연결 종료: {e}")
@@ -211,6 +525,8 @@ class KiwoomClient:
             finally:
                 self.ws_connection = None
                 self._ws_logged_in = False
+                # 새 세션에서 LOGIN 후 전체 재등록하므로 전송 중 배치/그룹 배정 초기화
+                self.reg_batcher.reset()
                 # 연속 토큰 실패가 많으면 대기 시간을 늘려 API 부하 방지
                 wait_sec = min(5 * (1 + _token_fail_count // 3), 60)
                 logger.info(f"키움 WebSocket 재연결 대기 ({wait_sec}초)...")
@@ -218,153 +534,262 @@ class KiwoomClient:
 
     async def _flush_pending_symbols(self):
         """LOGIN 성공 후 대기열의 종목을 일괄 등록"""
-        # 기존 subscribed + pending 합산
-        all_symbols = self.subscribed_symbols | self._pending_symbols
+        # [Decision] 현재 관심(참조 카운트 > 0) 종목만 재등록. grace 대기 중이던 종목은 새 세션에 등록하지 않고 해제 확정
+        for symbol in list(self._release_at):
+            self._forget_symbol(symbol)
+        all_symbols = {s for s in self.subscribed_symbols | self._pending_symbols if self._refcounts.get(s, 0) > 0}
         self._pending_symbols.clear()
 
-        if all_symbols:
-            await self._register_symbols(all_symbols)
+        if all_symbols or self.depth_symbols:
+            # 재연결 직후에는 debounce 없이 즉시 chunk 단위로 전송
+            self.reg_batcher.add(all_symbols)
+            self.reg_batcher.add(self.depth_symbols, KIND_DEPTH)
+            await self.reg_batcher.flush()
 
-    async def _register_symbols(self, symbols: Set[str]):
-        """종목 코드 집합을 REG 메시지로 등록"""
+    async def _send_ws(self, msg: Dict[str, Any]) -> bool:
+        """REG/REMOVE 제어 메시지 전송 (미연결/전송 실패 시 False)"""
         if not self.ws_connection or not self._ws_logged_in:
-            self._pending_symbols.update(symbols)
-            return
-
-        # [Decision] type='00' = 주식체결, item = 종목코드 리스트
-        # refresh='1': 기존 등록 유지하고 추가 등록 (공식 샘플 기준)
-        # [Test] type에 "0B"(NXT체결), "01"(호가) 추가 시도 → 어떤 타입으로 데이터가 오는지 확인
-        reg_msg = {
-            'trnm': 'REG',
-            'grp_no': '1',
-            'refresh': '1',
-            'data': [{
-                'item': list(symbols),
-                'type': ['00', '0B']  # [Test] "00"=KRX체결, "0B"=NXT체결 추정
-            }]
-        }
+            return False
         try:
-            await self.ws_connection.send(json.dumps(reg_msg))
-            logger.info(f"실시간 REG 등록 전송: {list(symbols)}")
+            await self.ws_connection.send(json.dumps(msg))
+            return True
         except Exception as e:
-            logger.error(f"REG 등록 전송 실패: {e}")
-            self._pending_symbols.update(symbols)
+            logger.error(f"{msg.get('trnm')} 전송 실패: {e}")
+            return False
+
+    def _wants_registration(self, sor_symbol: str, kind: str) -> bool:
+        # REG 실패 재시도 대상: 여전히 구독 중이고 세션이 살아 있는 종목 (미연결이면 LOGIN 후 전체 재등록)
+        symbols = self.depth_symbols if kind == KIND_DEPTH else self.subscribed_symbols
+        return self._ws_logged_in and sor_symbol in symbols
+
+    def _on_registration_given_up(self, sor_symbol: str, kind: str):
+        # [Fix] 등록 포기 종목을 구독 집합에 남기면 ack 없이 "등록됨"으로 간주되어 재구독해도 REG를 다시 보내지 않음
+        # → 구독 집합에서 제외 (체결은 대기열로 옮겨 재연결 LOGIN 시에도 재등록, 참조 카운트는 유지)
+        if kind == KIND_DEPTH:
+            self.depth_symbols.discard(sor_symbol)
+            return
+        if sor_symbol in self.subscribed_symbols:
+            self.subscribed_symbols.discard(sor_symbol)
+            self._pending_symbols.add(sor_symbol)
 
     async def subscribe_symbol(self, symbol: str):
-        """개별 종목 실시간 구독 등록 (_AL SOR 접미사 자동 적용, 배치 debounce 전송)"""
+        """종목 실시간 구독 참조 추가 (_AL SOR 접미사 자동 적용). 처음 구독되는 종목만 배치 debounce로 REG 전송"""
         # [Decision] SOR(NXT 포함) 실시간 시세를 수신하기 위해 _AL 접미사로 등록
         sor_symbol = symbol if symbol.endswith('_AL') else f"{symbol}_AL"
+        self._refcounts[sor_symbol] = self._refcounts.get(sor_symbol, 0) + 1
+        # grace 대기 중 재구독 → 아직 등록 상태이므로 REMOVE만 취소
+        self._release_at.pop(sor_symbol, None)
+        if sor_symbol in self.subscribed_symbols:
+            return
         self.subscribed_symbols.add(sor_symbol)
         if self._ws_logged_in and self.ws_connection:
-            # [Decision] 즉시 REG 전송 대신 batch 큐에 적재 후 0.5초 debounce로 일괄 전송
-            # → 여러 종목을 연속 구독할 때 REG 건수 초과(105110) 방지
-            self._batch_pending.add(sor_symbol)
-            await self._schedule_batch_reg()
+            # [Decision] 즉시 REG 전송 대신 batcher에 적재 → debounce(최대 대기 보장) 후 일괄 전송
+            # → 여러 종목을 연속 구독할 때 REG 건수 초과(105110) 방지, 첫 tick까지 지연은 max_wait 이내
+            self.reg_batcher.add([sor_symbol])
         else:
             self._pending_symbols.add(sor_symbol)
             logger.info(f"종목 {sor_symbol} 대기열에 추가 (WebSocket 미연결)")
 
-    async def _schedule_batch_reg(self):
-        """0.5초 debounce: 배치로 모인 종목을 한 번에 REG 전송"""
-        if self._batch_task and not self._batch_task.done():
-            self._batch_task.cancel()
-        self._batch_task = asyncio.get_event_loop().create_task(self._flush_batch_reg())
-
-    async def _flush_batch_reg(self):
-        """0.5초 대기 후 batch_pending 종목을 한 번에 REG 등록"""
-        await asyncio.sleep(0.5)
-        if self._batch_pending:
-            symbols_to_reg = set(self._batch_pending)
-            self._batch_pending.clear()
-            await self._register_symbols(symbols_to_reg)
-
-    async def _handle_realtime_data(self, msg: dict):
+    def release_symbol(self, symbol: str):
+        """종목 실시간 구독 참조 해제. 참조가 0이 되면 grace 기간 후 REMOVE 전송"""
+        sor_symbol = symbol if symbol.endswith('_AL') else f"{symbol}_AL"
+        count = self._refcounts.get(sor_symbol, 0) - 1
+        if count > 0:
+            self._refcounts[sor_symbol] = count
+            return
+        self._refcounts.pop(sor_symbol, None)
+        if sor_symbol not in self.subscribed_symbols:
+            return
+        self._release_at[sor_symbol] = time.monotonic() + settings.REALTIME_RELEASE_GRACE_SEC
+        if self._removal_task is None or self._removal_task.done():
+            self._removal_task = asyncio.get_event_loop().create_task(self._run_removals())
+
+    async def _run_removals(self):
+        """grace 기간이 지난 종목을 모아 REMOVE 전송 (대기 종목이 없으면 종료)"""
+        while self._release_at:
+            await asyncio.sleep(max(0.0, min(self._release_at.values()) - time.monotonic()))
+            now = time.monotonic()
+            expired = {s for s, at in self._release_at.items() if at <= now}
+            if not expired:
+                continue
+            # REMOVE는 등록했던 grp_no로 전송 (아직 REG 전송 전인 종목은 대기열에서만 제거)
+            groups: Dict[str, List[str]] = {}
+            for symbol in expired:
+                grp_no = self.reg_batcher.group_of(symbol)
+                if grp_no is not None:
+                    groups.setdefault(grp_no, []).append(symbol)
+                self._forget_symbol(symbol)
+            await self._unregister_symbols(groups)
+
+    def _forget_symbol(self, sor_symbol: str):
+        self._release_at.pop(sor_symbol, None)
+        self.subscribed_symbols.discard(sor_symbol)
+        self._pending_symbols.discard(sor_symbol)
+        self.reg_batcher.discard(sor_symbol)
+        self.removed_count += 1
+
+    async def subscribe_depth(self, symbol: str):
+        """종목 호가(0D) 구독 참조 추가. 처음 구독되는 종목만 REG 전송 (미연결이면 LOGIN 후 등록)"""
+        sor_symbol = symbol if symbol.endswith('_AL') else f"{symbol}_AL"
+        self._depth_refcounts[sor_symbol] = self._depth_refcounts.get(sor_symbol, 0) + 1
+        if sor_symbol in self.depth_symbols:
+            return
+        self.depth_symbols.add(sor_symbol)
+        if self._ws_logged_in and self.ws_connection:
+            self.reg_batcher.add([sor_symbol], KIND_DEPTH)
+
+    def release_depth(self, symbol: str):
+        """종목 호가 구독 참조 해제. 참조가 0이 되면 즉시 REMOVE"""
+        sor_symbol = symbol if symbol.endswith('_AL') else f"{symbol}_AL"
+        count = self._depth_refcounts.get(sor_symbol, 0) - 1
+        if count > 0:
+            self._depth_refcounts[sor_symbol] = count
+            return
+        self._depth_refcounts.pop(sor_symbol, None)
+        if sor_symbol not in self.depth_symbols:
+            return
+        self.depth_symbols.discard(sor_symbol)
+        grp_no = self.reg_batcher.group_of(sor_symbol, KIND_DEPTH)
+        self.reg_batcher.discard(sor_symbol, KIND_DEPTH)
+        order_book_store.drop(sor_symbol[:-3])
+        if grp_no is not None:
+            asyncio.get_event_loop().create_task(self._unregister_symbols({grp_no: [sor_symbol]}, KIND_DEPTH))
+
+    async def subscribe_scanner(self):
+        """전 종목 순위 구독 참조 추가 (첫 참조면 다종목 시세 순환 조회 시작)"""
+        market_scanner.acquire(self.fetch_multi_quotes)
+
+    def release_scanner(self):
+        market_scanner.release()
+
+    async def _unregister_symbols(self, groups: Dict[str, List[str]], kind: str = KIND_TRADE):
+        """grp_no별 종목을 REMOVE 메시지로 해지 (미연결 시 재연결 재등록 대상에서 이미 제외됨)"""
+        chunk = self.reg_batcher.chunk_size
+        for grp_no, symbols in groups.items():
+            for i in range(0, len(symbols), chunk):
+                items = symbols[i:i + chunk]
+                remove_msg = {
+                    'trnm': 'REMOVE',
+                    'grp_no': grp_no,
+                    'refresh': '1',
+                    'data': [{'item': items, 'type': REALTIME_TYPES[kind]}],
+                }
+                if await self._send_ws(remove_msg):
+                    logger.info(f"실시간 REMOVE 해지 전송: grp={grp_no}, {kind} {items}")
+
+    def get_subscription_stats(self) -> Dict[str, Any]:
+        return {
+            "registered": len(self.subscribed_symbols),
+            "referenced": len(self._refcounts),
+            "pending_removal": len(self._release_at),
+            "removed": self.removed_count,
+            "depth": len(self.depth_symbols),
+            "reg": self.reg_batcher.get_stats(),
+        }
+
+    def _decode_realtime(self, raw: str) -> List[Any]:
         """
-        실시간 체결 데이터 파싱 및 브로드캐스트.
+        decode 단계: 실시간 원본 프레임 → Tick(숫자 키) 또는 tick dict(문자열 키 fallback) 목록.
         키움 REST WebSocket 실제 포맷:
           { "data": [{ "item": "005930_AL", "values": { "10": "-73400", "11": "-600", "12": "-0.81",
                         "20": "090000", "13": "1234567", "16": "-73000", "17": "+75000", "18": "-73000" }}]}
         숫자 필드 코드:
           10=현재가, 11=전일대비, 12=등락률, 13=누적거래량
           16=시가, 17=고가, 18=저가, 20=체결시간
+        type='0D'(주식호가잔량)는 종목별 OrderBook을 제자리 갱신하고 해당 OrderBook을 반환 (order_book 참고).
         """
-        try:
-            # [실제 키움 REST WS 포맷] data 배열 처리
-            data_list = msg.get('data', [])
-            if isinstance(data_list, list) and data_list:
-                for entry in data_list:
-                    # entry: { "item": "005930_AL", "values": { "10": ... } }
-                    item_code = entry.get('item', '')
-                    values = entry.get('values', {})
-                    if item_code and values:
-                        await self._parse_and_broadcast_numeric(item_code, values)
-                return
-
-            # fallback: 기존 문자열 키 포맷
-            symbol = msg.get('stk_cd') or msg.get('mksc_shrn_iscd') or msg.get('item', '')
-            if symbol:
-                await self._parse_and_broadcast(msg)
-
-        except Exception as e:
-            logger.debug(f"실시간 데이터 처리 에러: {e} | msg={str(msg)[:300]}")
-
-    async def _parse_and_broadcast_numeric(self, item_code: str, values: dict):
-        """숫자 키 포맷(키움 REST WS 실제 응답)으로 파싱하고 브로드캐스트"""
-        # [Decision] _AL 접미사 제거 → 프론트 매칭
-        symbol = item_code[:-3] if item_code.endswith('_AL') else item_code
-
-        price = self.clean_val(values.get('10', '0'))   # 10 = 현재가
-        if price <= 0:
-            logger.debug(f"tick 가격 없음: {symbol}")
+        msg = json.loads(raw)
+
+        # [실제 키움 REST WS 포맷] data 배열 처리
+        data_list = msg.get('data', [])
+        if isinstance(data_list, list) and data_list:
+            ticks = []
+            for entry in data_list:
+                # entry: { "item": "005930_AL", "values": { "10": ... } }
+                item_code = entry.get('item', '')
+                values = entry.get('values', {})
+                if not (item_code and values):
+                    continue
+                if entry.get('type') == '0D':
+                    book = order_book_store.apply(item_code, values)
+                    if book is not None:
+                        ticks.append(book)
+                    continue
+                # [Decision] 전용 디코더로 부호 포함 파싱 (필드당 정규식 3단계 → int()/float() 1회), pydantic 검증은 선택
+                tick = decode_numeric(item_code, values)
+                if tick is None:
+                    logger.debug("tick 가격 없음: %s", item_code)
+                    continue
+                ticks.append(tick)
+            return ticks
+
+        # fallback: 기존 문자열 키 포맷
+        tick_data = self._normalize_legacy(msg)
+        return [tick_data] if tick_data else []
+
+    async def get_quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """종목별 당일 최신 시세 (체결이 없었던 종목은 제외)"""
+        return quote_store.get_many(s[:-3] if s.endswith('_AL') else s for s in symbols)
+
+    async def _distribute(self, item: Any):
+        """distribute 단계: 최신 시세/실시간 봉 갱신 및 구독 클라이언트 전송"""
+        if isinstance(item, OrderBook):
+            # 호가: flush 주기마다 최신 상태 1건만 전송 (conflation)
+            multiplexer.handle_depth(item)
             return
-
-        kst = timezone(timedelta(hours=9))
-        timestamp = values.get('20', datetime.now(kst).strftime('%H%M%S'))  # 20 = 체결시간
-
-        tick_data = {
-            'symbol': symbol,
-            'price': int(price),
-            'open': int(self.clean_val(values.get('16', '0') or str(price))),   # 16=시가
-            'high': int(self.clean_val(values.get('17', '0') or str(price))),   # 17=고가
-            'low': int(self.clean_val(values.get('18', '0') or str(price))),    # 18=저가
-            'volume': int(self.clean_val(values.get('13', '0'))),               # 13=누적거래량
-            'change_rate': float(self.clean_val(values.get('12', '0'))),        # 12=등락률
-            'timestamp': str(timestamp),
-        }
-
-        logger.info(f"틱 브로드캐스트: {symbol} @ {int(price)}원 (vol={tick_data['volume']})")
-        await multiplexer.handle_kiwoom_tick(tick_data)
-
-    async def _parse_and_broadcast(self, d: dict):
+        if isinstance(item, Tick):
+            # conflation 이전 원본 tick으로 최신 시세 테이블 갱신 (구독 여부와 무관하게 등록된 전 종목)
+            quote_store.update(item)
+            market_scanner.on_tick(item)
+            # [Decision] 서버 측 실시간 봉 갱신 (conflation 이전 원본 tick 기준)
+            candle_builder.on_tick(item.symbol, item.price, item.open, item.high, item.low,
+                                   item.volume, item.timestamp)
+            indicator_engine.on_tick(item.symbol)
+            if tick_log.allow():
+                logger.info("틱 브로드캐스트", extra=tick_log.fields(
+                    symbol=item.symbol, price=item.price, volume=item.volume))
+            await multiplexer.handle_tick(item)
+            # [Decision] ingest 모드: 원본 tick을 web worker에 publish (conflation/fan-out은 worker별 수행)
+            if bus_server.running:
+                bus_server.publish_tick(item)
+        else:
+            if tick_log.allow():
+                logger.info("틱 브로드캐스트 (문자열 키)", extra=tick_log.fields(
+                    symbol=item['symbol'], price=item['price']))
+            await multiplexer.handle_kiwoom_tick(item)
+            tick = Tick.from_dict(item)
+            quote_store.update(tick)
+            market_scanner.on_tick(tick)
+            if bus_server.running:
+                bus_server.publish_tick(tick)
+
+    def _normalize_legacy(self, d: dict) -> Optional[Dict[str, Any]]:
         """기존 문자열 키 포맷 체결 데이터 파싱 (fallback)"""
         symbol = d.get('stk_cd') or d.get('mksc_shrn_iscd') or d.get('item', '')
         if not symbol:
-            return
+            return None
 
         if symbol.endswith('_AL'):
             symbol = symbol[:-3]
 
         price = self.clean_val(d.get('cur_prc') or d.get('stck_prpr') or d.get('price'))
         if price <= 0:
-            logger.debug(f"tick 가격 없음, skip: symbol={symbol}")
-            return
+            logger.debug("tick 가격 없음, skip: symbol=%s", symbol)
+            return None
 
         kst = timezone(timedelta(hours=9))
         now = datetime.now(kst)
         timestamp = d.get('cntr_tm') or d.get('stck_cntg_hour') or now.strftime('%H%M%S')
 
-        tick_data = {
+        return {
             'symbol': symbol,
             'price': int(price),
             'open': int(self.clean_val(d.get('open_pric') or d.get('stck_oprc') or d.get('open') or price)),
             'high': int(self.clean_val(d.get('high_pric') or d.get('stck_hgpr') or d.get('high') or price)),
             'low': int(self.clean_val(d.get('low_pric') or d.get('stck_lwpr') or d.get('low') or price)),
             'volume': int(self.clean_val(d.get('acc_trde_qty') or d.get('acml_vol') or d.get('volume') or 0)),
-            'change_rate': float(d.get('fluc_rt') or d.get('prdy_ctrt') or 0),
+            'change_rate': decode_float(d.get('fluc_rt') or d.get('prdy_ctrt')),
             'timestamp': str(timestamp),
         }
 
-        logger.info(f"통 브로드캐스트: {symbol} @ {int(price)}원")
-        await multiplexer.handle_kiwoom_tick(tick_data)
-
 kiwoom_client = KiwoomClient()
@@ -0,0 +1,6 @@
+from app.core.config import settings
+from app.services.bus import DEPLOY_WEB, remote_market
+from app.services.kiwoom_client import kiwoom_client
+
+# [Decision] 차트/구독/시세 요청 대상: web 모드는 bus 경유 ingest 프로세스, 그 외는 프로세스 내 키움 클라이언트 (동일 인터페이스)
+market = remote_market if settings.DEPLOY_MODE == DEPLOY_WEB else kiwoom_client
@@ -0,0 +1,100 @@
+from array import array
+from typing import Any, Dict, Optional
+
+from app.services.tick_decoder import decode_price
+
+DEPTH_LEVELS = 10
+
+# 키움 실시간 주식호가잔량(0D) 필드 코드
+_ASK_PRICE = tuple(str(41 + i) for i in range(DEPTH_LEVELS))   # 41~50 = 매도호가1~10
+_BID_PRICE = tuple(str(51 + i) for i in range(DEPTH_LEVELS))   # 51~60 = 매수호가1~10
+_ASK_QTY = tuple(str(61 + i) for i in range(DEPTH_LEVELS))     # 61~70 = 매도호가수량1~10
+_BID_QTY = tuple(str(71 + i) for i in range(DEPTH_LEVELS))     # 71~80 = 매수호가수량1~10
+_TOTAL_ASK = "121"                                             # 매도호가총잔량
+_TOTAL_BID = "125"                                             # 매수호가총잔량
+_TIME = "21"                                                   # 호가시간
+
+
+class OrderBook:
+    """[Decision] 종목별 10단계 호가. 가격/잔량을 고정 길이 array로 보관하고 메시지에 온 필드만 제자리 갱신
+    (호가 메시지는 체결의 수 배 빈도 → 메시지마다 호가 목록을 새로 만들지 않음)."""
+    __slots__ = ("symbol", "ask_price", "bid_price", "ask_qty", "bid_qty",
+                 "total_ask", "total_bid", "timestamp", "updates")
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.ask_price = array('q', bytes(8 * DEPTH_LEVELS))
+        self.bid_price = array('q', bytes(8 * DEPTH_LEVELS))
+        self.ask_qty = array('q', bytes(8 * DEPTH_LEVELS))
+        self.bid_qty = array('q', bytes(8 * DEPTH_LEVELS))
+        self.total_ask = 0
+        self.total_bid = 0
+        self.timestamp = ""
+        self.updates = 0
+
+    def apply(self, values: Dict[str, Any]):
+        """실시간 0D values 반영 (없는 필드는 이전 값 유지)"""
+        get = values.get
+        for i in range(DEPTH_LEVELS):
+            v = get(_ASK_PRICE[i])
+            if v is not None:
+                self.ask_price[i] = decode_price(v)
+            v = get(_BID_PRICE[i])
+            if v is not None:
+                self.bid_price[i] = decode_price(v)
+            v = get(_ASK_QTY[i])
+            if v is not None:
+                self.ask_qty[i] = decode_price(v)
+            v = get(_BID_QTY[i])
+            if v is not None:
+                self.bid_qty[i] = decode_price(v)
+        v = get(_TOTAL_ASK)
+        if v is not None:
+            self.total_ask = decode_price(v)
+        v = get(_TOTAL_BID)
+        if v is not None:
+            self.total_bid = decode_price(v)
+        v = get(_TIME)
+        if v:
+            self.timestamp = str(v)
+        self.updates += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """depth 메시지 data: 호가 단계별 [가격, 잔량] (가격이 없는 단계는 제외, 1호가부터)"""
+        return {
+            "asks": [[p, q] for p, q in zip(self.ask_price, self.ask_qty) if p],
+            "bids": [[p, q] for p, q in zip(self.bid_price, self.bid_qty) if p],
+            "totalAsk": self.total_ask,
+            "totalBid": self.total_bid,
+            "timestamp": self.timestamp,
+        }
+
+
+class OrderBookStore:
+    """호가 등록(opt-in) 종목의 OrderBook 보관"""
+    def __init__(self):
+        self._books: Dict[str, OrderBook] = {}
+        self.messages = 0
+
+    def apply(self, item_code: str, values: Dict[str, Any]) -> Optional[OrderBook]:
+        if not (item_code and values):
+            return None
+        symbol = item_code[:-3] if item_code.endswith('_AL') else item_code
+        book = self._books.get(symbol)
+        if book is None:
+            book = self._books[symbol] = OrderBook(symbol)
+        book.apply(values)
+        self.messages += 1
+        return book
+
+    def get(self, symbol: str) -> Optional[OrderBook]:
+        return self._books.get(symbol)
+
+    def drop(self, symbol: str):
+        self._books.pop(symbol, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"symbols": len(self._books), "messages": self.messages}
+
+
+order_book_store = OrderBookStore()
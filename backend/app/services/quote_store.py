@@ -0,0 +1,96 @@
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.services.tick_decoder import KST, Tick
+
+
+def _next_kst_midnight() -> float:
+    now = datetime.now(KST)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight.timestamp()
+
+
+class QuoteStore:
+    """[Decision] 당일 체결이 있었던 종목의 최신 시세 테이블.
+    종목 → 행 번호 dict + 필드별 array 컬럼 → tick당 갱신은 행 1개의 값 대입(O(1)), 종목별 dict/객체를 만들지 않음.
+    구독 직후/재연결 시 다음 체결을 기다리지 않고 현재가를 바로 보내는 용도. KST 자정에 초기화."""
+    def __init__(self):
+        self._index: Dict[str, int] = {}
+        self._symbols: List[str] = []
+        self._price = array('q')
+        self._open = array('q')
+        self._high = array('q')
+        self._low = array('q')
+        self._volume = array('q')
+        self._change_rate = array('d')
+        self._timestamp: List[str] = []
+        self._updated_at = array('d')
+        self._reset_at = _next_kst_midnight()
+        self.updates = 0
+
+    def _reset(self):
+        self.__init__()
+
+    def update(self, tick: Tick):
+        now = time.time()
+        if now >= self._reset_at:
+            self._reset()
+        self.updates += 1
+        row = self._index.get(tick.symbol)
+        if row is None:
+            self._index[tick.symbol] = len(self._symbols)
+            self._symbols.append(tick.symbol)
+            self._price.append(tick.price)
+            self._open.append(tick.open)
+            self._high.append(tick.high)
+            self._low.append(tick.low)
+            self._volume.append(tick.volume)
+            self._change_rate.append(tick.change_rate)
+            self._timestamp.append(tick.timestamp)
+            self._updated_at.append(now)
+            return
+        self._price[row] = tick.price
+        self._open[row] = tick.open
+        self._high[row] = tick.high
+        self._low[row] = tick.low
+        # 누적거래량은 단조 증가 → 순서가 뒤바뀐 체결에도 후퇴하지 않도록 최댓값 유지
+        if tick.volume > self._volume[row]:
+            self._volume[row] = tick.volume
+        self._change_rate[row] = tick.change_rate
+        self._timestamp[row] = tick.timestamp
+        self._updated_at[row] = now
+
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """종목의 최신 시세 (tick 메시지 data와 동일 필드). 당일 체결이 없으면 None"""
+        if time.time() >= self._reset_at:
+            self._reset()
+        row = self._index.get(symbol)
+        if row is None:
+            return None
+        return {
+            "symbol": symbol,
+            "price": self._price[row],
+            "open": self._open[row],
+            "high": self._high[row],
+            "low": self._low[row],
+            "volume": self._volume[row],
+            "change_rate": self._change_rate[row],
+            "timestamp": self._timestamp[row],
+        }
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """여러 종목 일괄 조회 (시세가 없는 종목은 결과에서 제외)"""
+        result = {}
+        for symbol in symbols:
+            quote = self.get(symbol)
+            if quote is not None:
+                result[symbol] = quote
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"symbols": len(self._symbols), "updates": self.updates}
+
+
+quote_store = QuoteStore()
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 실시간 등록 종류 → 키움 실시간 타입
+KIND_TRADE = "trade"   # "00"=KRX체결, "0B"=NXT체결
+KIND_DEPTH = "depth"   # "0D"=주식호가잔량 (opt-in 종목만)
+REALTIME_TYPES = {KIND_TRADE: ['00', '0B'], KIND_DEPTH: ['0D']}
+
+
+class RegBatch:
+    """전송된 REG 1건 (ack 대기)"""
+    __slots__ = ("grp_no", "kind", "items", "attempt", "queued_at", "sent_at", "timeout")
+
+    def __init__(self, grp_no: str, kind: str, items: List[str], attempt: int, queued_at: float):
+        self.grp_no = grp_no
+        self.kind = kind
+        self.items = items
+        self.attempt = attempt
+        self.queued_at = queued_at
+        self.sent_at = 0.0
+        self.timeout: Optional[asyncio.TimerHandle] = None
+
+
+class RegBatcher:
+    """[Decision] 실시간 REG 배치 전송기.
+    - debounce + 최대 대기(max_wait): 구독 요청이 계속 들어와도 첫 요청 후 max_wait 안에 반드시 전송
+    - 요청당 종목 수 제한(chunk_size)으로 분할하고, 종목 수가 가장 적은 grp_no에 배정해 그룹별로 분산
+    - REG 응답(ack)을 전송 순서(FIFO, grp_no가 오면 grp_no 우선)로 배치와 매칭 → 실패/무응답 배치는 backoff 후 재시도
+    체결/호가 등록은 종류(kind)별 배치로 나뉘지만 응답 순서를 공유하므로 하나의 batcher에서 관리."""
+    def __init__(self, send: Callable[[Dict[str, Any]], Awaitable[bool]], is_wanted: Callable[[str, str], bool],
+                 debounce: float = 0.05, max_wait: float = 0.3, chunk_size: int = 100, groups: int = 5,
+                 ack_timeout: float = 5.0, max_retries: int = 3, retry_backoff: float = 0.5,
+                 on_give_up: Optional[Callable[[str, str], None]] = None):
+        self._send = send
+        self._is_wanted = is_wanted
+        # 재시도 한도 초과로 등록을 포기한 (종목, kind) 통지 → 호출 측이 구독 상태에서 제외해 이후 재등록 가능하게 함
+        self._on_give_up = on_give_up
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.chunk_size = max(1, chunk_size)
+        self.groups = [str(i) for i in range(1, max(1, groups) + 1)]
+        self.ack_timeout = ack_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        # 전송 대기 (kind, 종목) → 재시도 횟수
+        self._pending: Dict[Tuple[str, str], int] = {}
+        self._first_at = 0.0
+        self._last_at = 0.0
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight: Deque[RegBatch] = deque()
+        # 등록된 (kind, 종목)의 grp_no (REMOVE는 등록한 그룹으로 전송)
+        self._group_of: Dict[Tuple[str, str], str] = {}
+        self._group_size: Dict[str, int] = {g: 0 for g in self.groups}
+        # 모니터링 카운터
+        self.sent = 0
+        self.acked = 0
+        self.failed = 0
+        self.retried = 0
+        self.given_up = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def add(self, symbols: Iterable[str], kind: str = KIND_TRADE, attempt: int = 0):
+        """전송 대기열에 추가 (이미 등록/전송 중인 종목은 무시)"""
+        now = time.monotonic()
+        added = False
+        for symbol in symbols:
+            key = (kind, symbol)
+            if key in self._group_of or key in self._pending:
+                continue
+            if not self._pending:
+                self._first_at = now
+            self._pending[key] = attempt
+            added = True
+        if not added:
+            return
+        self._last_at = now
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        elif len(self._pending) >= self.chunk_size:
+            self._wake.set()
+
+    def discard(self, symbol: str, kind: str = KIND_TRADE):
+        """해제된 종목: 대기열 및 그룹 배정에서 제거"""
+        key = (kind, symbol)
+        self._pending.pop(key, None)
+        grp_no = self._group_of.pop(key, None)
+        if grp_no is not None:
+            self._group_size[grp_no] -= 1
+
+    def group_of(self, symbol: str, kind: str = KIND_TRADE) -> Optional[str]:
+        return self._group_of.get((kind, symbol))
+
+    def reset(self):
+        """연결 종료 시: 새 세션에서 전체 재등록하므로 대기/전송 중/그룹 상태 초기화"""
+        for batch in self._in_flight:
+            if batch.timeout:
+                batch.timeout.cancel()
+        self._in_flight.clear()
+        self._pending.clear()
+        self._group_of.clear()
+        self._group_size = {g: 0 for g in self.groups}
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    def _deadline(self) -> float:
+        if len(self._pending) >= self.chunk_size:
+            return 0.0
+        return min(self._last_at + self.debounce, self._first_at + self.max_wait)
+
+    async def _run(self):
+        while self._pending:
+            delay = self._deadline() - time.monotonic()
+            if delay > 0:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.flush()
+
+    async def flush(self):
+        """대기 종목을 chunk 단위 REG로 즉시 전송"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        queued_at = self._first_at
+        batches: Dict[Tuple[str, int], List[str]] = {}
+        for (kind, symbol), attempt in pending.items():
+            batches.setdefault((kind, attempt), []).append(symbol)
+        for (kind, attempt), symbols in batches.items():
+            for i in range(0, len(symbols), self.chunk_size):
+                await self._send_batch(kind, symbols[i:i + self.chunk_size], attempt, queued_at)
+
+    async def _send_batch(self, kind: str, items: List[str], attempt: int, queued_at: float):
+        grp_no = min(self.groups, key=lambda g: self._group_size[g])
+        batch = RegBatch(grp_no, kind, items, attempt, queued_at)
+        for symbol in items:
+            self._group_of[(kind, symbol)] = grp_no
+        self._group_size[grp_no] += len(items)
+        msg = {
+            'trnm': 'REG',
+            'grp_no': grp_no,
+            'refresh': '1',   # 기존 등록 유지하고 추가 등록
+            'data': [{'item': items, 'type': REALTIME_TYPES[kind]}],
+        }
+        batch.sent_at = time.monotonic()
+        self._in_flight.append(batch)
+        self.sent += 1
+        if not await self._send(msg):
+            self._in_flight.remove(batch)
+            self._fail(batch, "send failed")
+            return
+        batch.timeout = asyncio.get_event_loop().call_later(self.ack_timeout, self._on_timeout, batch)
+        logger.info(f"실시간 REG 등록 전송: grp={grp_no}, {kind} {len(items)}종목 (attempt {attempt})")
+
+    def on_ack(self, msg: Dict[str, Any]):
+        """REG 응답 처리: 전송 순서대로 배치와 매칭 (응답에 grp_no가 있으면 해당 그룹의 가장 오래된 배치)"""
+        grp_no = msg.get('grp_no')
+        batch = next((b for b in self._in_flight if b.grp_no == str(grp_no)), None) if grp_no else None
+        if batch is None and self._in_flight:
+            batch = self._in_flight[0]
+        if batch is None:
+            logger.info(f"실시간 등록 응답 (대기 배치 없음): return_code={msg.get('return_code')}")
+            return
+        self._in_flight.remove(batch)
+        if batch.timeout:
+            batch.timeout.cancel()
+        return_code = msg.get('return_code')
+        if str(return_code) != '0':
+            self._fail(batch, f"{msg.get('return_msg')} [CODE={return_code}]")
+            return
+        self.acked += 1
+        latency = time.monotonic() - batch.queued_at
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        logger.info(f"실시간 등록 완료: grp={batch.grp_no}, {len(batch.items)}종목, {latency * 1000:.0f}ms")
+
+    def _on_timeout(self, batch: RegBatch):
+        if batch in self._in_flight:
+            self._in_flight.remove(batch)
+            self._fail(batch, "ack timeout")
+
+    def _fail(self, batch: RegBatch, reason: str):
+        """실패 배치: 아직 필요한 종목만 backoff 후 재전송 (max_retries 초과 시 포기)"""
+        self.failed += 1
+        for symbol in batch.items:
+            if self._group_of.get((batch.kind, symbol)) == batch.grp_no:
+                self.discard(symbol, batch.kind)
+        retry = [s for s in batch.items if self._is_wanted(s, batch.kind)]
+        if not retry:
+            return
+        if batch.attempt >= self.max_retries:
+            self.given_up += len(retry)
+            logger.error(f"실시간 REG 등록 포기 ({reason}): {retry}")
+            if self._on_give_up:
+                for symbol in retry:
+                    self._on_give_up(symbol, batch.kind)
+            return
+        self.retried += len(retry)
+        delay = self.retry_backoff * 2 ** batch.attempt
+        logger.warning(f"실시간 REG 실패 ({reason}) → {delay}초 후 재시도: {len(retry)}종목")
+        asyncio.get_event_loop().call_later(delay, self._retry, retry, batch.kind, batch.attempt + 1)
+
+    def _retry(self, symbols: List[str], kind: str, attempt: int):
+        self.add([s for s in symbols if self._is_wanted(s, kind)], kind, attempt)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "in_flight": len(self._in_flight),
+            "sent": self.sent,
+            "acked": self.acked,
+            "failed": self.failed,
+            "retried": self.retried,
+            "given_up": self.given_up,
+            "groups": dict(self._group_size),
+            "avg_ack_latency_ms": round(self.total_latency / self.acked * 1000, 1) if self.acked else 0.0,
+            "max_ack_latency_ms": round(self.max_latency * 1000, 1),
+        }
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.api.websocket import ws_manager
+from app.core.config import settings
+from app.services.stock_master import get_master_status, get_stock_master
+from app.services.tick_decoder import Tick
+
+logger = logging.getLogger(__name__)
+
+# 거래량 급증 순위 대상 최소 누적거래량 (전일 거래량이 매우 적은 종목의 배율 왜곡 방지)
+MIN_SURGE_VOLUME = 10000
+
+# 순위 종류 → movers 메시지 키
+RANK_GAINERS = "gainers"
+RANK_LOSERS = "losers"
+RANK_VOLUME = "volumeSurge"
+RANK_GAP = "gap"
+
+QuoteRow = Dict[str, Any]
+
+
+def _top(values: np.ndarray, n: int) -> np.ndarray:
+    """값이 큰 순서로 상위 n개 행 번호 (NaN 제외). 전체 정렬 대신 argpartition 후 n개만 정렬"""
+    finite = np.isfinite(values)
+    k = min(n, int(finite.sum()))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    keyed = np.where(finite, values, -np.inf)
+    idx = np.argpartition(-keyed, k - 1)[:k]
+    return idx[np.argsort(-keyed[idx], kind="stable")]
+
+
+class MarketScanner:
+    """[Decision] 전 종목 mover 스캐너.
+    - 시장 전체 상태를 종목 마스터 위치로 인덱싱한 NumPy 컬럼으로 보관 (종목별 dict/객체 없음)
+    - 다종목 시세 REST(요청당 chunk_size 종목)를 스케줄러 최하위 우선순위로 순환 조회 → 차트 요청을 막지 않음
+    - 실시간 등록 종목은 tick마다 해당 행만 갱신, 순위는 컬럼 전체를 1회 훑어 argpartition으로 상위 N개만 정렬
+    - tick으로 바뀐 순위는 멀티플렉서 flush 주기마다(최대 1회) 전송, 순환 조회는 최근 체결이 없는 종목만
+    - 순위가 바뀐 경우에만 전송, 컬럼 재구성은 종목 마스터가 교체될 때만 수행
+    구독자(클라이언트/worker)가 있을 때만 순환 조회."""
+    def __init__(self):
+        self._version = -1
+        self._codes: List[str] = []
+        self._names: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._alloc(0)
+        self._fetch: Optional[Callable[[List[str]], Awaitable[List[QuoteRow]]]] = None
+        self._refs = 0
+        self._task: Optional[asyncio.Task] = None
+        self._dirty = False
+        self.last: Optional[Dict[str, Any]] = None
+        self._last_key: Optional[tuple] = None
+        # 순위 메시지를 추가로 받을 listener (ingest 모드: web worker로 publish)
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
+        # 모니터링 카운터
+        self.requests = 0
+        self.rows_updated = 0
+        self.ticks = 0
+        self.sweeps = 0
+        self.published = 0
+        self.rebuilds = 0
+
+    def _alloc(self, n: int):
+        self._price = np.zeros(n, dtype=np.int64)
+        self._open = np.zeros(n, dtype=np.int64)
+        self._high = np.zeros(n, dtype=np.int64)
+        self._low = np.zeros(n, dtype=np.int64)
+        self._volume = np.zeros(n, dtype=np.int64)
+        self._prev_close = np.zeros(n, dtype=np.int64)
+        self._prev_volume = np.zeros(n, dtype=np.float64)
+        self._change_rate = np.full(n, np.nan)
+        self._updated_at = np.zeros(n, dtype=np.float64)
+        self._ticked_at = np.zeros(n, dtype=np.float64)
+
+    def _ensure_columns(self):
+        """종목 마스터 버전이 바뀌었으면 컬럼을 새 마스터 순서로 재구성 (기존 종목의 값은 이관)"""
+        version = get_master_status()["version"]
+        if version == self._version and self._codes:
+            return
+        master = get_stock_master()
+        old_index = self._index
+        old = (self._price, self._open, self._high, self._low, self._volume, self._prev_close,
+               self._prev_volume, self._change_rate, self._updated_at, self._ticked_at)
+        self._codes = [s["code"] for s in master]
+        self._names = [s["name"] for s in master]
+        self._index = {code: i for i, code in enumerate(self._codes)}
+        self._alloc(len(self._codes))
+        if old_index:
+            pairs = [(i, old_index[c]) for i, c in enumerate(self._codes) if c in old_index]
+            if pairs:
+                new_rows, old_rows = (np.array(p, dtype=np.int64) for p in zip(*pairs))
+                new = (self._price, self._open, self._high, self._low, self._volume, self._prev_close,
+                       self._prev_volume, self._change_rate, self._updated_at, self._ticked_at)
+                for dst, src in zip(new, old):
+                    dst[new_rows] = src[old_rows]
+        self._version = version
+        self._dirty = True
+        self.rebuilds += 1
+        logger.info(f"스캐너 컬럼 재구성: {len(self._codes)}종목 (master v{version})")
+
+    # === 구독 참조 ===
+
+    def acquire(self, fetch: Callable[[List[str]], Awaitable[List[QuoteRow]]]):
+        """순위 구독 참조 추가. 첫 참조면 순환 조회 시작"""
+        self._fetch = fetch
+        self._refs += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def release(self):
+        """순위 구독 참조 해제. 0이 되면 순환 조회 중단 (컬럼 값은 유지 → 재구독 시 즉시 전송)"""
+        self._refs = max(0, self._refs - 1)
+        if self._refs == 0 and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while self._refs > 0:
+            started = time.monotonic()
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"스캐너 조회 실패: {e}")
+            self.sweeps += 1
+            # 전체 1회 순환 후 다음 순환까지 최소 간격 유지 (REST 예산 보호)
+            await asyncio.sleep(max(0.0, settings.SCANNER_SWEEP_SEC - (time.monotonic() - started)))
+
+    async def sweep(self):
+        """최근 체결이 없는 종목을 chunk 단위 다종목 시세 요청으로 1회 순환 (chunk마다 반영 후 순위 변경 시 전송).
+        [Fix] 실시간 체결이 들어오는 종목은 tick으로 이미 최신이므로 REST 조회에서 제외"""
+        self._ensure_columns()
+        chunk = max(1, settings.SCANNER_CHUNK_SIZE)
+        rows = np.flatnonzero(self._ticked_at < time.time() - settings.SCANNER_SWEEP_SEC)
+        for start in range(0, len(rows), chunk):
+            codes = [self._codes[i] for i in rows[start:start + chunk]]
+            self.requests += 1
+            self.apply(await self._fetch(codes))
+            self.publish_if_changed()
+            if self._version != get_master_status()["version"]:
+                # 순환 도중 마스터가 교체되면 새 마스터 기준으로 처음부터
+                return
+
+    # === 갱신 ===
+
+    def apply(self, rows: List[QuoteRow]):
+        """다종목 시세 응답 반영 (마스터에 없는 종목은 무시)"""
+        hits = [(self._index[r["code"]], r) for r in rows if r.get("code") in self._index and r.get("price")]
+        if not hits:
+            return
+        idx = np.fromiter((i for i, _ in hits), dtype=np.int64, count=len(hits))
+        self._price[idx] = [r["price"] for _, r in hits]
+        self._open[idx] = [r.get("open", 0) for _, r in hits]
+        self._high[idx] = [r.get("high", 0) for _, r in hits]
+        self._low[idx] = [r.get("low", 0) for _, r in hits]
+        self._volume[idx] = [r.get("volume", 0) for _, r in hits]
+        self._change_rate[idx] = [r.get("change_rate", 0.0) for _, r in hits]
+        self._prev_close[idx] = [r.get("prev_close") or 0 for _, r in hits]
+        # 전일거래량: 직접 값이 없으면 전일 대비 거래량 비율(%)로 환산
+        self._prev_volume[idx] = [
+            r.get("prev_volume") or (r["volume"] * 100.0 / r["volume_ratio"] if r.get("volume_ratio") else 0.0)
+            for _, r in hits
+        ]
+        self._updated_at[idx] = time.time()
+        self.rows_updated += len(hits)
+        self._dirty = True
+
+    def on_tick(self, tick: Tick):
+        """실시간 체결 종목의 행만 갱신 (O(1), 스캐너 미사용 시 즉시 반환)"""
+        if not self._refs:
+            return
+        row = self._index.get(tick.symbol)
+        if row is None:
+            return
+        self.ticks += 1
+        self._price[row] = tick.price
+        self._open[row] = tick.open
+        self._high[row] = tick.high
+        self._low[row] = tick.low
+        if tick.volume > self._volume[row]:
+            self._volume[row] = tick.volume
+        self._change_rate[row] = tick.change_rate
+        if not self._prev_close[row] and tick.change_rate > -100:
+            self._prev_close[row] = round(tick.price / (1 + tick.change_rate / 100))
+        now = time.time()
+        self._updated_at[row] = now
+        self._ticked_at[row] = now
+        self._dirty = True
+
+    def flush(self):
+        """[Fix] 멀티플렉서 flush 주기마다 호출: tick으로 바뀐 순위를 다음 순환 조회까지 기다리지 않고 전송 (flush당 최대 1회)"""
+        if self._refs:
+            self.publish_if_changed()
+
+    # === 순위 ===
+
+    def rank(self, n: int) -> Dict[str, np.ndarray]:
+        """순위별 상위 n개 행 번호 (컬럼 1회 벡터 연산)"""
+        valid = self._price > 0
+        change = np.where(valid, self._change_rate, np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            surge = np.where(valid & (self._prev_volume > 0) & (self._volume >= MIN_SURGE_VOLUME),
+                             self._volume / self._prev_volume * 100.0, np.nan)
+            gap = np.where(valid & (self._prev_close > 0) & (self._open > 0),
+                           (self._open - self._prev_close) / self._prev_close * 100.0, np.nan)
+        return {
+            RANK_GAINERS: _top(change, n),
+            RANK_LOSERS: _top(-change, n),
+            RANK_VOLUME: _top(surge, n),
+            RANK_GAP: _top(np.abs(gap), n),
+        }
+
+    def _entry(self, row: int) -> Dict[str, Any]:
+        prev_close = int(self._prev_close[row])
+        prev_volume = float(self._prev_volume[row])
+        volume = int(self._volume[row])
+        return {
+            "code": self._codes[row],
+            "name": self._names[row],
+            "price": int(self._price[row]),
+            "changeRate": round(float(self._change_rate[row]), 2),
+            "volume": volume,
+            "volumeRatio": round(volume / prev_volume * 100.0, 1) if prev_volume > 0 else None,
+            "gap": round((int(self._open[row]) - prev_close) / prev_close * 100.0, 2)
+            if prev_close and self._open[row] else None,
+        }
+
+    def publish_if_changed(self):
+        """갱신이 있었고 상위 N 종목/값이 바뀌었으면 movers 메시지 전송"""
+        if not self._dirty or not self._codes:
+            return
+        self._dirty = False
+        ranks = self.rank(settings.SCANNER_TOP_N)
+        data = {name: [self._entry(int(i)) for i in rows] for name, rows in ranks.items()}
+        key = tuple((e["code"], e["price"], e["volume"]) for rows in data.values() for e in rows)
+        if key == self._last_key:
+            return
+        self._last_key = key
+        data["covered"] = int((self._price > 0).sum())
+        data["total"] = len(self._codes)
+        data["updatedAt"] = time.time()
+        self.publish(data)
+
+    def publish(self, data: Dict[str, Any]):
+        """순위를 구독 클라이언트 및 listener에 전송 (web 모드에서는 ingest가 보낸 순위를 그대로 전달)"""
+        self.last = data
+        self.published += 1
+        ws_manager.broadcast_scanner({"type": "movers", "data": data})
+        for listener in self.listeners:
+            listener(data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "refs": self._refs,
+            "symbols": len(self._codes),
+            "covered": int((self._price > 0).sum()),
+            "requests": self.requests,
+            "rows_updated": self.rows_updated,
+            "ticks": self.ticks,
+            "sweeps": self.sweeps,
+            "published": self.published,
+            "rebuilds": self.rebuilds,
+        }
+
+
+market_scanner = MarketScanner()
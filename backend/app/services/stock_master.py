@@ -1,7 +1,16 @@
 import httpx
 import logging
 import asyncio
-from typing import List, Dict
+import gzip
+import hashlib
+import json
+import os
+import time
+from typing import Any, Callable, List, Dict, Optional
+from app.core.config import settings
+from app.core import json_codec
+from app.core.rate_limiter import kiwoom_scheduler, kiwoom_rate_limiter, parse_retry_after, PRIORITY_MASTER
+from app.services.stock_search import StockSearchIndex
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +43,33 @@ STOCK_MASTER_FALLBACK = [
 # 전체 종목 캐시
 _stock_cache: List[Dict[str, str]] = []
 _cache_loaded = False
+# 마스터 출처(snapshot/api/fallback) 및 적재 시각 (readiness 보고용)
+_master_source: Optional[str] = None
+_master_loaded_at: Optional[float] = None
+_refreshing = False
+# 검색 인덱스 (마스터 교체 시 함께 재생성, 적재 전에는 fallback 기준)
+_search_index = StockSearchIndex(STOCK_MASTER_FALLBACK)
+# 마스터 버전 (교체마다 증가) 및 버전별 직렬화된 종목명 payload
+_master_version = 0
+_names_payload: Optional["NamesPayload"] = None
+# 마스터 교체 시 호출할 listener (ingest 모드: web worker로 새 마스터 publish)
+master_listeners: List[Callable[[List[Dict[str, str]], str], None]] = []
+
+
+class NamesPayload:
+    """[Decision] 종목 코드→이름 매핑의 불변 직렬화 결과 (마스터 버전당 1회 JSON 인코딩 + gzip 압축).
+    ETag와 공개 버전(digest)은 내용 해시 → 서버 재시작/worker가 달라도 내용이 같으면 같은 값.
+    (version은 프로세스 내부 교체 카운터로 payload 재생성 판단에만 사용)"""
+    __slots__ = ("version", "digest", "etag", "body", "gzip_body", "count")
+
+    def __init__(self, version: int, stocks: List[Dict[str, str]]):
+        self.version = version
+        self.count = len(stocks)
+        self.body = json_codec.dumps({s["code"]: s["name"] for s in stocks}).encode("utf-8")
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.digest = hashlib.blake2b(self.body, digest_size=8).hexdigest()
+        # 압축/비압축 표현이 다르므로 weak ETag 사용
+        self.etag = f'W/"{self.digest}"'
 
 
 async def _fetch_market(client: httpx.AsyncClient, token: str, host: str, mrkt_tp: str) -> List[Dict[str, str]]:
@@ -41,6 +77,7 @@ async def _fetch_market(client: httpx.AsyncClient, token: str, host: str, mrkt_t
     stocks = []
     cont_yn = "N"
     next_key = ""
+    throttled = 0
 
     while True:
         headers = {
@@ -53,11 +90,21 @@ async def _fetch_market(client: httpx.AsyncClient, token: str, host: str, mrkt_t
         body = {"mrkt_tp": mrkt_tp}
 
         try:
+            # [Decision] 종목 마스터는 최하위 우선순위 → 화면 차트 요청이 먼저 처리됨 (고정 sleep 대신 스케줄러가 속도 제어)
+            await kiwoom_scheduler.acquire(PRIORITY_MASTER)
             resp = await client.post(f"{host}/api/dostk/stkinfo", headers=headers, json=body)
+            if resp.status_code == 429 and throttled < 3:
+                # 공유 limiter 감속 후 같은 페이지 재요청
+                throttled += 1
+                kiwoom_rate_limiter.on_throttle(parse_retry_after(resp.headers.get("retry-after")))
+                logger.warning(f"ka10099 mrkt_tp={mrkt_tp} Rate Limit (429), 감속 후 재시도 ({throttled}/3)")
+                continue
             if resp.status_code != 200:
                 logger.warning(f"ka10099 mrkt_tp={mrkt_tp} 응답 오류: {resp.status_code}")
                 break
 
+            kiwoom_rate_limiter.on_success()
+            throttled = 0
             data = resp.json()
 
             # 응답 바디에서 리스트 데이터 추출 (키 이름 동적 탐색)
@@ -90,7 +137,6 @@ async def _fetch_market(client: httpx.AsyncClient, token: str, host: str, mrkt_t
             if resp_cont == "Y" and resp_next:
                 cont_yn = "Y"
                 next_key = resp_next
-                await asyncio.sleep(0.3)  # API rate limit 방지
             else:
                 break
 
@@ -101,25 +147,87 @@ async def _fetch_market(client: httpx.AsyncClient, token: str, host: str, mrkt_t
     return stocks
 
 
+def _swap_master(stocks: List[Dict[str, str]], source: str, index: Optional[StockSearchIndex] = None):
+    """[Decision] 새 마스터를 단일 참조 교체로 반영 → 검색/조회 중인 요청은 이전 리스트를 그대로 사용 (atomic swap)"""
+    global _stock_cache, _cache_loaded, _master_source, _master_loaded_at, _search_index, _master_version
+    # 인덱스를 먼저 완성한 뒤 마스터와 함께 교체 → 검색이 반쯤 만들어진 인덱스를 보지 않음
+    index = index or StockSearchIndex(stocks)
+    _stock_cache = stocks
+    _search_index = index
+    _master_version += 1
+    _cache_loaded = True
+    _master_source = source
+    _master_loaded_at = time.time()
+    for listener in master_listeners:
+        listener(stocks, source)
+
+
+async def apply_remote_master(stocks: List[Dict[str, str]], source: str) -> bool:
+    """ingest가 보낸 마스터로 교체 (web worker). 내용이 같으면 인덱스 재생성 없이 무시"""
+    if not stocks or (_cache_loaded and stocks == _stock_cache):
+        return False
+    index = await asyncio.to_thread(StockSearchIndex, stocks)
+    _swap_master(stocks, source, index)
+    logger.info(f"종목 마스터 수신 (bus): {len(stocks)}개 (source={source})")
+    return True
+
+
+def _write_snapshot(path: str, stocks: List[Dict[str, str]]):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"saved_at": time.time(), "stocks": stocks}, f, ensure_ascii=False)
+    # 쓰기 도중 종료되어도 기존 스냅샷이 깨지지 않도록 rename으로 교체
+    os.replace(tmp_path, path)
+
+
+def load_stock_master_snapshot(path: Optional[str] = None) -> bool:
+    """[Decision] 로컬 스냅샷에서 종목 마스터를 즉시 적재 (앱 시작 시 ka10099 응답을 기다리지 않음)"""
+    path = path or settings.STOCK_MASTER_SNAPSHOT_PATH
+    try:
+        with open(path, encoding="utf-8") as f:
+            stocks = json.load(f).get("stocks", [])
+    except FileNotFoundError:
+        logger.info(f"종목 마스터 스냅샷 없음: {path}")
+        return False
+    except (OSError, ValueError) as e:
+        logger.warning(f"종목 마스터 스냅샷 읽기 실패: {e}")
+        return False
+
+    if not stocks:
+        return False
+    _swap_master(stocks, "snapshot")
+    logger.info(f"종목 마스터 스냅샷 로딩: {len(stocks)}개 ({path})")
+    return True
+
+
 async def load_all_stocks_from_api(access_token: str, host: str = "https://api.kiwoom.com"):
     """
     [Decision] ka10099 API로 코스피(0) + 코스닥(10) 전체 종목 로딩
-    앱 시작 시 1회 호출하여 캐시
+    백그라운드에서 갱신 후 기존 마스터와 교체하고 로컬 스냅샷으로 저장
     """
-    global _stock_cache, _cache_loaded
+    global _refreshing
     all_stocks = []
+    complete = True
+    _refreshing = True
+
+    try:
+        async with httpx.AsyncClient(timeout=30.0, verify=False) as client:
+            # 코스피(0) + 코스닥(10) 순차 조회
+            for mrkt_tp in ["0", "10"]:
+                market_name = "코스피" if mrkt_tp == "0" else "코스닥"
+                logger.info(f"📡 ka10099: {market_name} 종목 로딩 중...")
+                stocks = await _fetch_market(client, access_token, host, mrkt_tp)
+                logger.info(f"✅ {market_name}: {len(stocks)}개 종목 로딩")
+                complete = complete and bool(stocks)
+                all_stocks.extend(stocks)
+    finally:
+        _refreshing = False
 
-    async with httpx.AsyncClient(timeout=30.0, verify=False) as client:
-        # 코스피(0) + 코스닥(10) 순차 조회
-        for mrkt_tp in ["0", "10"]:
-            market_name = "코스피" if mrkt_tp == "0" else "코스닥"
-            logger.info(f"📡 ka10099: {market_name} 종목 로딩 중...")
-            stocks = await _fetch_market(client, access_token, host, mrkt_tp)
-            logger.info(f"✅ {market_name}: {len(stocks)}개 종목 로딩")
-            all_stocks.extend(stocks)
-            await asyncio.sleep(0.5)  # 시장 간 간격
-
-    if all_stocks:
+    # 한 시장이라도 실패했으면 기존 스냅샷을 일부 데이터로 덮어쓰지 않음
+    if all_stocks and (complete or _master_source != "snapshot"):
         # 중복 제거 (코드 기준)
         seen = set()
         unique = []
@@ -127,15 +235,33 @@ async def load_all_stocks_from_api(access_token: str, host: str = "https://api.k
             if s["code"] not in seen:
                 seen.add(s["code"])
                 unique.append(s)
-        _stock_cache = unique
-        _cache_loaded = True
+        # 인덱스 빌드는 마스터 크기에 비례하므로 스레드에서 수행 (이벤트 루프 비차단)
+        index = await asyncio.to_thread(StockSearchIndex, unique)
+        _swap_master(unique, "api", index)
         logger.info(f"🎯 전체 종목 마스터 로딩 완료: {len(unique)}개")
+        if complete:
+            try:
+                await asyncio.to_thread(_write_snapshot, settings.STOCK_MASTER_SNAPSHOT_PATH, unique)
+            except OSError as e:
+                logger.warning(f"종목 마스터 스냅샷 저장 실패: {e}")
+    elif _master_source == "snapshot":
+        logger.warning("⚠️ ka10099 갱신 실패, 기존 스냅샷 유지")
     else:
-        _stock_cache = STOCK_MASTER_FALLBACK
-        _cache_loaded = True
+        _swap_master(STOCK_MASTER_FALLBACK, "fallback")
         logger.warning(f"⚠️ ka10099 실패, fallback 종목 {len(STOCK_MASTER_FALLBACK)}개 사용")
 
 
+def get_master_status() -> Dict[str, Any]:
+    """종목 마스터 준비 상태 (readiness 보고용)"""
+    return {
+        "source": _master_source,
+        "count": len(_stock_cache) if _cache_loaded else 0,
+        "version": _master_version,
+        "loaded_at": _master_loaded_at,
+        "refreshing": _refreshing,
+    }
+
+
 def get_stock_master() -> List[Dict[str, str]]:
     """현재 캐시된 종목 마스터 반환"""
     return _stock_cache if _cache_loaded else STOCK_MASTER_FALLBACK
@@ -146,8 +272,16 @@ def get_all_stock_names() -> Dict[str, str]:
     return {s["code"]: s["name"] for s in get_stock_master()}
 
 
+def get_names_payload() -> NamesPayload:
+    """현재 마스터 버전의 직렬화된 종목명 payload (버전이 바뀐 뒤 첫 요청에서만 생성)"""
+    global _names_payload
+    payload = _names_payload
+    if payload is None or payload.version != _master_version:
+        payload = NamesPayload(_master_version, get_stock_master())
+        _names_payload = payload
+    return payload
+
+
 def search_stocks(query: str) -> List[Dict[str, str]]:
-    """코드 또는 이름으로 종목 검색 (최대 30개)"""
-    q = query.lower()
-    results = [s for s in get_stock_master() if q in s["code"] or q in s["name"].lower()]
-    return results[:30]
+    """코드/이름/초성으로 종목 검색 (최대 30개, 완전 일치 → 접두 → 중간 일치 순)"""
+    return _search_index.search(query, limit=30)
@@ -0,0 +1,174 @@
+from bisect import bisect_left
+from heapq import merge
+from typing import Dict, Iterable, Iterator, List, Set
+
+# 한글 음절 → 초성 (호환 자모) 변환표
+_CHOSUNG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_HANGUL_BASE = 0xAC00
+_HANGUL_LAST = 0xD7A3
+_CHOSUNG_SET = set(_CHOSUNG)
+
+# 접두 인덱스 최대 길이 (이보다 긴 질의는 n-gram 후보에서 접두 여부 검증)
+_PREFIX_MAX = 12
+
+
+def to_chosung(text: str) -> str:
+    """한글 음절은 초성으로, 그 외 문자는 소문자로 변환 (예: 삼성전자 → ㅅㅅㅈㅈ)"""
+    out = []
+    for ch in text:
+        code = ord(ch)
+        if _HANGUL_BASE <= code <= _HANGUL_LAST:
+            out.append(_CHOSUNG[(code - _HANGUL_BASE) // 588])
+        else:
+            out.append(ch.lower())
+    return "".join(out)
+
+
+def is_chosung_query(query: str) -> bool:
+    return bool(query) and all(ch in _CHOSUNG_SET for ch in query)
+
+
+def _grams(text: str) -> Set[str]:
+    """1~3-gram 집합 (질의 길이별로 가장 긴 n-gram posting을 교집합해 후보 축소)"""
+    grams = set(text)
+    for n in (2, 3):
+        grams.update(text[i:i + n] for i in range(len(text) - n + 1))
+    return grams
+
+
+def _query_grams(query: str) -> Set[str]:
+    """질의의 n-gram (3글자 이상은 3-gram: 코드 숫자/초성처럼 문자 종류가 적어도 posting이 짧음)"""
+    n = min(len(query), 3)
+    return {query[i:i + n] for i in range(len(query) - n + 1)}
+
+
+def _add_prefixes(index: Dict[str, List[int]], text: str, i: int):
+    for n in range(1, min(len(text), _PREFIX_MAX) + 1):
+        index.setdefault(text[:n], []).append(i)
+
+
+class StockSearchIndex:
+    """[Decision] 종목 마스터 검색 인덱스 (마스터 교체 시 재생성).
+    내부 id를 (이름 길이, 마스터 순서)로 미리 정렬해 부여 → posting list가 곧 랭킹 순서.
+    완전 일치 → 코드 접두 → 이름 접두 → 초성 접두 → 중간 일치(n-gram) 순으로 채우다 limit에 도달하면 중단.
+    중간 일치도 n-gram posting(id 순)을 앞에서부터 lazy하게 교집합하므로 limit개를 찾으면 멈춤."""
+    def __init__(self, stocks: List[Dict[str, str]]):
+        order = sorted(range(len(stocks)), key=lambda j: (len(stocks[j]["name"]), j))
+        self._stocks = [stocks[j] for j in order]
+        self._codes: List[str] = []
+        self._names: List[str] = []
+        self._chosungs: List[str] = []
+        self._exact: Dict[str, List[int]] = {}
+        self._code_prefix: Dict[str, List[int]] = {}
+        self._name_prefix: Dict[str, List[int]] = {}
+        self._chosung_prefix: Dict[str, List[int]] = {}
+        # n-gram posting: id 오름차순 리스트 (id 순서 = 랭킹 순서 → 교집합을 앞에서부터 limit개만 계산)
+        self._code_grams: Dict[str, List[int]] = {}
+        self._name_grams: Dict[str, List[int]] = {}
+        self._chosung_grams: Dict[str, List[int]] = {}
+
+        for i, s in enumerate(self._stocks):
+            code = s["code"].lower()
+            name = s["name"].lower()
+            chosung = to_chosung(s["name"])
+            self._codes.append(code)
+            self._names.append(name)
+            self._chosungs.append(chosung)
+            self._exact.setdefault(code, []).append(i)
+            if name != code:
+                self._exact.setdefault(name, []).append(i)
+            _add_prefixes(self._code_prefix, code, i)
+            _add_prefixes(self._name_prefix, name, i)
+            _add_prefixes(self._chosung_prefix, chosung, i)
+            for g in _grams(code):
+                self._code_grams.setdefault(g, []).append(i)
+            for g in _grams(name):
+                self._name_grams.setdefault(g, []).append(i)
+            for g in _grams(chosung):
+                self._chosung_grams.setdefault(g, []).append(i)
+        # 가장 긴 텍스트보다 짧지 않은 질의는 중간 일치가 완전 일치뿐 → n-gram 조회 생략
+        self._code_max = max(map(len, self._codes), default=0)
+        self._name_max = max(map(len, self._names), default=0)
+        self._chosung_max = max(map(len, self._chosungs), default=0)
+
+    def __len__(self) -> int:
+        return len(self._stocks)
+
+    @staticmethod
+    def _candidates(grams_index: Dict[str, List[int]], query: str) -> Iterator[int]:
+        """질의의 n-gram posting 교집합을 id 오름차순으로 lazy하게 생성.
+        가장 짧은 posting을 기준으로 나머지는 bisect로 건너뛰며(leapfrog) 비교 → 소비자가 limit에서 멈추면 즉시 중단"""
+        postings = []
+        for gram in _query_grams(query):
+            posting = grams_index.get(gram)
+            if not posting:
+                return
+            postings.append(posting)
+        postings.sort(key=len)
+        lead, others = postings[0], postings[1:]
+        if not others:
+            yield from lead
+            return
+        cursors = [0] * len(others)
+        i = 0
+        while i < len(lead):
+            candidate = lead[i]
+            for k, posting in enumerate(others):
+                j = bisect_left(posting, candidate, cursors[k])
+                if j == len(posting):
+                    return
+                cursors[k] = j
+                if posting[j] != candidate:
+                    # 다른 posting의 다음 id까지 기준 posting을 건너뜀
+                    i = bisect_left(lead, posting[j], i + 1)
+                    break
+            else:
+                yield candidate
+                i += 1
+
+    def _prefix(self, prefix_index: Dict[str, List[int]], grams_index: Dict[str, List[int]],
+                texts: List[str], query: str) -> Iterable[int]:
+        if len(query) <= _PREFIX_MAX:
+            return prefix_index.get(query, ())
+        return (i for i in self._candidates(grams_index, query) if texts[i].startswith(query))
+
+    def _infix(self, grams_index: Dict[str, List[int]], texts: List[str], max_len: int,
+               query: str) -> Iterator[int]:
+        if len(query) >= max_len:
+            return iter(())
+        return (i for i in self._candidates(grams_index, query) if query in texts[i])
+
+    def search(self, query: str, limit: int = 30) -> List[Dict[str, str]]:
+        q = query.strip().lower()
+        if not q or limit <= 0:
+            return []
+        chosung_query = is_chosung_query(q)
+
+        picked: List[int] = []
+        seen: Set[int] = set()
+
+        def take(ids: Iterable[int]) -> bool:
+            for i in ids:
+                if i not in seen:
+                    seen.add(i)
+                    picked.append(i)
+                    if len(picked) >= limit:
+                        return True
+            return False
+
+        done = (
+            take(self._exact.get(q, ()))
+            or take(self._prefix(self._code_prefix, self._code_grams, self._codes, q))
+            or take(self._prefix(self._name_prefix, self._name_grams, self._names, q))
+            or (chosung_query and take(self._prefix(self._chosung_prefix, self._chosung_grams, self._chosungs, q)))
+        )
+        if not done:
+            # 중간 일치 (예: 5930 → 005930, 전자 → 삼성전자, ㅈㅈ → 삼성전자)
+            # 코드/이름/초성 후보가 모두 id 오름차순이므로 병합만으로 랭킹 순서 유지, limit에 도달하면 중단
+            sources = [self._infix(self._code_grams, self._codes, self._code_max, q),
+                       self._infix(self._name_grams, self._names, self._name_max, q)]
+            if chosung_query:
+                sources.append(self._infix(self._chosung_grams, self._chosungs, self._chosung_max, q))
+            take(merge(*sources))
+
+        return [self._stocks[i] for i in picked]
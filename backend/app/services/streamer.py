@@ -1,23 +1,84 @@
 import asyncio
 import json
 import logging
+from typing import Any, Callable, Dict, List
 from app.api.websocket import ws_manager
 from app.models.stock import StockTick
+from app.core.config import settings
+from app.services.tick_decoder import Tick
+from app.services.order_book import OrderBook
+from app.services.indicators import indicator_engine
+from app.services.scanner import market_scanner
 
 logger = logging.getLogger(__name__)
 
+TICK_MODE_RAW = "raw"              # tick 1건 = WS 프레임 1건
+TICK_MODE_CONFLATED = "conflated"  # 종목별 최신 상태를 모아 flush 주기마다 1건 전송
+
+
+class TickConflator:
+    """종목별 최신 tick 상태를 병합 보관하고 flush 시 한꺼번에 내보내는 conflation 버퍼"""
+    def __init__(self):
+        self._pending: Dict[str, Tick] = {}
+        # 모니터링 카운터
+        self.received = 0
+        self.coalesced = 0
+        self.flushed = 0
+
+    def add(self, tick: Tick):
+        self.received += 1
+        symbol = tick.symbol
+        prev = self._pending.get(symbol)
+        if prev is None:
+            self._pending[symbol] = tick
+            return
+
+        # [Decision] 최신 가격/시간/등락률은 덮어쓰고, 고가/저가는 구간 내 극값을 유지.
+        # 누적거래량(13)은 단조 증가하므로 최댓값을 유지해 순서가 뒤바뀐 체결에도 후퇴하지 않음.
+        self.coalesced += 1
+        tick.high = max(prev.high, tick.high)
+        tick.low = min(prev.low, tick.low) if tick.low > 0 else prev.low
+        tick.volume = max(prev.volume, tick.volume)
+        if not tick.open:
+            tick.open = prev.open
+        self._pending[symbol] = tick
+
+    def drain(self) -> Dict[str, Tick]:
+        pending, self._pending = self._pending, {}
+        self.flushed += len(pending)
+        return pending
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "flushed": self.flushed,
+            "pending": len(self._pending),
+        }
+
+
 class DataMultiplexer:
     """실시간 데이터를 수집하여 멀티플렉싱하고 브로드캐스트하는 클래스"""
-    def __init__(self):
+    def __init__(self, mode: str = None, flush_hz: float = None, validate: bool = None):
         self.is_running = False
         self._task = None
+        self.mode = mode or settings.TICK_MODE
+        self.flush_hz = flush_hz or settings.TICK_FLUSH_HZ
+        self.validate = settings.TICK_VALIDATE if validate is None else validate
+        self.conflator = TickConflator()
+        # [Decision] 호가는 모드와 무관하게 항상 flush 주기당 종목별 1건 (OrderBook이 제자리 갱신되므로 dirty 표시만)
+        self._dirty_books: Dict[str, OrderBook] = {}
+        # flush된 호가를 추가로 받을 listener (ingest 모드: web worker로 publish)
+        self.depth_listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        self.depth_received = 0
+        self.depth_flushed = 0
 
     async def start(self):
         if self.is_running:
             return
         self.is_running = True
         self._task = asyncio.create_task(self._run())
-        logger.info("Real-time Data Multiplexer started")
+        logger.info(f"Real-time Data Multiplexer started (mode={self.mode}, flush={self.flush_hz}Hz)")
 
     async def stop(self):
         self.is_running = False
@@ -29,14 +90,72 @@ class DataMultiplexer:
                 pass
         logger.info("Real-time Data Multiplexer stopped")
 
+    def set_mode(self, mode: str, flush_hz: float = None):
+        """raw/conflated 모드 및 flush 주기 런타임 전환"""
+        if mode not in (TICK_MODE_RAW, TICK_MODE_CONFLATED):
+            raise ValueError(f"unknown tick mode: {mode}")
+        self.mode = mode
+        if flush_hz:
+            self.flush_hz = flush_hz
+        logger.info(f"Tick mode 변경: mode={self.mode}, flush={self.flush_hz}Hz")
+
     async def _run(self):
-        """실제 데이터 수신 루프 (API 연결 시 활성화)"""
+        """conflation flush 루프: flush_hz 주기로 종목별 최신 tick을 전송"""
         logger.info("Real-time Data Multiplexer standby for Kiwoom API...")
         while self.is_running:
-            await asyncio.sleep(1)
+            await asyncio.sleep(1.0 / self.flush_hz)
+            await self.flush()
+            self.flush_depth()
+            indicator_engine.flush()
+            market_scanner.flush()
+
+    async def flush(self):
+        """conflation 버퍼에 쌓인 종목별 최신 tick을 구독 클라이언트에 전송"""
+        for symbol, tick in self.conflator.drain().items():
+            await ws_manager.broadcast_to_symbol(symbol, {
+                "type": "tick",
+                "data": tick.to_dict()
+            })
+
+    def handle_depth(self, book: OrderBook):
+        """호가 갱신 표시 (전송은 다음 flush에서 최신 상태로 1회)"""
+        self.depth_received += 1
+        self._dirty_books[book.symbol] = book
+
+    def flush_depth(self):
+        dirty, self._dirty_books = self._dirty_books, {}
+        for symbol, book in dirty.items():
+            self.publish_depth(symbol, book.to_dict())
+        self.depth_flushed += len(dirty)
+
+    def publish_depth(self, symbol: str, data: Dict[str, Any]):
+        """호가 스냅샷을 depth opt-in 클라이언트 및 listener에 전송"""
+        ws_manager.broadcast_depth(symbol, {"type": "depth", "symbol": symbol, "data": data})
+        for listener in self.depth_listeners:
+            listener(symbol, data)
+
+    async def handle_tick(self, tick: Tick):
+        """디코더가 만든 Tick을 해당 종목 구독 클라이언트에 전송 (hot path)"""
+        try:
+            # [Decision] pydantic 검증은 선택 (TICK_VALIDATE). 디코더가 이미 타입을 보장하므로 기본은 생략
+            if self.validate:
+                StockTick(**tick.to_dict())
+
+            # [Decision] conflated 모드: 핫 종목의 초당 수십 건 체결을 flush 주기당 1건으로 병합
+            if self.mode == TICK_MODE_CONFLATED:
+                self.conflator.add(tick)
+                return
+
+            # [Decision] 전체 broadcast 대신 종목별 라우팅 → 트래픽이 실제 관심 종목 수에 비례
+            await ws_manager.broadcast_to_symbol(tick.symbol, {
+                "type": "tick",
+                "data": tick.to_dict()
+            })
+        except Exception as e:
+            logger.error(f"Error broadcasting real-time tick: {str(e)}")
 
     async def handle_kiwoom_tick(self, tick_data: dict):
-        """키움 API로부터 수신된 실제 데이터를 모든 웹소켓 클라이언트에 전송"""
+        """문자열 키 포맷 등 dict tick 수신 경로 (pydantic으로 타입 변환 후 hot path로 전달)"""
         try:
             tick = StockTick(
                 symbol=tick_data.get("symbol"),
@@ -48,12 +167,19 @@ class DataMultiplexer:
                 change_rate=tick_data.get("change_rate", 0.0),
                 timestamp=tick_data.get("timestamp")
             )
-
-            await ws_manager.broadcast({
-                "type": "tick",
-                "data": tick.model_dump()
-            })
         except Exception as e:
-            logger.error(f"Error broadcasting real-time tick: {str(e)}")
+            logger.error(f"Invalid real-time tick: {str(e)}")
+            return
+        await self.handle_tick(Tick.from_dict(tick.model_dump()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "flush_hz": self.flush_hz,
+            "validate": self.validate,
+            "conflation": self.conflator.get_stats(),
+            "depth": {"received": self.depth_received, "flushed": self.depth_flushed,
+                      "pending": len(self._dirty_books)},
+        }
 
 multiplexer = DataMultiplexer()
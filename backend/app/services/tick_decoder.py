@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+KST = timezone(timedelta(hours=9))
+
+_NUMERIC_CHARS = frozenset("0123456789.+-")
+
+
+def decode_float(val: Any) -> float:
+    """키움 숫자 문자열 → float (부호 유지, 정규식 없음).
+    실시간 값은 대부분 "+73400", "-0.81" 형태라 float()가 바로 처리하고, 콤마 등이 섞인 경우만 문자 필터 후 재시도."""
+    if not val:
+        return 0.0
+    if isinstance(val, (int, float)):
+        return float(val)
+    try:
+        return float(val)
+    except ValueError:
+        cleaned = "".join(ch for ch in str(val) if ch in _NUMERIC_CHARS)
+        try:
+            return float(cleaned)
+        except ValueError:
+            return 0.0
+
+
+def decode_price(val: Any) -> int:
+    """가격/수량 값 → 양의 정수.
+    [Decision] 키움 가격 필드의 부호는 전일 대비 방향(상승 +/하락 -)이므로 크기만 사용."""
+    if not val:
+        return 0
+    if isinstance(val, int):
+        return abs(val)
+    try:
+        return abs(int(val))
+    except ValueError:
+        return abs(int(decode_float(val)))
+
+
+class Tick:
+    """실시간 체결 1건 (StockTick과 동일 필드, pydantic 없이 생성되는 hot path용 경량 표현)"""
+    __slots__ = ("symbol", "price", "open", "high", "low", "volume", "change_rate", "timestamp")
+
+    def __init__(self, symbol: str, price: int, open: int, high: int, low: int,
+                 volume: int, change_rate: float, timestamp: str):
+        self.symbol = symbol
+        self.price = price
+        self.open = open
+        self.high = high
+        self.low = low
+        self.volume = volume
+        self.change_rate = change_rate
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Tick":
+        return cls(data["symbol"], data["price"], data["open"], data["high"], data["low"],
+                   data["volume"], data.get("change_rate", 0.0), data["timestamp"])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "price": self.price,
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "volume": self.volume,
+            "change_rate": self.change_rate,
+            "timestamp": self.timestamp,
+        }
+
+
+def decode_numeric(item_code: str, values: Dict[str, Any]) -> Optional[Tick]:
+    """키움 실시간 숫자 키 포맷(00/0B) → Tick. 현재가가 없으면 None."""
+    price = decode_price(values.get("10"))       # 10 = 현재가
+    if price <= 0:
+        return None
+    # [Decision] _AL 접미사 제거 → 프론트 매칭
+    symbol = item_code[:-3] if item_code.endswith("_AL") else item_code
+    return Tick(
+        symbol,
+        price,
+        decode_price(values.get("16")) or price,   # 16 = 시가
+        decode_price(values.get("17")) or price,   # 17 = 고가
+        decode_price(values.get("18")) or price,   # 18 = 저가
+        decode_price(values.get("13")),            # 13 = 누적거래량
+        decode_float(values.get("12")),            # 12 = 등락률 (하락 시 음수)
+        str(values.get("20") or datetime.now(KST).strftime("%H%M%S")),  # 20 = 체결시간
+    )
@@ -0,0 +1,150 @@
+"""
+브로드캐스트 직렬화 마이크로 벤치마크
+
+기존 경로(클라이언트마다 send_json → 매번 json.dumps)와
+신규 경로(json_codec.dumps 1회 → 동일 프레임 send_text)를 1/10/100 클라이언트에서 비교.
+비용을 두 부분으로 분리해 측정:
+- serialize: 프레임 1개당 직렬화 비용만 (N회 json.dumps vs 1회 json_codec.dumps, 소켓/큐 없음)
+  인코더 차이(json→orjson)와 분리하기 위해 N회 json_codec.dumps도 함께 측정
+- fan-out: 사전 직렬화된 프레임의 전달 비용만 (직접 send_text 루프 vs 송신 큐 적재 + writer task 전송)
+- total: 두 비용을 합친 end-to-end (기존 send_json 루프 vs broadcast_to_symbol)
+
+실행: cd backend && python -m benchmarks.bench_broadcast
+"""
+import asyncio
+import json
+import time
+
+from app.api.websocket import ConnectionManager
+from app.core import json_codec
+
+TICK = {
+    "type": "tick",
+    "data": {
+        "symbol": "005930",
+        "price": 73400,
+        "open": 73000,
+        "high": 75000,
+        "low": 72800,
+        "volume": 12345678,
+        "change_rate": -0.81,
+        "timestamp": "090001",
+    },
+}
+
+
+def _legacy_dumps(message):
+    # starlette send_json과 동일 인코딩
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+class _FakeWebSocket:
+    """네트워크 비용 없이 측정하기 위한 가짜 소켓"""
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, data):
+        self.last = _legacy_dumps(data)
+
+    async def send_text(self, data):
+        self.last = data
+
+
+def _per_frame(total: float, iterations: int) -> float:
+    return total / iterations * 1e6
+
+
+def _bench_serialize(n_clients: int, iterations: int):
+    """프레임 1개를 N 클라이언트에 보낼 때의 직렬화 비용 (us/frame)"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for _ in range(n_clients):
+            _legacy_dumps(TICK)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for _ in range(n_clients):
+            json_codec.dumps(TICK)
+    per_client = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        json_codec.dumps(TICK)
+    once = time.perf_counter() - start
+    return _per_frame(legacy, iterations), _per_frame(per_client, iterations), _per_frame(once, iterations)
+
+
+async def _drain(manager: ConnectionManager):
+    """모든 writer task가 큐를 비울 때까지 양보"""
+    while any(session.depth for session in manager.sessions.values()):
+        await asyncio.sleep(0)
+
+
+async def _bench_fanout(manager: ConnectionManager, clients, iterations: int):
+    """사전 직렬화된 프레임의 전달 비용 (us/frame): 직접 send_text 루프 vs 큐 적재 + writer 전송"""
+    frame = json_codec.dumps(TICK)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for ws in clients:
+            await ws.send_text(frame)
+    direct = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        manager._send_frame(clients, frame, key="005930")
+        await _drain(manager)
+    queued = time.perf_counter() - start
+    return _per_frame(direct, iterations), _per_frame(queued, iterations)
+
+
+async def _bench_total(manager: ConnectionManager, clients, iterations: int):
+    """직렬화 + 전달 end-to-end (us/frame)"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for ws in clients:
+            await ws.send_json(TICK)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await manager.broadcast_to_symbol("005930", TICK)
+        await _drain(manager)
+    fanout = time.perf_counter() - start
+    return _per_frame(legacy, iterations), _per_frame(fanout, iterations)
+
+
+async def _run(n_clients: int, iterations: int):
+    manager = ConnectionManager()
+    clients = [_FakeWebSocket() for _ in range(n_clients)]
+    for ws in clients:
+        await manager.connect(ws)
+        manager.subscribe(ws, "005930")
+
+    ser_legacy, ser_per_client, ser_once = _bench_serialize(n_clients, iterations)
+    fan_direct, fan_queued = await _bench_fanout(manager, clients, iterations)
+    tot_legacy, tot_new = await _bench_total(manager, clients, iterations)
+
+    for ws in clients:
+        manager.disconnect(ws)
+
+    print(f"clients={n_clients:>3}  "
+          f"serialize {ser_legacy:8.2f} / {ser_per_client:8.2f} -> {ser_once:5.2f}us/frame "
+          f"(encode-once x{ser_per_client / ser_once:5.1f})  "
+          f"fan-out {fan_direct:7.2f} -> {fan_queued:7.2f}us/frame (x{fan_direct / fan_queued:4.2f})  "
+          f"total {tot_legacy:7.2f} -> {tot_new:7.2f}us/frame (x{tot_legacy / tot_new:4.2f})")
+
+
+async def main():
+    encoder = "orjson" if json_codec.orjson is not None else "json"
+    print(f"encoder={encoder}  (각 항목: 기존 -> 신규)")
+    print("  serialize: N회 json.dumps / N회 json_codec.dumps -> 1회 json_codec.dumps (encode-once 효과)")
+    print("  fan-out:   사전 직렬화 프레임 직접 send_text vs 송신 큐 + writer task (큐 오버헤드)")
+    for n in (1, 10, 100):
+        await _run(n, iterations=max(200, 20000 // n))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
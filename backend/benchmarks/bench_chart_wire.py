@@ -0,0 +1,73 @@
+"""
+차트 스냅샷 wire 포맷 벤치마크 (16개 차트 동시 로딩 기준)
+
+기존 JSON(봉마다 dict, float 가격) / columnar JSON / binary 프레임의
+전송 크기, 서버 인코딩 시간, 디코딩 시간(JSON은 json_codec.loads, binary는 struct 컬럼 읽기)을 비교.
+브라우저 JSON.parse 비용은 전송 크기 및 토큰 수에 비례하므로 디코딩 시간을 근사치로 사용.
+
+실행: cd backend && python -m benchmarks.bench_chart_wire
+"""
+import struct
+import time
+from datetime import date, timedelta
+
+from app.core import json_codec
+from app.core.chart_codec import encode_binary, encode_columnar
+
+CHARTS = 16
+BARS = 2000
+
+
+def _make_output(n: int):
+    bars = []
+    price = 73000.0
+    for i in range(n):
+        day = (date(2018, 1, 1) + timedelta(days=i)).strftime("%Y%m%d")
+        close = price + (i % 37) * 100 - 1800
+        bars.append({"dt": f"{day}", "open": price, "high": max(price, close) + 200,
+                     "low": min(price, close) - 200, "close": close, "volume": 10000000.0 + i * 37})
+        price = close
+    return bars
+
+
+def _decode_binary(frame: bytes) -> int:
+    n = struct.unpack_from("<I", frame, 4)[0]
+    offset = 8
+    offset += 1 + frame[offset]
+    offset += 1 + frame[offset]
+    offset += -offset % 8
+    # 프론트의 Float64Array/Int32Array 뷰 생성에 해당
+    memoryview(frame)[offset:offset + n * 16].cast("d")
+    memoryview(frame)[offset + n * 16:offset + n * 32].cast("i")
+    return n
+
+
+def _measure(encode, decode):
+    start = time.perf_counter()
+    frames = [encode(i) for i in range(CHARTS)]
+    encoded = time.perf_counter() - start
+    start = time.perf_counter()
+    for frame in frames:
+        decode(frame)
+    decoded = time.perf_counter() - start
+    return sum(len(f) for f in frames), encoded * 1000, decoded * 1000
+
+
+def main():
+    messages = [{"type": "chart", "symbol": f"{i:06d}", "timeframe": "D", "data": {"output": _make_output(BARS)}}
+                for i in range(CHARTS)]
+
+    results = {
+        "json": _measure(lambda i: json_codec.dumps(messages[i]).encode(), json_codec.loads),
+        "columnar": _measure(lambda i: json_codec.dumps(encode_columnar(messages[i])).encode(), json_codec.loads),
+        "binary": _measure(lambda i: encode_binary(messages[i]), _decode_binary),
+    }
+    base_size, _, base_decode = results["json"]
+    print(f"{CHARTS} charts x {BARS} bars")
+    for name, (size, enc_ms, dec_ms) in results.items():
+        print(f"{name:<9} size={size / 1024:9.1f}KiB (x{base_size / size:4.1f})  "
+              f"encode={enc_ms:7.1f}ms  decode={dec_ms:7.2f}ms (x{base_decode / max(dec_ms, 1e-6):6.1f})")
+
+
+if __name__ == "__main__":
+    main()
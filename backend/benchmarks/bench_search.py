@@ -0,0 +1,77 @@
+"""
+종목 검색 마이크로 벤치마크
+
+기존 경로(매 질의마다 마스터 전체 선형 스캔)와
+신규 경로(StockSearchIndex 역색인 조회)를 마스터 크기 2.5k/10k/50k에서 비교.
+질의별 인덱스 조회 시간도 출력 → 마스터 크기가 커져도 질의당 시간이 거의 일정한지 확인.
+
+실행: cd backend && python -m benchmarks.bench_search
+"""
+import random
+import time
+
+from app.services.stock_search import StockSearchIndex
+
+_SYLLABLES = "삼성전자현대기아카오네이버셀트리온금융지주화학에너지바이오제약건설증권통신반도체"
+_SUFFIXES = ["", "우", "홀딩스", " ETF", " ETN", "2우B", "레버리지", "인버스"]
+QUERIES = ["005930", "0059", "5930", "삼성", "전자", "삼성전자", "ㅅㅅㅈㅈ", "ㅎㄷ", "레버리지", "KODEX"]
+
+
+def _make_master(n: int):
+    rng = random.Random(n)
+    stocks = []
+    for i in range(n):
+        name = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 5))) + rng.choice(_SUFFIXES)
+        if i % 7 == 0:
+            name = "KODEX " + name
+        stocks.append({"code": f"{i:06d}", "name": name})
+    stocks[0] = {"code": "005930", "name": "삼성전자"}
+    return stocks
+
+
+def _legacy_search(stocks, query):
+    q = query.lower()
+    results = [s for s in stocks if q in s["code"] or q in s["name"].lower()]
+    return results[:30]
+
+
+def _bench(func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for q in QUERIES:
+            func(q)
+    return (time.perf_counter() - start) / (iterations * len(QUERIES)) * 1e6
+
+
+def _per_query(index: StockSearchIndex, iterations: int = 200) -> str:
+    cells = []
+    for q in QUERIES:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            hits = index.search(q)
+        cells.append(f"{q}={(time.perf_counter() - start) / iterations * 1e6:.0f}us({len(hits)})")
+    return "  ".join(cells)
+
+
+def main():
+    indexes = {}
+    for n in (2500, 10000, 50000):
+        stocks = _make_master(n)
+        start = time.perf_counter()
+        index = StockSearchIndex(stocks)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        iterations = max(5, 200000 // n)
+        legacy = _bench(lambda q: _legacy_search(stocks, q), iterations)
+        indexed = _bench(lambda q: index.search(q), iterations)
+        print(f"master={n:>6}  build={build_ms:7.1f}ms  legacy={legacy:9.1f}us/query  "
+              f"index={indexed:8.1f}us/query  x{legacy / indexed:.1f}")
+        indexes[n] = index
+
+    print("질의별 인덱스 조회 시간 (결과 수):")
+    for n, index in indexes.items():
+        print(f"  master={n:>6}  {_per_query(index)}")
+
+
+if __name__ == "__main__":
+    main()
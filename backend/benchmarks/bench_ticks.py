@@ -0,0 +1,81 @@
+"""
+실시간 tick 디코딩 마이크로 벤치마크 (코어 1개 기준 ticks/sec)
+
+기존 경로(clean_val 정규식 × 7 → dict → pydantic StockTick → model_dump)와
+신규 경로(decode_numeric → 슬롯 Tick, 선택적으로 pydantic 검증)를 비교.
+
+실행: cd backend && python -m benchmarks.bench_ticks
+"""
+import re
+import time
+
+from app.services.tick_decoder import decode_numeric
+
+try:
+    from app.models.stock import StockTick
+except ImportError:  # pragma: no cover - pydantic 미설치 환경
+    StockTick = None
+
+VALUES = {
+    "10": "-73400", "11": "-600", "12": "-0.81", "13": "12345678",
+    "15": "+12", "16": "+74000", "17": "+75000", "18": "-72800", "20": "090001",
+}
+
+
+def _clean_val(val):
+    if not val: return 0.0
+    cleaned = re.sub(r'[^\d.]', '', str(val))
+    return float(cleaned) if cleaned else 0.0
+
+
+def _legacy(item_code, values):
+    symbol = item_code[:-3] if item_code.endswith('_AL') else item_code
+    price = _clean_val(values.get('10', '0'))
+    tick_data = {
+        'symbol': symbol,
+        'price': int(price),
+        'open': int(_clean_val(values.get('16', '0') or str(price))),
+        'high': int(_clean_val(values.get('17', '0') or str(price))),
+        'low': int(_clean_val(values.get('18', '0') or str(price))),
+        'volume': int(_clean_val(values.get('13', '0'))),
+        'change_rate': float(_clean_val(values.get('12', '0'))),
+        'timestamp': str(values.get('20')),
+    }
+    if StockTick is not None:
+        return StockTick(**tick_data).model_dump()
+    return tick_data
+
+
+def _decoder(item_code, values):
+    return decode_numeric(item_code, values).to_dict()
+
+
+def _decoder_validated(item_code, values):
+    data = decode_numeric(item_code, values).to_dict()
+    StockTick(**data)
+    return data
+
+
+def _bench(func, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        func("005930_AL", VALUES)
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    n = 200000
+    if StockTick is None:
+        print("pydantic 미설치: 기존 경로는 정규식 디코딩만 측정")
+    legacy = _bench(_legacy, n)
+    label = "legacy (regex + pydantic)" if StockTick is not None else "legacy (regex)"
+    print(f"{label:<26}{legacy:12,.0f} ticks/sec")
+    fast = _bench(_decoder, n)
+    print(f"{'decoder (slots Tick)':<26}{fast:12,.0f} ticks/sec  x{fast / legacy:.1f}")
+    if StockTick is not None:
+        validated = _bench(_decoder_validated, n)
+        print(f"{'decoder + pydantic':<26}{validated:12,.0f} ticks/sec  x{validated / legacy:.1f}")
+
+
+if __name__ == "__main__":
+    main()
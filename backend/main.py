@@ -6,43 +6,75 @@ import asyncio
 from app.api.ws_router import router as ws_router
 
 from app.api.stocks import router as stock_router
+from app.api.logs import router as logs_router
 
 
 
 from app.services.streamer import multiplexer
 from app.services.kiwoom_client import kiwoom_client
-from app.services.stock_master import load_all_stocks_from_api
+from app.services.stock_master import load_all_stocks_from_api, load_stock_master_snapshot, get_master_status
+from app.services.candle_store import candle_store
+from app.services.bus import DEPLOY_INGEST, DEPLOY_WEB, bus_server, remote_market
+from app.core.config import settings
+from app.core.log import setup_logging, stop_logging
 
 import logging
-logging.basicConfig(level=logging.INFO)
+# [Decision] queue 기반 로깅: 포맷/stdout 쓰기는 별도 스레드에서 수행 (이벤트 루프 비차단)
+setup_logging(settings.LOG_LEVEL, settings.LOG_FORMAT, settings.LOG_CAPTURE)
 logger = logging.getLogger(__name__)
 
+async def _warm_up():
+    """[Decision] 토큰 발급 → 실시간 WS 시작 → 종목 마스터 갱신을 백그라운드에서 수행 (서버는 즉시 요청 처리)"""
+    # 접근 토큰 발급 (사용자의 fn_au10001 로직)
+    logger.info("Warm-up 1: Obtaining Access Token (fn_au10001)...")
+    token_success = await kiwoom_client.get_access_token()
+
+    if not token_success:
+        logger.error("CRITICAL: Failed to obtain Access Token. Real-time features will be disabled.")
+        return
+
+    # 실시간 WS를 마스터 갱신보다 먼저 시작 → 첫 차트/tick이 마스터 로딩을 기다리지 않음
+    logger.info("Warm-up 2: Starting Real-time WebSocket Connection...")
+    # [Fix] Reload 시 task 중복 생성 방지
+    if kiwoom_client._ws_task is None or kiwoom_client._ws_task.done():
+        kiwoom_client._ws_task = asyncio.create_task(kiwoom_client.connect_websocket())
+    else:
+        logger.info("WebSocket task already running, skip.")
+
+    # ka10099 전체 종목 마스터 갱신 (스냅샷과 atomic 교체)
+    logger.info("Warm-up 3: Refreshing stock master via ka10099 in background...")
+    await load_all_stocks_from_api(kiwoom_client.access_token, kiwoom_client.host)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    mode = settings.DEPLOY_MODE
     # 1. 실시간 데이터 멀티플렉서 시작
     await multiplexer.start()
-    
-    # 2. [가장 중요] 접근 토큰 발급 (사용자의 fn_au10001 로직)
-    logger.info("Step 1: Obtaining Access Token (fn_au10001)...")
-    token_success = await kiwoom_client.get_access_token()
-    
-    if token_success:
-        # [Decision] 앱 시작 시 ka10099로 전체 종목 마스터 로딩
-        logger.info("Step 2: Loading all stock master via ka10099...")
-        await load_all_stocks_from_api(kiwoom_client.access_token, kiwoom_client.host)
-        
-        logger.info("Step 3: Starting Real-time WebSocket Connection...")
-        # [Fix] Reload 시 task 중복 생성 방지
-        if kiwoom_client._ws_task is None or kiwoom_client._ws_task.done():
-            kiwoom_client._ws_task = asyncio.create_task(kiwoom_client.connect_websocket())
-        else:
-            logger.info("WebSocket task already running, skip.")
+
+    # 2. 로컬 스냅샷으로 종목 마스터 즉시 적재 (ms 단위)
+    load_stock_master_snapshot()
+
+    warm_up_task = None
+    if mode == DEPLOY_WEB:
+        # [Decision] web worker: 키움 세션 없이 ingest 프로세스에 bus로 연결 (tick 수신 + 차트 요청 위임)
+        await remote_market.start(settings.BUS_SOCKET_PATH)
     else:
-        logger.error("CRITICAL: Failed to obtain Access Token. Real-time features will be disabled.")
-    
+        # ingest 모드: web worker 연결을 먼저 받아 둠 (키움 연결 전 구독 요청은 대기열에 적재)
+        if mode == DEPLOY_INGEST:
+            await bus_server.start(settings.BUS_SOCKET_PATH, kiwoom_client)
+        # 3. 토큰/WS/마스터 갱신은 백그라운드로 → 서버는 바로 사용 가능
+        warm_up_task = asyncio.create_task(_warm_up())
+
     yield
     # 서비스 종료 시 정리
+    if warm_up_task and not warm_up_task.done():
+        warm_up_task.cancel()
+    await remote_market.stop()
+    await bus_server.stop()
+    await kiwoom_client.ingest.stop()
     await multiplexer.stop()
+    candle_store.close()
+    stop_logging()
 
 def create_app() -> FastAPI:
     app = FastAPI(
@@ -62,15 +94,37 @@ def create_app() -> FastAPI:
 
     app.include_router(ws_router)
     app.include_router(stock_router)
+    app.include_router(logs_router)
 
     @app.get("/health")
     async def health_check():
         return {"status": "ok", "version": "0.1.0"}
 
+    @app.get("/ready")
+    async def readiness_check():
+        """구성 요소별 준비(warm) 상태. 토큰과 종목 마스터가 준비되면 ready."""
+        master = get_master_status()
+        if settings.DEPLOY_MODE == DEPLOY_WEB:
+            return {
+                "ready": remote_market.connected and master["count"] > 0,
+                "bus": remote_market.get_stats(),
+                "stock_master": master,
+            }
+        token = kiwoom_client.access_token is not None
+        return {
+            "ready": token and master["count"] > 0,
+            "token": token,
+            "websocket": kiwoom_client._ws_logged_in,
+            "stock_master": master,
+        }
+
     return app
 
 app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=False)
+    # [Decision] 멀티코어 배포: ingest 1개(DEPLOY_MODE=ingest, 별도 포트) + web worker N개(DEPLOY_MODE=web, WEB_WORKERS=N)
+    # web worker만 여러 프로세스로 실행 → 키움 세션/REG는 1개로 유지하면서 클라이언트 fan-out은 코어 수만큼 확장
+    workers = settings.WEB_WORKERS if settings.DEPLOY_MODE == DEPLOY_WEB else 1
+    uvicorn.run("main:app", host="0.0.0.0", port=settings.SERVER_PORT, reload=False, workers=workers)
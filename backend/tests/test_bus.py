@@ -0,0 +1,241 @@
+import pytest
+import asyncio
+from app.services import bus
+from app.services.bus import BusServer, RemoteMarketClient
+from app.services.tick_decoder import Tick
+
+
+class FakeMarket:
+    """ingest 측 키움 클라이언트 대역 (REST/WS 없이 요청 기록)"""
+    def __init__(self):
+        self.subscribed_symbols = set()
+        self.depth_symbols = set()
+        self.scanner_refs = 0
+
+    async def subscribe_symbol(self, symbol):
+        self.subscribed_symbols.add(f"{symbol}_AL")
+
+    def release_symbol(self, symbol):
+        self.subscribed_symbols.discard(f"{symbol}_AL")
+
+    async def subscribe_depth(self, symbol):
+        self.depth_symbols.add(f"{symbol}_AL")
+
+    def release_depth(self, symbol):
+        self.depth_symbols.discard(f"{symbol}_AL")
+
+    async def subscribe_scanner(self):
+        self.scanner_refs += 1
+
+    def release_scanner(self):
+        self.scanner_refs -= 1
+
+    def is_chart_cached(self, symbol, timeframe):
+        return False
+
+    async def get_stored_chart(self, symbol, timeframe):
+        return {"output": [{"dt": "20240102", "close": 1}]}
+
+    async def get_quotes(self, symbols):
+        return {s: {"symbol": s, "price": 70000} for s in symbols if s == "005930"}
+
+    async def get_stock_chart(self, symbol, timeframe):
+        return {"output": [{"dt": "20240103", "close": 2}]}
+
+    async def stream_chart_history(self, symbol, timeframe, max_bars, before=None):
+        assert before == "20240102"
+        yield [{"dt": "20240101"}], True
+        yield [{"dt": "20231229"}], False
+
+
+async def _wait_for(predicate, timeout=1.0):
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not met")
+
+
+@pytest.mark.asyncio
+async def test_worker_receives_charts_and_subscribed_ticks(tmp_path, monkeypatch):
+    received = []
+
+    async def handle_tick(tick):
+        received.append(tick.to_dict())
+
+    monkeypatch.setattr(bus.multiplexer, "handle_tick", handle_tick)
+    path = str(tmp_path / "bus.sock")
+    market = FakeMarket()
+    server = BusServer()
+    client = RemoteMarketClient()
+    await server.start(path, market)
+    await client.start(path)
+    try:
+        await _wait_for(lambda: client.connected)
+        await client.subscribe_symbol("005930")
+        await _wait_for(lambda: server.get_stats()["symbols"] == 1)
+        # 구독 요청은 ingest의 키움 클라이언트 REG로 전달 (_AL 코드)
+        assert market.subscribed_symbols == {"005930_AL"}
+
+        assert (await client.get_stock_chart("005930", "D"))["output"][0]["close"] == 2
+        assert (await client.get_stored_chart("005930", "D"))["output"][0]["close"] == 1
+        assert await client.get_quotes(["005930", "000660"]) == {"005930": {"symbol": "005930", "price": 70000}}
+        pages = [(rows[0]["dt"], more) async for rows, more in client.stream_chart_history("005930", "D", 100, "20240102")]
+        assert pages == [("20240101", True), ("20231229", False)]
+
+        # 구독한 종목의 tick만 worker로 전달
+        server.publish_tick(Tick("005930", 70000, 69000, 71000, 68000, 100, 1.5, "090000"))
+        server.publish_tick(Tick("000660", 120000, 0, 0, 0, 0, 0.0, "090000"))
+        await _wait_for(lambda: received)
+        await asyncio.sleep(0.02)
+        assert [t["symbol"] for t in received] == ["005930"]
+        assert received[0]["price"] == 70000
+
+        # worker 내 마지막 참조가 해제되면 ingest의 구독 참조도 반환
+        await client.subscribe_symbol("005930")
+        client.release_symbol("005930")
+        await asyncio.sleep(0.02)
+        assert market.subscribed_symbols == {"005930_AL"}
+        client.release_symbol("005930")
+        await _wait_for(lambda: server.get_stats()["symbols"] == 0)
+        assert market.subscribed_symbols == set()
+    finally:
+        await client.stop()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_worker_receives_depth_for_opted_in_symbols(tmp_path, monkeypatch):
+    received = []
+    monkeypatch.setattr(bus.multiplexer, "publish_depth", lambda symbol, data: received.append((symbol, data)))
+    path = str(tmp_path / "bus.sock")
+    market = FakeMarket()
+    server = BusServer()
+    client = RemoteMarketClient()
+    await server.start(path, market)
+    await client.start(path)
+    try:
+        await _wait_for(lambda: client.connected)
+        await client.subscribe_depth("005930")
+        await _wait_for(lambda: server.get_stats()["depth_symbols"] == 1)
+        assert market.depth_symbols == {"005930_AL"}
+
+        server.publish_depth("005930", {"asks": [[70100, 10]], "bids": []})
+        server.publish_depth("000660", {"asks": [[120100, 1]], "bids": []})
+        await _wait_for(lambda: received)
+        await asyncio.sleep(0.02)
+        assert received == [("005930", {"asks": [[70100, 10]], "bids": []})]
+
+        client.release_depth("005930")
+        await _wait_for(lambda: server.get_stats()["depth_symbols"] == 0)
+        assert market.depth_symbols == set()
+    finally:
+        await client.stop()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_worker_receives_movers_while_subscribed(tmp_path, monkeypatch):
+    received = []
+    monkeypatch.setattr(bus.market_scanner, "publish", received.append)
+    path = str(tmp_path / "bus.sock")
+    market = FakeMarket()
+    server = BusServer()
+    client = RemoteMarketClient()
+    await server.start(path, market)
+    await client.start(path)
+    try:
+        await _wait_for(lambda: client.connected)
+        # worker 내 여러 클라이언트가 구독해도 ingest 스캐너 참조는 worker당 1개
+        await client.subscribe_scanner()
+        await client.subscribe_scanner()
+        await _wait_for(lambda: server.get_stats()["scanner_workers"] == 1)
+        assert market.scanner_refs == 1
+
+        server.publish_movers({"gainers": [{"code": "005930"}]})
+        await _wait_for(lambda: received)
+        assert received == [{"gainers": [{"code": "005930"}]}]
+
+        client.release_scanner()
+        await asyncio.sleep(0.02)
+        assert market.scanner_refs == 1
+        client.release_scanner()
+        await _wait_for(lambda: market.scanner_refs == 0)
+    finally:
+        await client.stop()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_worker_resubscribes_after_ingest_restart(tmp_path):
+    path = str(tmp_path / "bus.sock")
+    client = RemoteMarketClient()
+    await client.subscribe_symbol("005930")   # 연결 전 구독 → 연결 시 전송
+    server = BusServer()
+    await server.start(path, FakeMarket())
+    await client.start(path)
+    try:
+        await _wait_for(lambda: server.get_stats()["symbols"] == 1)
+        await server.stop()
+        # 연결이 끊기면 진행 중 요청은 실패 대신 빈 결과로 처리
+        await _wait_for(lambda: not client.connected)
+        assert (await client.get_stock_chart("005930", "D")) == {"output": []}
+
+        restarted = BusServer()
+        market = FakeMarket()
+        await restarted.start(path, market)
+        await _wait_for(lambda: restarted.get_stats()["symbols"] == 1, timeout=3.0)
+        assert market.subscribed_symbols == {"005930_AL"}
+        await restarted.stop()
+    finally:
+        await client.stop()
+
+
+@pytest.mark.asyncio
+async def test_worker_receives_master_on_connect_and_on_swap(tmp_path, monkeypatch):
+    applied = []
+
+    async def apply_remote_master(stocks, source):
+        applied.append(([s["code"] for s in stocks], source))
+
+    monkeypatch.setattr(bus, "apply_remote_master", apply_remote_master)
+    monkeypatch.setattr(bus, "get_master_status", lambda: {"count": 1, "source": "snapshot"})
+    monkeypatch.setattr(bus, "get_stock_master", lambda: [{"code": "005930", "name": "삼성전자"}])
+    path = str(tmp_path / "bus.sock")
+    server = BusServer()
+    client = RemoteMarketClient()
+    await server.start(path, FakeMarket())
+    await client.start(path)
+    try:
+        # 연결 직후 현재 마스터 수신 (worker에 스냅샷이 없어도 fallback에 머물지 않음)
+        await _wait_for(lambda: applied)
+        assert applied == [(["005930"], "snapshot")]
+
+        # ingest에서 ka10099 갱신으로 마스터가 교체되면 worker에도 전달
+        for listener in bus.master_listeners:
+            listener([{"code": "005930", "name": "삼성전자"}, {"code": "000660", "name": "SK하이닉스"}], "api")
+        await _wait_for(lambda: len(applied) == 2)
+        assert applied[-1] == (["005930", "000660"], "api")
+    finally:
+        await client.stop()
+        await server.stop()
+    assert server.publish_master not in bus.master_listeners
+
+
+@pytest.mark.asyncio
+async def test_worker_reconnects_after_undecodable_frame(tmp_path):
+    path = str(tmp_path / "bus.sock")
+    server = BusServer()
+    client = RemoteMarketClient()
+    await server.start(path, FakeMarket())
+    await client.start(path)
+    try:
+        await _wait_for(lambda: server.get_stats()["workers"] == 1)
+        peer = next(iter(server._peers))
+        peer.writer.write(bus._LEN.pack(3) + b"{x}")
+        # 디코딩 에러에도 수신 루프가 끝나지 않고 재연결
+        await _wait_for(lambda: client.reconnects == 1)
+        await _wait_for(lambda: client.connected, timeout=3.0)
+    finally:
+        await client.stop()
+        await server.stop()
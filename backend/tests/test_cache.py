@@ -0,0 +1,63 @@
+import pytest
+import asyncio
+from app.core.cache import AsyncTTLCache
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_single_load():
+    cache = AsyncTTLCache(max_bytes=1000)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"output": [1, 2, 3]}
+
+    results = await asyncio.gather(*[cache.get_or_load(("005930", "D"), loader, ttl=60) for _ in range(10)])
+
+    assert calls == 1
+    assert all(r is results[0] for r in results)
+    stats = cache.get_stats()
+    assert stats["misses"] == 1
+    assert stats["coalesced"] == 9
+
+    # 이후 요청은 캐시 hit
+    await cache.get_or_load(("005930", "D"), loader, ttl=60)
+    assert calls == 1
+    assert cache.get_stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_lru_eviction_under_memory_cap():
+    cache = AsyncTTLCache(max_bytes=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.get("a")            # a를 최근 사용으로 갱신
+    cache.set("c", 3, ttl=60)  # 가장 오래 사용되지 않은 b 제거
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.get_stats()["evictions"] == 1
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_coalesced_waiters():
+    cache = AsyncTTLCache(max_bytes=1000)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"output": [1]}
+
+    first = asyncio.create_task(cache.get_or_load("k", loader, ttl=60))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(cache.get_or_load("k", loader, ttl=60))
+    await asyncio.sleep(0)
+
+    # 첫 호출자(loader 시작)가 취소돼도 병합된 대기자는 결과를 받고, 결과는 캐시에 남음
+    first.cancel()
+    assert await second == {"output": [1]}
+    assert first.cancelled()
+    assert calls == 1
+    assert cache.get("k") == {"output": [1]}
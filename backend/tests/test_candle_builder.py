@@ -0,0 +1,57 @@
+import pytest
+from app.services.candle_builder import CandleBuilder
+
+def _bar(dt, price, volume):
+    return {"dt": dt, "open": price, "high": price, "low": price, "close": price, "volume": volume}
+
+def test_minute_bars_built_from_cumulative_volume():
+    builder = CandleBuilder()
+    today = builder._today()
+    builder.seed("005930", "1", [_bar(f"{today}090000", 73000, 500)])
+
+    builder.on_tick("005930", 73100, 73000, 73100, 73000, 10000, "090010")  # 첫 tick: 증분 0
+    builder.on_tick("005930", 73200, 73000, 73200, 73000, 10300, "090030")  # +300
+    builder.on_tick("005930", 73050, 73000, 73200, 73000, 10400, "090105")  # 새 봉 +100
+
+    bars = builder.get_snapshot("005930", "1")["output"]
+    assert len(bars) == 2
+    assert bars[0]["high"] == 73200
+    assert bars[0]["close"] == 73200
+    assert bars[0]["volume"] == 800
+    assert bars[1]["dt"] == f"{today}090100"
+    assert bars[1]["open"] == 73050
+    assert bars[1]["volume"] == 100
+
+def test_daily_bar_uses_session_fields():
+    builder = CandleBuilder()
+    today = builder._today()
+    builder.seed("005930", "D", [_bar("20200101", 70000, 1), _bar(today, 73000, 100)])
+
+    builder.on_tick("005930", 73500, 72900, 74000, 72500, 2000000, "100000")
+
+    bar = builder.get_snapshot("005930", "D")["output"][-1]
+    assert (bar["open"], bar["high"], bar["low"], bar["close"], bar["volume"]) == (72900, 74000, 72500, 73500, 2000000)
+
+def test_unseeded_timeframe_falls_back_to_rest():
+    builder = CandleBuilder()
+    assert builder.get_snapshot("005930", "D") is None
+    builder.seed("005930", "W", [_bar("20200101", 70000, 1)])
+    assert builder.get_snapshot("005930", "W") is None
+
+def test_cumulative_volume_restarts_on_new_trading_day():
+    builder = CandleBuilder()
+    builder._today = lambda: "20260102"
+    builder.seed("005930", "1", [_bar("20260102153000", 73000, 500)])
+    builder.on_tick("005930", 73000, 73000, 73000, 73000, 10000, "153000")
+    builder.on_tick("005930", 73100, 73000, 73100, 73000, 10300, "153010")
+
+    # 날짜 변경: 재seed 전 tick은 전일 시계열에 반영되지 않고 누적거래량 기준값도 유지하지 않음
+    builder._today = lambda: "20260105"
+    builder.on_tick("005930", 73200, 73200, 73200, 73200, 50, "090000")
+    builder.seed("005930", "1", [_bar("20260105090000", 73200, 50)])
+    builder.on_tick("005930", 73300, 73200, 73300, 73200, 200, "090010")  # 당일 첫 tick: 증분 0
+    builder.on_tick("005930", 73400, 73200, 73400, 73200, 260, "090020")  # +60
+
+    bars = builder.get_snapshot("005930", "1")["output"]
+    assert len(bars) == 1
+    assert bars[0]["volume"] == 110
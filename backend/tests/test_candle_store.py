@@ -0,0 +1,22 @@
+import pytest
+from app.services.candle_store import CandleStore
+
+def _bar(dt, close):
+    return {"dt": dt, "open": close, "high": close, "low": close, "close": close, "volume": 10}
+
+@pytest.mark.asyncio
+async def test_upsert_merges_and_overwrites_last_bar(tmp_path):
+    store = CandleStore(str(tmp_path / "candles.db"))
+    await store.upsert("005930", "D", [_bar("20240102", 100), _bar("20240103", 101)])
+    # 마지막 봉(미완성) 갱신 + 신규 봉 추가
+    await store.upsert("005930", "D", [_bar("20240103", 105), _bar("20240104", 106)])
+
+    bars = await store.load("005930", "D")
+    assert [b["dt"] for b in bars] == ["20240102", "20240103", "20240104"]
+    assert bars[1]["close"] == 105
+    assert await store.last_dt("005930", "D") == "20240104"
+    assert await store.last_dt("005930", "1") is None
+
+    # limit은 최신 봉 기준
+    assert [b["dt"] for b in await store.load("005930", "D", limit=1)] == ["20240104"]
+    store.close()
@@ -0,0 +1,45 @@
+import struct
+import pytest
+from app.core.chart_codec import BINARY_KIND_CHUNK, dt_to_time, encode_binary, encode_columnar, time_to_dt
+
+BARS = [
+    {"dt": "20260102090000", "open": 100.0, "high": 110.0, "low": 90.0, "close": 105.0, "volume": 1000.0},
+    {"dt": "20260102090100", "open": 105.0, "high": 112.0, "low": 101.0, "close": 111.0, "volume": 3000000000.0},
+]
+
+def test_dt_to_time_matches_frontend_parse():
+    assert dt_to_time("20260102") == 1767312000
+    assert dt_to_time("20260102090100") == 1767312000 + 9 * 3600 + 60
+    assert dt_to_time("bad") == 0
+    # requestHistory before(time) → dt 역변환
+    assert time_to_dt(1767312000, "D") == "20260102"
+    assert time_to_dt(1767312000 + 9 * 3600 + 60, "1") == "20260102090100"
+
+def test_columnar_uses_integer_columns():
+    msg = encode_columnar({"type": "chart", "symbol": "005930", "data": {"output": BARS, "stale": True}})
+    cols = msg["data"]["columns"]
+    assert cols["open"] == [100, 105]
+    assert cols["volume"] == [1000, 3000000000]
+    assert msg["data"]["stale"] is True
+    assert "output" not in msg["data"]
+
+def test_binary_frame_layout():
+    frame = encode_binary({"type": "chartChunk", "symbol": "005930", "timeframe": "1",
+                           "page": 3, "done": False, "data": {"output": BARS}})
+    kind, flags, page, n = struct.unpack_from("<BBHI", frame)
+    assert (kind, flags, page, n) == (BINARY_KIND_CHUNK, 0, 3, 2)
+    offset = 8
+    assert frame[offset + 1:offset + 7] == b"005930"
+    offset += 7
+    assert frame[offset + 1:offset + 2] == b"1"
+    offset += 2
+    offset += -offset % 8
+    times = struct.unpack_from("<2d", frame, offset)
+    volumes = struct.unpack_from("<2d", frame, offset + 16)
+    opens = struct.unpack_from("<2i", frame, offset + 32)
+    closes = struct.unpack_from("<2i", frame, offset + 32 + 24)
+    assert times[1] - times[0] == 60
+    assert volumes == (1000.0, 3000000000.0)
+    assert opens == (100, 105)
+    assert closes == (105, 111)
+    assert len(frame) == offset + 2 * 8 * 2 + 2 * 4 * 4
@@ -0,0 +1,126 @@
+import pytest
+from app.services import indicators
+from app.services.candle_builder import CandleBuilder
+from app.services.indicators import IndicatorEngine, IndicatorSeries, _make_indicator, parse_spec
+
+SPECS = ["ma:5", "ema:5", "rsi:3", "bb:5:2", "vwap"]
+
+
+def _bars(n, day="20240102"):
+    bars = []
+    for i in range(n):
+        close = 70000 + (i * 37 % 11 - 5) * 100 + i * 10
+        bars.append({"dt": f"{day}{9 + i // 60:02d}{i % 60:02d}00", "open": close, "high": close + 50,
+                     "low": close - 50, "close": close, "volume": 100 + i})
+    return bars
+
+
+def _series(names, bars):
+    series = IndicatorSeries("005930", "1")
+    for name in names:
+        series.indicators[name] = _make_indicator(name)
+    series.seed(bars, None)
+    return series
+
+
+def _reference_sma(closes, n):
+    return [None if i < n - 1 else round(sum(closes[i - n + 1:i + 1]) / n, 2) for i in range(len(closes))]
+
+
+def _reference_rsi(closes, n):
+    # 프론트 calculateRSI와 동일한 순차 계산
+    out = [None] * len(closes)
+    if len(closes) < n + 1:
+        return out
+    diffs = [closes[i] - closes[i - 1] for i in range(1, len(closes))]
+    ag = sum(max(d, 0) for d in diffs[:n]) / n
+    al = sum(max(-d, 0) for d in diffs[:n]) / n
+    out[n] = round(100 if al == 0 else 100 - 100 / (1 + ag / al), 2)
+    for i in range(n + 1, len(closes)):
+        d = diffs[i - 1]
+        ag = (ag * (n - 1) + max(d, 0)) / n
+        al = (al * (n - 1) + max(-d, 0)) / n
+        out[i] = round(100 if al == 0 else 100 - 100 / (1 + ag / al), 2)
+    return out
+
+
+def test_parse_spec_normalizes_and_rejects():
+    assert parse_spec("MA:20") == "ma:20"
+    assert parse_spec("bb") == "bb:20:2"
+    assert parse_spec("bb:20:2.5") == "bb:20:2.5"
+    assert parse_spec("vwap") == "vwap"
+    assert parse_spec("ma:0") is None
+    assert parse_spec("ma:2.5") is None
+    assert parse_spec("macd") is None
+    assert parse_spec(20) is None
+
+
+def test_vectorized_seed_matches_sequential_reference():
+    bars = _bars(60)
+    closes = [b["close"] for b in bars]
+    series = _series(["ma:5", "rsi:3"], bars)
+    assert series.history["ma:5"][0] == _reference_sma(closes, 5)
+    assert series.history["rsi:3"][0] == _reference_rsi(closes, 3)
+
+
+def test_incremental_updates_match_full_recompute():
+    bars = _bars(150)
+    full = _series(SPECS, bars)
+
+    # 앞 3개 봉으로 시작 (지표 warm-up 구간 포함) → 봉마다 진행 중 tick 2회 + 마감
+    live = _series(SPECS, [dict(b) for b in bars[:3]])
+    for bar in bars[3:]:
+        forming = dict(bar, close=bar["close"] - 300, volume=1)
+        live.bars.append(forming)
+        live.advance(forming, live.bars[-2])
+        forming.update(bar)
+        live.advance(forming, None)
+
+    assert live.dts == full.dts
+    for name in SPECS:
+        for got, want in zip(live.history[name], full.history[name]):
+            assert got == pytest.approx(want, abs=0.02)
+
+
+class _FakeWS:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+
+@pytest.mark.asyncio
+async def test_engine_shares_series_and_updates_from_live_bars(monkeypatch):
+    builder = CandleBuilder()
+    monkeypatch.setattr(indicators, "candle_builder", builder)
+    updates = []
+    monkeypatch.setattr(indicators.ws_manager, "broadcast_to",
+                        lambda clients, message, key=None, droppable=True: updates.append((len(clients), message)))
+    today = builder._today()
+    builder.seed("005930", "1", _bars(30, today))
+
+    async def load_chart(symbol, timeframe):
+        raise AssertionError("실시간 봉이 있으면 REST 조회 없음")
+
+    engine = IndicatorEngine()
+    a, b = _FakeWS(), _FakeWS()
+    assert await engine.subscribe(a, "005930", "1", ["ma:5", "bogus"], load_chart) == ["ma:5"]
+    assert await engine.subscribe(b, "005930", "1", ["MA:5"], load_chart) == ["ma:5"]
+    assert engine.get_stats()["series"] == 1 and engine.get_stats()["indicators"] == 1
+    snapshot = a.sent[0]["data"]
+    assert len(snapshot["dt"]) == 30 and len(snapshot["series"]["ma:5"]) == 30
+
+    # 새 봉 시작 tick → 이전 봉 확정 + 진행 중인 봉 값 갱신, flush에서 1회 전송
+    builder.on_tick("005930", 80000, 0, 0, 0, 0, "235900")
+    engine.on_tick("005930")
+    engine.flush()
+    closes = [bar["close"] for bar in builder.get_series("005930", "1").bars[-5:]]
+    assert updates == [(2, {"type": "indicator", "symbol": "005930", "timeframe": "1",
+                            "dt": f"{today}235900", "values": {"ma:5": round(sum(closes) / 5, 2)}})]
+    engine.flush()
+    assert len(updates) == 1
+
+    engine.release(a)
+    engine.release(b, "005930")
+    assert engine.get_stats()["series"] == 0
@@ -0,0 +1,50 @@
+import pytest
+import asyncio
+from app.services.ingest import IngestPipeline, peek_trnm
+
+def test_peek_trnm_without_json_parse():
+    assert peek_trnm('{"trnm": "PING"}') == "PING"
+    assert peek_trnm('{"data":[{"item":"005930_AL"}],"trnm":"REAL"}') == "REAL"
+    assert peek_trnm('{"stk_cd": "005930"}') is None
+
+@pytest.mark.asyncio
+async def test_pipeline_decodes_and_distributes_in_order():
+    delivered = []
+
+    async def distribute(item):
+        delivered.append(item)
+
+    pipeline = IngestPipeline(lambda raw: raw.split(","), distribute)
+    pipeline.submit("a,b")
+    pipeline.submit("c")
+    await asyncio.sleep(0.01)
+    await pipeline.stop()
+
+    assert delivered == ["a", "b", "c"]
+    stats = pipeline.get_stats()
+    assert stats["reader"]["received"] == 2
+    assert stats["decode"]["processed"] == 2
+    assert stats["distribute"]["processed"] == 3
+    assert stats["distribute"]["depth"] == 0
+
+@pytest.mark.asyncio
+async def test_reader_never_blocks_and_drops_oldest_on_overload():
+    release = asyncio.Event()
+    delivered = []
+
+    async def slow_distribute(item):
+        await release.wait()
+        delivered.append(item)
+
+    pipeline = IngestPipeline(lambda raw: [raw], slow_distribute, raw_queue_size=2, item_queue_size=2)
+    for i in range(10):
+        pipeline.submit(str(i))   # 동기 호출: 하위 단계가 막혀 있어도 즉시 반환
+    await asyncio.sleep(0.01)
+    stats = pipeline.get_stats()
+    assert stats["reader"]["dropped"] + stats["distribute"]["dropped"] > 0
+
+    release.set()
+    await asyncio.sleep(0.01)
+    await pipeline.stop()
+    # 최신 프레임은 보존
+    assert delivered[-1] == "9"
@@ -1,7 +1,13 @@
 import pytest
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
 import respx
 from httpx import Response
-from app.services.kiwoom_client import KiwoomClient
+from app.services import kiwoom_client
+from app.services.candle_store import CandleStore
+from app.services.kiwoom_client import KiwoomClient, _store_fresh_after
 from app.core.config import settings
 
 @pytest.mark.asyncio
@@ -27,3 +33,185 @@ async def test_get_current_price_logic():
     
     result = await client.get_current_price("005930")
     assert result["output"]["stck_prpr"] == "50000"
+
+
+class _RecordingWS:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, data):
+        self.sent.append(json.loads(data))
+
+
+def _fresh_realtime_client(monkeypatch):
+    client = KiwoomClient()
+    monkeypatch.setattr(settings, "REALTIME_RELEASE_GRACE_SEC", 0.05)
+    client.ws_connection = _RecordingWS()
+    client._ws_logged_in = True
+    client.subscribed_symbols = set()
+    client._pending_symbols = set()
+    client.reg_batcher.reset()
+    client._refcounts = {}
+    client._release_at = {}
+    client.depth_symbols = set()
+    client._depth_refcounts = {}
+    return client
+
+@pytest.mark.asyncio
+async def test_realtime_refcount_removes_after_grace(monkeypatch):
+    client = _fresh_realtime_client(monkeypatch)
+    await client.subscribe_symbol("005930")
+    await client.subscribe_symbol("005930")   # 두 번째 클라이언트
+    client.release_symbol("005930")
+    await asyncio.sleep(0.1)
+    # 참조가 남아 있으면 REMOVE 없음
+    assert "005930_AL" in client.subscribed_symbols
+    assert not [m for m in client.ws_connection.sent if m["trnm"] == "REMOVE"]
+
+    client.release_symbol("005930")
+    await asyncio.sleep(0.1)
+    removes = [m for m in client.ws_connection.sent if m["trnm"] == "REMOVE"]
+    assert removes and removes[0]["data"][0]["item"] == ["005930_AL"]
+    assert client.subscribed_symbols == set()
+
+@pytest.mark.asyncio
+async def test_resubscribe_within_grace_keeps_registration(monkeypatch):
+    client = _fresh_realtime_client(monkeypatch)
+    await client.subscribe_symbol("000660")
+    client.release_symbol("000660")
+    await client.subscribe_symbol("000660")
+    await asyncio.sleep(0.1)
+    assert "000660_AL" in client.subscribed_symbols
+    assert not [m for m in client.ws_connection.sent if m["trnm"] == "REMOVE"]
+
+    # 재연결 시 참조 중인 종목만 재등록 (grace 대기 종목은 제외)
+    await client.subscribe_symbol("035720")
+    client.release_symbol("035720")
+    client.ws_connection = None
+    client._ws_logged_in = False
+    await client._flush_pending_symbols()
+    assert client.subscribed_symbols == {"000660_AL"}
+
+@pytest.mark.asyncio
+async def test_depth_registers_0d_and_removes_on_last_release(monkeypatch):
+    client = _fresh_realtime_client(monkeypatch)
+    await client.subscribe_depth("005930")
+    await client.subscribe_depth("005930")
+    await client.reg_batcher.flush()
+    regs = [m for m in client.ws_connection.sent if m["trnm"] == "REG"]
+    assert len(regs) == 1 and regs[0]["data"][0] == {"item": ["005930_AL"], "type": ["0D"]}
+
+    client.release_depth("005930")
+    await asyncio.sleep(0)
+    assert not [m for m in client.ws_connection.sent if m["trnm"] == "REMOVE"]
+
+    # 호가는 grace 없이 마지막 참조 해제 시 즉시 REMOVE (체결 등록은 유지)
+    client.release_depth("005930")
+    await asyncio.sleep(0.01)
+    removes = [m for m in client.ws_connection.sent if m["trnm"] == "REMOVE"]
+    assert removes and removes[0]["data"][0] == {"item": ["005930_AL"], "type": ["0D"]}
+    assert client.depth_symbols == set()
+
+
+@pytest.mark.asyncio
+async def test_given_up_registration_is_resent_on_resubscribe(monkeypatch):
+    client = _fresh_realtime_client(monkeypatch)
+    client.reg_batcher.max_retries = 0
+    await client.subscribe_symbol("005930")
+    await client.reg_batcher.flush()
+    client.reg_batcher.on_ack({"trnm": "REG", "return_code": 105110, "return_msg": "limit"})
+    # 등록 포기 종목은 구독 집합에서 빠지고 재연결 대상(대기열)으로 이동
+    assert "005930_AL" not in client.subscribed_symbols
+    assert "005930_AL" in client._pending_symbols
+
+    await client.subscribe_symbol("005930")
+    await client.reg_batcher.flush()
+    regs = [m for m in client.ws_connection.sent if m["trnm"] == "REG"]
+    assert [m["data"][0]["item"] for m in regs] == [["005930_AL"], ["005930_AL"]]
+    client.reg_batcher.reset()
+
+
+def _minute_bar(dt, close):
+    return {"dt": dt, "open": close, "high": close, "low": close, "close": close, "volume": 10}
+
+@pytest.mark.asyncio
+async def test_warm_store_fetches_only_missing_tail(monkeypatch, tmp_path):
+    client = KiwoomClient()
+    store = CandleStore(str(tmp_path / "candles.db"))
+    monkeypatch.setattr(kiwoom_client, "candle_store", store)
+    client._store_synced = {}
+    await store.upsert("005930", "1", [_minute_bar(f"20240102{h:02d}0000", 100) for h in (9, 10, 11)])
+
+    # 최신 페이지부터: 2페이지에서 저장된 마지막 봉(11시)에 닿음 → 3페이지는 요청하지 않음
+    pages = [
+        {"output": [_minute_bar("20240102130000", 103), _minute_bar("20240102120000", 102)], "next_key": "p2"},
+        {"output": [_minute_bar("20240102113000", 101), _minute_bar("20240102110000", 100)], "next_key": "p3"},
+        {"output": [_minute_bar("20240102100000", 100)], "next_key": ""},
+    ]
+    calls = []
+
+    async def fake_fetch(symbol, timeframe, base_dt, next_key="", priority=None):
+        calls.append(next_key)
+        return pages[len(calls) - 1]
+
+    monkeypatch.setattr(client, "_fetch_stock_chart", fake_fetch)
+    # 타임프레임 기준 최신 경계가 1분 전이라고 가정
+    monkeypatch.setattr(kiwoom_client, "_store_fresh_after", lambda tf, now: time.time() - 60)
+
+    data = await client._load_chart_with_store("005930", "1", "20240102")
+    assert calls == ["", "p2"]
+    assert [b["dt"][8:10] for b in data["output"]] == ["09", "10", "11", "11", "12", "13"]
+
+    # 방금 동기화한 저장소는 최신 → REST 호출 없이 저장소로 응답
+    data = await client._load_chart_with_store("005930", "1", "20240102")
+    assert calls == ["", "p2"]
+    assert len(data["output"]) == 6 and not data.get("stale")
+    store.close()
+
+def test_store_fresh_after_session_boundaries():
+    kst = timezone(timedelta(hours=9))
+    # 장중 분봉: 현재 봉 시작 시각, 장중 일봉: 항상 조회
+    now = datetime(2024, 1, 3, 10, 7, 30, tzinfo=kst)  # 수요일
+    assert _store_fresh_after("5", now) == datetime(2024, 1, 3, 10, 5, tzinfo=kst).timestamp()
+    assert _store_fresh_after("D", now) == now.timestamp()
+    # 장외: 직전 세션 종료 (월요일 개장 전 → 금요일 20시)
+    assert _store_fresh_after("D", datetime(2024, 1, 3, 21, 0, tzinfo=kst)) == \
+        datetime(2024, 1, 3, 20, 0, tzinfo=kst).timestamp()
+    assert _store_fresh_after("1", datetime(2024, 1, 8, 7, 0, tzinfo=kst)) == \
+        datetime(2024, 1, 5, 20, 0, tzinfo=kst).timestamp()
+
+@pytest.mark.asyncio
+async def test_history_serves_store_then_resumes_rest_from_oldest_bar(monkeypatch, tmp_path):
+    client = KiwoomClient()
+    store = CandleStore(str(tmp_path / "candles.db"))
+    monkeypatch.setattr(kiwoom_client, "candle_store", store)
+    client._history_cursors.clear()
+    await store.upsert("005930", "D", [_minute_bar(f"202401{d:02d}", 100) for d in (2, 3, 4, 5)])
+
+    pages = {
+        "": {"output": [_minute_bar("20240102", 100), _minute_bar("20231229", 99)], "next_key": "k2"},
+        "k2": {"output": [_minute_bar("20231228", 98)], "next_key": "k3"},
+    }
+    calls = []
+
+    async def fake_fetch(symbol, timeframe, base_dt, next_key="", priority=None):
+        calls.append((base_dt, next_key))
+        return pages[next_key]
+
+    monkeypatch.setattr(client, "_fetch_stock_chart", fake_fetch)
+
+    # 저장소에 있는 구간은 REST 없이 전송
+    chunks = [c async for c in client.stream_chart_history("005930", "D", 2, before="20240105")]
+    assert chunks == [([_minute_bar("20240103", 100), _minute_bar("20240104", 100)], False)]
+    assert calls == []
+
+    # 저장소 부족분만 가장 오래된 봉 날짜부터 조회, 이미 가진 봉(20240102)은 제외
+    chunks = [c async for c in client.stream_chart_history("005930", "D", 2, before="20240103")]
+    assert [[r["dt"] for r in rows] for rows, _ in chunks] == [["20240102"], ["20231229"]]
+    assert calls == [("20240102", "")]
+
+    # 다음 스크롤은 기억한 next-key로 이어서 조회 (처음 페이지부터 다시 받지 않음)
+    chunks = [c async for c in client.stream_chart_history("005930", "D", 1, before="20231229")]
+    assert [[r["dt"] for r in rows] for rows, _ in chunks] == [["20231228"]]
+    assert calls[-1] == (datetime.now(timezone(timedelta(hours=9))).strftime('%Y%m%d'), "k2")
+    store.close()
@@ -0,0 +1,24 @@
+import logging
+import pytest
+from app.core.log import LogCategory, StructuredFormatter
+
+def test_disabled_category_never_emits():
+    category = LogCategory("tick")
+    assert not any(category.allow() for _ in range(1000))
+    assert category.seen == 0
+
+def test_sampling_and_rate_limit_report_suppressed():
+    category = LogCategory("ws_raw", enabled=True, sample_every=10, max_per_sec=2)
+    allowed = [category.allow() for _ in range(100)]
+    # 10건 중 1건 샘플링 → 10건 후보, 그중 초당 2건만 통과
+    assert sum(allowed) == 2
+    fields = category.fields(frame="x")["fields"]
+    assert fields["category"] == "ws_raw"
+    assert fields["suppressed"] == 98
+    assert "suppressed" not in category.fields()["fields"]
+
+def test_structured_formatter_appends_fields():
+    record = logging.LogRecord("kiwoom", logging.INFO, __file__, 1, "틱 브로드캐스트", None, None)
+    record.fields = {"symbol": "005930", "price": 73400}
+    assert StructuredFormatter().format(record).endswith("틱 브로드캐스트 symbol=005930 price=73400")
+    assert '"symbol": "005930"' in StructuredFormatter(as_json=True).format(record)
@@ -8,3 +8,19 @@ def test_health_check():
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok", "version": "0.1.0"}
+
+def test_stock_names_etag_and_304():
+    response = client.get("/stocks/names")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.headers["x-master-version"]
+    assert response.json()
+
+    cached = client.get("/stocks/names", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+def test_stock_names_immutable_only_for_content_version():
+    version = client.get("/stocks/names").headers["x-master-version"]
+    assert "immutable" in client.get(f"/stocks/names?v={version}").headers["cache-control"]
+    assert client.get("/stocks/names?v=1").headers["cache-control"] == "no-cache"
@@ -0,0 +1,43 @@
+from app.services.order_book import OrderBook, OrderBookStore
+from app.services.streamer import DataMultiplexer
+
+
+def test_partial_update_keeps_previous_levels():
+    book = OrderBook("005930")
+    book.apply({"41": "+70100", "42": "+70200", "51": "-70000", "61": "150", "62": "300", "71": "500",
+                "121": "450", "125": "500", "21": "090001"})
+    # 일부 단계만 온 메시지: 나머지 단계는 유지
+    book.apply({"61": "90", "21": "090002"})
+
+    data = book.to_dict()
+    assert data["asks"] == [[70100, 90], [70200, 300]]
+    assert data["bids"] == [[70000, 500]]
+    assert data["totalAsk"] == 450 and data["totalBid"] == 500
+    assert data["timestamp"] == "090002"
+    assert book.updates == 2
+
+
+def test_store_reuses_book_per_symbol():
+    store = OrderBookStore()
+    first = store.apply("005930_AL", {"41": "70100"})
+    second = store.apply("005930", {"41": "70200"})
+    assert first is second
+    assert store.get("005930").to_dict()["asks"] == [[70200, 0]]
+    assert store.apply("", {"41": "1"}) is None
+    store.drop("005930")
+    assert store.get_stats() == {"symbols": 0, "messages": 2}
+
+
+def test_multiplexer_conflates_depth_per_flush():
+    mux = DataMultiplexer()
+    published = []
+    mux.depth_listeners.append(lambda symbol, data: published.append((symbol, data["asks"])))
+    book = OrderBook("005930")
+    for price in (70100, 70200, 70300):
+        book.apply({"41": str(price), "61": "1"})
+        mux.handle_depth(book)
+
+    mux.flush_depth()
+    mux.flush_depth()
+    # 한 flush 주기 안의 갱신은 최신 상태 1건으로 전송
+    assert published == [("005930", [[70300, 1]])]
@@ -0,0 +1,30 @@
+import time
+from app.services.quote_store import QuoteStore
+from app.services.tick_decoder import Tick
+
+
+def _tick(symbol, price, volume, ts="090000"):
+    return Tick(symbol, price, 70000, max(price, 71000), min(price, 69000), volume, 1.2, ts)
+
+def test_quote_store_keeps_latest_per_symbol():
+    store = QuoteStore()
+    store.update(_tick("005930", 70500, 1000))
+    store.update(_tick("000660", 120000, 50))
+    store.update(_tick("005930", 70600, 1200, "090001"))
+    # 순서가 뒤바뀐 체결: 누적거래량은 후퇴하지 않음
+    store.update(_tick("005930", 70700, 1100, "090002"))
+
+    quote = store.get("005930")
+    assert quote["price"] == 70700
+    assert quote["volume"] == 1200
+    assert quote["timestamp"] == "090002"
+    assert store.get("035720") is None
+    assert set(store.get_many(["005930", "000660", "035720"])) == {"005930", "000660"}
+    assert store.get_stats() == {"symbols": 2, "updates": 4}
+
+def test_quote_store_resets_at_day_boundary():
+    store = QuoteStore()
+    store.update(_tick("005930", 70500, 1000))
+    store._reset_at = time.time() - 1
+    assert store.get("005930") is None
+    assert store.get_stats()["symbols"] == 0
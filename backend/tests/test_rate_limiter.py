@@ -33,3 +33,48 @@ async def test_staggered_execution():
     duration = time.monotonic() - start_time
     assert results == [2, 4, 6]
     assert duration >= 0.2 # 0.1s * 2 intervals
+
+@pytest.mark.asyncio
+async def test_scheduler_grants_interactive_before_background():
+    from app.core.rate_limiter import (
+        RequestScheduler, PRIORITY_INTERACTIVE, PRIORITY_MASTER,
+    )
+    # 초당 10회, 버스트 1 → 첫 요청 이후에는 0.1초마다 1건씩 배정
+    scheduler = RequestScheduler(TokenBucket(rate_per_sec=10.0, capacity=1))
+    order = []
+
+    async def request(name, priority):
+        await scheduler.acquire(priority)
+        order.append(name)
+
+    tasks = [asyncio.create_task(request(f"master{i}", PRIORITY_MASTER)) for i in range(3)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(request("chart", PRIORITY_INTERACTIVE)))
+    await asyncio.gather(*tasks)
+
+    # 먼저 대기 중이던 대량 작업보다 화면 차트 요청이 앞서 처리됨
+    assert order.index("chart") <= 1
+    stats = scheduler.get_stats()["queues"]
+    assert stats["master"]["granted"] == 3
+    assert stats["interactive"]["granted"] == 1
+
+@pytest.mark.asyncio
+async def test_adaptive_bucket_backs_off_and_recovers():
+    from app.core.rate_limiter import AdaptiveTokenBucket, parse_retry_after
+    limiter = AdaptiveTokenBucket(rate_per_sec=4.0, capacity=4, min_rate=0.5, increase_per_sec=1.0)
+
+    # 같은 버스트에서 돌아온 429 여러 건은 1회 감속으로 처리
+    limiter.on_throttle(parse_retry_after("0.2"))
+    limiter.on_throttle(None)
+    assert limiter.rate == 2.0
+    assert limiter.throttled == 2
+
+    # Retry-After 동안은 토큰을 배정하지 않음
+    start = time.monotonic()
+    await limiter.consume()
+    assert time.monotonic() - start >= 0.2
+
+    # 성공 응답이 이어지면 최대 속도까지 가산 회복
+    for _ in range(50):
+        limiter.on_success()
+    assert limiter.rate == 4.0
@@ -0,0 +1,82 @@
+import pytest
+import asyncio
+import time
+from app.services.reg_batcher import RegBatcher
+
+
+def _batcher(sent, wanted=lambda s, kind: True, **kwargs):
+    async def send(msg):
+        sent.append((time.monotonic(), msg))
+        return True
+    return RegBatcher(send, wanted, **kwargs)
+
+@pytest.mark.asyncio
+async def test_steady_subscribes_flush_within_max_wait():
+    sent = []
+    batcher = _batcher(sent, debounce=0.05, max_wait=0.12)
+    start = time.monotonic()
+    # debounce보다 짧은 간격으로 계속 구독 → debounce만 있으면 전송이 무한히 밀림
+    for i in range(10):
+        batcher.add([f"{i:06d}_AL"])
+        await asyncio.sleep(0.03)
+    assert sent, "max_wait 안에 REG가 전송되어야 함"
+    assert sent[0][0] - start < 0.2
+    batcher.reset()
+
+@pytest.mark.asyncio
+async def test_large_set_is_chunked_across_groups():
+    sent = []
+    batcher = _batcher(sent, chunk_size=100, groups=4)
+    batcher.add([f"{i:06d}_AL" for i in range(250)])
+    await batcher.flush()
+    sizes = [len(m["data"][0]["item"]) for _, m in sent]
+    assert sizes == [100, 100, 50]
+    assert len({m["grp_no"] for _, m in sent}) == 3
+    assert batcher.group_of("000000_AL") == sent[0][1]["grp_no"]
+    # 이미 등록된 종목은 다시 전송하지 않음
+    batcher.add(["000000_AL"])
+    assert batcher.get_stats()["pending"] == 0
+    batcher.reset()
+
+@pytest.mark.asyncio
+async def test_failed_ack_retries_only_wanted_items():
+    sent = []
+    wanted = {"005930_AL"}
+    batcher = _batcher(sent, lambda s, kind: s in wanted, debounce=0.0, retry_backoff=0.01)
+    batcher.add(["005930_AL", "000660_AL"])
+    await batcher.flush()
+    batcher.on_ack({"trnm": "REG", "return_code": 105110, "return_msg": "limit"})
+    await asyncio.sleep(0.1)
+    assert [m["data"][0]["item"] for _, m in sent] == [["005930_AL", "000660_AL"], ["005930_AL"]]
+
+    batcher.on_ack({"trnm": "REG", "return_code": 0})
+    stats = batcher.get_stats()
+    assert stats["failed"] == 1 and stats["acked"] == 1 and stats["in_flight"] == 0
+    batcher.reset()
+
+@pytest.mark.asyncio
+async def test_given_up_items_can_be_registered_again():
+    sent = []
+    subscribed = {"005930_AL"}
+    given_up = []
+
+    def on_give_up(symbol, kind):
+        # 호출 측(KiwoomClient)처럼 구독 집합에서 제외
+        given_up.append((symbol, kind))
+        subscribed.discard(symbol)
+
+    batcher = _batcher(sent, lambda s, kind: s in subscribed, debounce=0.0, max_retries=0,
+                       on_give_up=on_give_up)
+    batcher.add(["005930_AL"])
+    await batcher.flush()
+    batcher.on_ack({"trnm": "REG", "return_code": 105110, "return_msg": "limit"})
+    assert given_up == [("005930_AL", "trade")]
+    assert batcher.get_stats()["given_up"] == 1
+    assert batcher.group_of("005930_AL") is None
+
+    # 이후 재구독하면 REG를 다시 전송
+    subscribed.add("005930_AL")
+    batcher.add(["005930_AL"])
+    await batcher.flush()
+    assert [m["data"][0]["item"] for _, m in sent] == [["005930_AL"], ["005930_AL"]]
+    batcher.reset()
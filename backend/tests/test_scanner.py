@@ -0,0 +1,94 @@
+import pytest
+from app.core.config import settings
+from app.services import scanner
+from app.services.scanner import MarketScanner
+from app.services.tick_decoder import Tick
+
+MASTER = [{"code": f"00000{i}", "name": f"종목{i}"} for i in range(5)]
+
+
+def _row(code, price, change_rate, volume=50000, open_=0, prev_close=0, volume_ratio=0.0):
+    return {"code": code, "price": price, "open": open_ or price, "high": price, "low": price, "volume": volume,
+            "change_rate": change_rate, "prev_close": prev_close, "volume_ratio": volume_ratio}
+
+
+@pytest.fixture
+def master(monkeypatch):
+    state = {"stocks": MASTER, "version": 1}
+    monkeypatch.setattr(scanner, "get_stock_master", lambda: state["stocks"])
+    monkeypatch.setattr(scanner, "get_master_status", lambda: {"version": state["version"]})
+    monkeypatch.setattr(scanner.ws_manager, "broadcast_scanner", lambda message: None)
+    return state
+
+
+def test_rank_orders_columns_and_skips_missing_rows(master):
+    s = MarketScanner()
+    s._ensure_columns()
+    s.apply([
+        _row("000000", 10000, 5.0, open_=10500, prev_close=10000, volume_ratio=200.0),
+        _row("000001", 20000, -3.0, open_=18000, prev_close=20000, volume_ratio=500.0),
+        _row("000002", 30000, 12.5, volume=100, volume_ratio=900.0),
+        _row("999999", 1000, 30.0),   # 마스터에 없는 종목
+    ])
+    ranks = s.rank(2)
+    codes = {name: [s._codes[i] for i in rows] for name, rows in ranks.items()}
+    assert codes["gainers"] == ["000002", "000000"]
+    assert codes["losers"] == ["000001", "000000"]
+    # 최소 거래량 미달(000002)은 거래량 급증 순위에서 제외
+    assert codes["volumeSurge"] == ["000001", "000000"]
+    assert codes["gap"] == ["000001", "000000"]
+    entry = s._entry(ranks["gap"][0])
+    assert entry["gap"] == -10.0 and entry["volumeRatio"] == 500.0
+
+
+@pytest.mark.asyncio
+async def test_sweep_uses_chunked_requests_and_publishes_on_change(master, monkeypatch):
+    monkeypatch.setattr(settings, "SCANNER_CHUNK_SIZE", 2)
+    requested = []
+
+    async def fetch(codes):
+        requested.append(list(codes))
+        return [_row(code, 1000 + i, float(i)) for i, code in enumerate(codes)]
+
+    s = MarketScanner()
+    s._fetch = fetch
+    published = []
+    s.listeners.append(published.append)
+    await s.sweep()
+    assert requested == [["000000", "000001"], ["000002", "000003"], ["000004"]]
+    assert published and published[-1]["covered"] == 5
+
+    # 값이 그대로면 재전송 없음
+    count = len(published)
+    await s.sweep()
+    assert len(published) == count
+
+    # 실시간 tick은 구독 중일 때만 해당 행 갱신 → 순위 변경 시 전송
+    s.on_tick(Tick("000004", 2000, 1000, 2000, 1000, 90000, 29.9, "090000"))
+    assert s.ticks == 0
+    s._refs = 1
+    s.on_tick(Tick("000004", 2000, 1000, 2000, 1000, 90000, 29.9, "090000"))
+    # 다음 순환 조회를 기다리지 않고 flush 주기에 전송, 변경이 없으면 flush해도 재전송 없음
+    s.flush()
+    assert published[-1]["gainers"][0]["code"] == "000004"
+    assert published[-1]["gainers"][0]["changeRate"] == 29.9
+    count = len(published)
+    s.flush()
+    assert len(published) == count
+
+    # 순환 조회는 최근 체결이 있는 종목(000004)을 제외
+    requested.clear()
+    await s.sweep()
+    assert requested == [["000000", "000001"], ["000002", "000003"]]
+
+
+def test_master_swap_rebuilds_columns_and_keeps_values(master):
+    s = MarketScanner()
+    s._ensure_columns()
+    s.apply([_row("000003", 5000, 1.0)])
+    master["stocks"] = [{"code": "000003", "name": "종목3"}, {"code": "000009", "name": "신규"}]
+    master["version"] = 2
+    s._ensure_columns()
+    assert s._codes == ["000003", "000009"]
+    assert s._price.tolist() == [5000, 0]
+    assert s.rebuilds == 2
@@ -0,0 +1,84 @@
+import gzip
+import json
+import pytest
+from app.services import stock_master
+from app.services.stock_search import StockSearchIndex, to_chosung
+
+def test_snapshot_roundtrip_swaps_master(tmp_path):
+    path = str(tmp_path / "stock_master.json")
+    stocks = [{"code": "005930", "name": "삼성전자"}, {"code": "000660", "name": "SK하이닉스"}]
+    stock_master._write_snapshot(path, stocks)
+
+    assert stock_master.load_stock_master_snapshot(path) is True
+    assert stock_master.get_stock_master() == stocks
+    status = stock_master.get_master_status()
+    assert status["source"] == "snapshot"
+    assert status["count"] == 2
+
+def test_missing_snapshot_is_not_fatal(tmp_path):
+    assert stock_master.load_stock_master_snapshot(str(tmp_path / "missing.json")) is False
+
+def test_search_ranks_exact_and_prefix_first():
+    stock_master._swap_master([
+        {"code": "000001", "name": "우리삼성전자"},
+        {"code": "005935", "name": "삼성전자우"},
+        {"code": "005930", "name": "삼성전자"},
+        {"code": "000660", "name": "SK하이닉스"},
+    ], "api")
+
+    names = [s["name"] for s in stock_master.search_stocks("삼성전자")]
+    assert names == ["삼성전자", "삼성전자우", "우리삼성전자"]
+    assert stock_master.search_stocks("00593")[0]["code"] == "005930"
+    assert [s["code"] for s in stock_master.search_stocks("5930")] == ["005930"]
+    assert stock_master.search_stocks("sk")[0]["name"] == "SK하이닉스"
+
+def test_search_matches_chosung():
+    stock_master._swap_master([
+        {"code": "005930", "name": "삼성전자"},
+        {"code": "000270", "name": "기아"},
+    ], "api")
+
+    assert [s["code"] for s in stock_master.search_stocks("ㅅㅅㅈㅈ")] == ["005930"]
+    assert [s["code"] for s in stock_master.search_stocks("ㅈㅈ")] == ["005930"]
+    assert stock_master.search_stocks("ㄱㅇ")[0]["name"] == "기아"
+
+def test_lazy_infix_matches_full_scan_in_rank_order():
+    stocks = [{"code": f"{i:06d}", "name": ("삼성" if i % 3 else "현대") + ("전자" if i % 5 else "레버리지")}
+              for i in range(3000)]
+    index = StockSearchIndex(stocks)
+    for q in ("123", "99", "성전", "ㅅㅅㅈㅈ", "레버리지", "ㅎㄷㄹ"):
+        matched = [s for s in sorted(stocks, key=lambda s: len(s["name"]))
+                   if q in s["code"] or q in s["name"] or q in to_chosung(s["name"])]
+        # 접두 일치가 먼저 오므로 집합으로 비교, limit 미만이면 전체 일치
+        hits = index.search(q, limit=10)
+        assert len(hits) == min(10, len(matched))
+        assert all(h in matched for h in hits)
+        assert len(index.search(q, limit=10000)) == len(matched) > 0
+
+def test_names_payload_is_built_once_per_version():
+    stock_master._swap_master([{"code": "005930", "name": "삼성전자"}], "api")
+    first = stock_master.get_names_payload()
+    assert stock_master.get_names_payload() is first
+    assert json.loads(first.body) == {"005930": "삼성전자"}
+    assert gzip.decompress(first.gzip_body) == first.body
+
+    stock_master._swap_master([{"code": "000660", "name": "SK하이닉스"}], "api")
+    second = stock_master.get_names_payload()
+    assert second.version == first.version + 1
+    assert second.etag != first.etag and second.digest != first.digest
+
+    # 공개 버전(digest)은 내용 해시 → 같은 내용으로 다시 교체(재시작/다른 worker)해도 동일
+    stock_master._swap_master([{"code": "005930", "name": "삼성전자"}], "snapshot")
+    third = stock_master.get_names_payload()
+    assert third.version != first.version
+    assert third.digest == first.digest and third.etag == first.etag
+
+@pytest.mark.asyncio
+async def test_remote_master_swaps_only_on_change():
+    stocks = [{"code": "005930", "name": "삼성전자"}, {"code": "000270", "name": "기아"}]
+    assert await stock_master.apply_remote_master(stocks, "api") is True
+    assert stock_master.search_stocks("기아")[0]["code"] == "000270"
+    version = stock_master.get_master_status()["version"]
+    # 같은 내용을 다시 받으면 인덱스 재생성 없음
+    assert await stock_master.apply_remote_master(list(stocks), "api") is False
+    assert stock_master.get_master_status()["version"] == version
@@ -16,3 +16,24 @@ async def test_multiplexer_start_stop():
         
         assert m.is_running is False
         assert mock_broadcast.called
+
+@pytest.mark.asyncio
+async def test_conflated_mode_coalesces_ticks_per_symbol():
+    with patch("app.services.streamer.ws_manager.broadcast_to_symbol", new_callable=AsyncMock) as mock_send:
+        m = DataMultiplexer(mode="conflated", flush_hz=10)
+        base = {"symbol": "005930", "open": 73000, "change_rate": 0.5, "timestamp": "090000"}
+        await m.handle_kiwoom_tick({**base, "price": 73500, "high": 75000, "low": 72800, "volume": 100})
+        await m.handle_kiwoom_tick({**base, "price": 73600, "high": 74000, "low": 72500, "volume": 150})
+
+        # flush 전에는 전송되지 않음
+        mock_send.assert_not_called()
+        await m.flush()
+
+        mock_send.assert_called_once()
+        symbol, msg = mock_send.call_args[0]
+        assert symbol == "005930"
+        assert msg["data"]["price"] == 73600
+        assert msg["data"]["high"] == 75000   # 구간 고가 유지
+        assert msg["data"]["low"] == 72500
+        assert msg["data"]["volume"] == 150
+        assert m.get_stats()["conflation"]["coalesced"] == 1
@@ -0,0 +1,29 @@
+import pytest
+from app.services.tick_decoder import Tick, decode_float, decode_numeric, decode_price
+
+def test_decode_values_keep_sign_without_regex():
+    assert decode_float("-0.81") == -0.81
+    assert decode_float("+1.25") == 1.25
+    assert decode_float("1,234.5") == 1234.5
+    assert decode_float("") == 0.0
+    assert decode_float(None) == 0.0
+    assert decode_price("-73400") == 73400
+    assert decode_price("+000660") == 660
+    assert decode_price("abc") == 0
+
+def test_decode_numeric_tick():
+    tick = decode_numeric("005930_AL", {
+        "10": "-73400", "12": "-0.81", "13": "12345678",
+        "16": "+74000", "17": "+75000", "18": "-72800", "20": "090001",
+    })
+    assert isinstance(tick, Tick)
+    assert tick.to_dict() == {
+        "symbol": "005930", "price": 73400, "open": 74000, "high": 75000, "low": 72800,
+        "volume": 12345678, "change_rate": -0.81, "timestamp": "090001",
+    }
+
+def test_decode_numeric_defaults_and_missing_price():
+    assert decode_numeric("005930", {"10": "0"}) is None
+    tick = decode_numeric("005930", {"10": "+73400"})
+    assert (tick.open, tick.high, tick.low) == (73400, 73400, 73400)
+    assert len(tick.timestamp) == 6
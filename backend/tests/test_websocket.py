@@ -2,6 +2,7 @@ import pytest
 from fastapi.testclient import TestClient
 from main import app
 import json
+import asyncio
 
 def test_websocket_connection():
     client = TestClient(app)
@@ -28,5 +29,152 @@ async def test_broadcast_logic():
     
     test_msg = {"type": "tick", "data": "test"}
     await manager.broadcast(test_msg)
+    await asyncio.sleep(0.01)  # writer task가 송신 큐를 비울 때까지 대기
     
-    mock_ws.send_json.assert_called_with(test_msg)
+    # 1회 직렬화된 텍스트 프레임으로 전송
+    mock_ws.send_text.assert_called_with(json.dumps(test_msg, separators=(",", ":")))
+
+@pytest.mark.asyncio
+async def test_broadcast_to_symbol_routes_only_to_subscribers():
+    from app.api.websocket import ConnectionManager
+    from unittest.mock import AsyncMock
+
+    manager = ConnectionManager()
+    ws_a, ws_b = AsyncMock(), AsyncMock()
+    await manager.connect(ws_a)
+    await manager.connect(ws_b)
+    manager.subscribe(ws_a, "005930")
+    manager.subscribe(ws_b, "000660")
+
+    test_msg = {"type": "tick", "data": {"symbol": "005930"}}
+    await manager.broadcast_to_symbol("005930", test_msg)
+    await asyncio.sleep(0.01)
+
+    ws_a.send_text.assert_called_once()
+    assert json.loads(ws_a.send_text.call_args[0][0]) == test_msg
+    ws_b.send_text.assert_not_called()
+
+    # 연결 종료 시 인덱스 정리
+    manager.disconnect(ws_a)
+    assert "005930" not in manager.symbol_clients
+    assert ws_a not in manager.client_symbols
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_block_others():
+    from app.api.websocket import ConnectionManager, OVERFLOW_CONFLATE
+    from unittest.mock import AsyncMock
+
+    manager = ConnectionManager(max_queue=4, overflow_policy=OVERFLOW_CONFLATE)
+    stalled = asyncio.Event()
+    slow_ws, fast_ws = AsyncMock(), AsyncMock()
+
+    async def _stall(frame):
+        await stalled.wait()
+
+    slow_ws.send_text.side_effect = _stall
+    await manager.connect(slow_ws)
+    await manager.connect(fast_ws)
+    for ws in (slow_ws, fast_ws):
+        manager.subscribe(ws, "005930")
+
+    for price in range(100):
+        await manager.broadcast_to_symbol("005930", {"type": "tick", "data": {"price": price}})
+        await asyncio.sleep(0)
+
+    # 빠른 클라이언트는 느린 클라이언트와 무관하게 최신 tick까지 수신
+    last = json.loads(fast_ws.send_text.call_args[0][0])
+    assert last["data"]["price"] == 99
+
+    # 느린 클라이언트 큐는 종목별 최신 값으로 conflate되어 bounded
+    slow_stats = manager.sessions[slow_ws].get_stats()
+    assert slow_stats["depth"] <= 1
+    assert slow_stats["conflated"] > 0
+    stalled.set()
+
+@pytest.mark.asyncio
+async def test_queue_full_of_non_droppable_frames_evicts_client():
+    from app.api.websocket import ConnectionManager, OVERFLOW_DROP_OLDEST
+    from unittest.mock import AsyncMock
+
+    manager = ConnectionManager(max_queue=4, overflow_policy=OVERFLOW_DROP_OLDEST)
+    stalled = asyncio.Event()
+    slow_ws = AsyncMock()
+
+    async def _stall(frame):
+        await stalled.wait()
+
+    slow_ws.send_text.side_effect = _stall
+    await manager.connect(slow_ws)
+    session = manager.sessions[slow_ws]
+
+    # 전송이 멈춘 클라이언트 큐를 차트 스냅샷(non-droppable)으로 가득 채움
+    for i in range(6):
+        await manager.send_chart({"type": "chart", "symbol": "005930", "data": [i]}, slow_ws)
+        await asyncio.sleep(0)
+        if slow_ws not in manager.sessions:
+            break
+
+    # 폐기할 프레임이 없으면 큐를 늘리지 않고 disconnect 정책처럼 연결 종료
+    assert slow_ws not in manager.sessions
+    assert session.depth <= 4
+    await asyncio.sleep(0)
+    slow_ws.close.assert_awaited()
+    stalled.set()
+
+@pytest.mark.asyncio
+async def test_send_chart_uses_negotiated_format():
+    from app.api.websocket import ConnectionManager
+    from app.core.chart_codec import encode_binary
+    from unittest.mock import AsyncMock
+
+    manager = ConnectionManager()
+    legacy_ws, columnar_ws, binary_ws = AsyncMock(), AsyncMock(), AsyncMock()
+    for ws in (legacy_ws, columnar_ws, binary_ws):
+        await manager.connect(ws)
+    assert manager.set_chart_format(columnar_ws, "columnar") == "columnar"
+    assert manager.set_chart_format(binary_ws, "binary") == "binary"
+    assert manager.set_chart_format(legacy_ws, "xml") == "json"
+
+    bar = {"dt": "20260102", "open": 100.0, "high": 110.0, "low": 90.0, "close": 105.0, "volume": 1000.0}
+    message = {"type": "chart", "symbol": "005930", "timeframe": "D", "data": {"output": [bar]}}
+    for ws in (legacy_ws, columnar_ws, binary_ws):
+        await manager.send_chart(message, ws)
+    await asyncio.sleep(0.01)
+
+    assert json.loads(legacy_ws.send_text.call_args[0][0])["data"]["output"] == [bar]
+    columnar = json.loads(columnar_ws.send_text.call_args[0][0])
+    assert columnar["format"] == "columnar"
+    assert columnar["data"]["columns"]["close"] == [105]
+    binary_ws.send_bytes.assert_called_once_with(encode_binary(message))
+
+@pytest.mark.asyncio
+async def test_tick_delta_sends_only_changed_fields():
+    from app.api.websocket import ConnectionManager
+    from unittest.mock import AsyncMock
+
+    manager = ConnectionManager()
+    legacy_ws, delta_ws = AsyncMock(), AsyncMock()
+    for ws in (legacy_ws, delta_ws):
+        await manager.connect(ws)
+        manager.subscribe(ws, "005930")
+    assert manager.set_tick_delta(delta_ws, True) is True
+
+    base = {"symbol": "005930", "price": 73400, "open": 73000, "high": 75000, "low": 72800,
+            "volume": 100, "change_rate": -0.81, "timestamp": "090001"}
+    sent = []
+    delta_ws.send_text.side_effect = lambda frame: sent.append(json.loads(frame))
+    for tick in (base, {**base, "price": 73500, "volume": 120}, {**base, "price": 73500, "volume": 120}):
+        await manager.broadcast_to_symbol("005930", {"type": "tick", "data": tick})
+        await asyncio.sleep(0.01)
+
+    assert sent[0] == {"type": "tick", "data": base}
+    assert sent[1] == {"type": "tickDelta", "symbol": "005930", "data": {"price": 73500, "volume": 120}}
+    assert len(sent) == 2   # 변경 없는 tick은 전송 생략
+    assert legacy_ws.send_text.call_count == 3
+
+    # 재구독 시 전체 tick부터 다시 전송
+    manager.unsubscribe(delta_ws, "005930")
+    manager.subscribe(delta_ws, "005930")
+    await manager.broadcast_to_symbol("005930", {"type": "tick", "data": base})
+    await asyncio.sleep(0.01)
+    assert sent[-1]["type"] == "tick"
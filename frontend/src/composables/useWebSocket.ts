@@ -4,12 +4,109 @@ import { ref } from 'vue'
 export interface SymbolCallbacks {
   onChart?: (data: any) => void
   onTick?: (tick: any) => void
+  // 과거 차트 페이지 (requestHistory 응답, 페이지 도착 순서대로 수신)
+  onChartChunk?: (chunk: { timeframe: string, page: number, done: boolean, data: any }) => void
+}
+
+// 호가 10단계 스냅샷 (서버 flush 주기당 종목별 최신 1건, 1호가부터 [가격, 잔량])
+export interface DepthSnapshot {
+  asks: [number, number][]
+  bids: [number, number][]
+  totalAsk: number
+  totalBid: number
+  timestamp: string
+}
+
+// 서버 계산 지표: 단일 라인은 값 배열, 다중 라인(bb)은 { mid, upper, lower }
+export type IndicatorLine = (number | null)[]
+export interface IndicatorSnapshot {
+  dt: string[]
+  series: Record<string, IndicatorLine | Record<string, IndicatorLine>>
+}
+export interface IndicatorCallbacks {
+  onSnapshot: (data: IndicatorSnapshot) => void
+  onUpdate: (dt: string, values: Record<string, any>) => void
+}
+
+// 전 종목 순위 (서버 스캐너, 순위별 상위 N)
+export interface MoverEntry {
+  code: string
+  name: string
+  price: number
+  changeRate: number
+  volume: number
+  volumeRatio: number | null
+  gap: number | null
+}
+export interface MoversSnapshot {
+  gainers: MoverEntry[]
+  losers: MoverEntry[]
+  volumeSurge: MoverEntry[]
+  gap: MoverEntry[]
+  covered: number
+  total: number
+  updatedAt: number
+}
+
+// [Decision] 차트 스냅샷 wire 포맷: binary (typed array로 바로 디코딩, JSON 대비 크기/파싱 비용 수 배 감소)
+const CHART_FORMAT = 'binary'
+const BINARY_KIND_CHUNK = 2
+
+// 바이너리 차트 프레임 → { type, symbol, timeframe, page, done, data: { output } }
+// 레이아웃은 backend app/core/chart_codec.py encode_binary 참고
+const decodeBinaryChart = (buf: ArrayBuffer) => {
+  const view = new DataView(buf)
+  const kind = view.getUint8(0)
+  const done = (view.getUint8(1) & 1) === 1
+  const page = view.getUint16(2, true)
+  const n = view.getUint32(4, true)
+  const decoder = new TextDecoder()
+  let offset = 8
+  const symLen = view.getUint8(offset)
+  const symbol = decoder.decode(new Uint8Array(buf, offset + 1, symLen))
+  offset += 1 + symLen
+  const tfLen = view.getUint8(offset)
+  const timeframe = decoder.decode(new Uint8Array(buf, offset + 1, tfLen))
+  offset += 1 + tfLen
+  offset += (8 - (offset % 8)) % 8
+
+  const time = new Float64Array(buf, offset, n); offset += n * 8
+  const volume = new Float64Array(buf, offset, n); offset += n * 8
+  const open = new Int32Array(buf, offset, n); offset += n * 4
+  const high = new Int32Array(buf, offset, n); offset += n * 4
+  const low = new Int32Array(buf, offset, n); offset += n * 4
+  const close = new Int32Array(buf, offset, n)
+
+  const output = new Array(n)
+  for (let i = 0; i < n; i++) {
+    output[i] = { time: time[i], open: open[i], high: high[i], low: low[i], close: close[i], volume: volume[i] }
+  }
+  return { type: kind === BINARY_KIND_CHUNK ? 'chartChunk' : 'chart', symbol, timeframe, page, done, data: { output } }
+}
+
+// columnar JSON 차트 → 봉 배열 (hello 협상이 columnar일 때)
+const fromColumns = (data: any) => {
+  const c = data?.columns
+  if (!c) return data
+  const output = c.time.map((t: number, i: number) => ({
+    time: t, open: c.open[i], high: c.high[i], low: c.low[i], close: c.close[i], volume: c.volume[i]
+  }))
+  return { ...data, output }
 }
 
 const isConnected = ref(false)
+// [Decision] delta tick: 서버는 종목별 변경 필드만 전송 → 마지막 전체 상태에 병합해 onTick에 전달
+const lastTicks = new Map<string, any>()
 const listeners = new Map<string, SymbolCallbacks>()
 // 재연결 시 subscribeInfo 복원용
 const subscribeInfos = new Map<string, { timeframe: string }>()
+// [Decision] 호가는 opt-in: 콜백이 등록된 종목만 서버에 subscribeDepth (재연결 시 복원)
+const depthListeners = new Map<string, (depth: DepthSnapshot) => void>()
+// [Decision] 지표는 서버에서 (종목, 타임프레임)별로 계산 → 전체 시계열 1회 + 최신 값 갱신만 수신 (재연결 시 복원)
+const indicatorSubs = new Map<string, { symbol: string, timeframe: string, specs: string[], cbs: IndicatorCallbacks }>()
+const indicatorKey = (symbol: string, timeframe: string) => `${symbol}:${timeframe}`
+// 순위 콜백 (null이면 미구독, 재연결 시 복원)
+let moversListener: ((data: MoversSnapshot) => void) | null = null
 let socket: WebSocket | null = null
 let reconnectTimer: ReturnType<typeof setTimeout> | null = null
 
@@ -22,31 +119,77 @@ export function useWebSocket() {
     console.log('[WS] Connecting...')
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
     socket = new WebSocket(`${protocol}//${window.location.host}/ws/stocks`)
+    socket.binaryType = 'arraybuffer'
 
     socket.onopen = () => {
       isConnected.value = true
       console.log('[WS] Connected')
+      // 차트 포맷/delta tick 협상 (subscribe보다 먼저 전송 → 첫 스냅샷/tick부터 적용)
+      // 새 연결의 서버 세션은 기준 상태가 없으므로 첫 tick은 항상 전체 전송됨
+      lastTicks.clear()
+      sendMessage({ type: 'hello', chartFormat: CHART_FORMAT, tickDelta: true })
       // 재연결 시 기존 구독 종목을 서버에 다시 등록
       subscribeInfos.forEach((info, symbol) => {
         sendMessage({ type: 'subscribe', symbol, timeframe: info.timeframe })
       })
+      depthListeners.forEach((_, symbol) => {
+        sendMessage({ type: 'subscribeDepth', symbol })
+      })
+      indicatorSubs.forEach(({ symbol, timeframe, specs }) => {
+        sendMessage({ type: 'subscribeIndicators', symbol, timeframe, indicators: specs })
+      })
+      if (moversListener) sendMessage({ type: 'subscribeMovers' })
     }
 
     socket.onmessage = (event) => {
       try {
-        const message = JSON.parse(event.data)
+        const message = event.data instanceof ArrayBuffer ? decodeBinaryChart(event.data) : JSON.parse(event.data)
+        if (message.format === 'columnar') message.data = fromColumns(message.data)
 
         // [Decision] 서버에서 차트 스냅샷 수신 → onChart 콜백
         if (message.type === 'chart') {
           const cbs = listeners.get(message.symbol)
           if (cbs?.onChart) cbs.onChart(message.data)
         }
+        // [Decision] 과거 차트 페이지 수신 → onChartChunk 콜백 (점진적 보강)
+        else if (message.type === 'chartChunk') {
+          const cbs = listeners.get(message.symbol)
+          if (cbs?.onChartChunk) cbs.onChartChunk(message)
+        }
         // 실시간 tick 수신 → onTick 콜백
         else if (message.type === 'tick') {
           const tick = message.data
+          lastTicks.set(tick.symbol, tick)
           const cbs = listeners.get(tick.symbol)
           if (cbs?.onTick) cbs.onTick(tick)
         }
+        // 변경 필드만 담긴 tick → 마지막 상태에 병합 (기준 상태가 없으면 다음 전체 tick까지 무시)
+        else if (message.type === 'tickDelta') {
+          const prev = lastTicks.get(message.symbol)
+          if (!prev) return
+          const tick = { ...prev, ...message.data }
+          lastTicks.set(message.symbol, tick)
+          const cbs = listeners.get(message.symbol)
+          if (cbs?.onTick) cbs.onTick(tick)
+        }
+        // 호가 스냅샷 수신 → 호가 콜백
+        else if (message.type === 'depth') {
+          const cb = depthListeners.get(message.symbol)
+          if (cb) cb(message.data)
+        }
+        // 지표 전체 시계열 / 최신 값 수신
+        else if (message.type === 'indicators') {
+          const sub = indicatorSubs.get(indicatorKey(message.symbol, message.timeframe))
+          if (sub) sub.cbs.onSnapshot(message.data)
+        }
+        else if (message.type === 'indicator') {
+          const sub = indicatorSubs.get(indicatorKey(message.symbol, message.timeframe))
+          if (sub) sub.cbs.onUpdate(message.dt, message.values)
+        }
+        // 전 종목 순위 수신 (순위가 바뀔 때만 전송됨)
+        else if (message.type === 'movers') {
+          if (moversListener) moversListener(message.data)
+        }
       } catch (e) {
         console.error('[WS] Message Parse Error:', e)
       }
@@ -99,16 +242,68 @@ export function useWebSocket() {
     sendMessage({ type: 'requestChart', symbol, timeframe })
   }
 
+  /**
+   * 과거 차트 요청: before(가진 가장 오래된 봉의 time) 이전 구간을 서버가 chartChunk로 순차 전송 (최대 maxBars)
+   */
+  const requestHistory = (symbol: string, timeframe: string, before: number, maxBars: number) => {
+    sendMessage({ type: 'requestHistory', symbol, timeframe, before, maxBars })
+  }
+
   const unsubscribe = (symbol: string) => {
     listeners.delete(symbol)
     subscribeInfos.delete(symbol)
+    lastTicks.delete(symbol)
+    // 서버도 종목 해제 시 해당 종목 지표 구독을 함께 해제
+    indicatorSubs.forEach((sub, key) => { if (sub.symbol === symbol) indicatorSubs.delete(key) })
     sendMessage({ type: 'unsubscribe', symbol })
   }
 
+  const subscribeDepth = (symbol: string, onDepth: (depth: DepthSnapshot) => void) => {
+    const isNew = !depthListeners.has(symbol)
+    depthListeners.set(symbol, onDepth)
+    // 미연결 상태면 onopen에서 depthListeners 전체 전송
+    if (isNew) sendMessage({ type: 'subscribeDepth', symbol })
+  }
+
+  const unsubscribeDepth = (symbol: string) => {
+    if (depthListeners.delete(symbol)) sendMessage({ type: 'unsubscribeDepth', symbol })
+  }
+
+  // subscribe 이후 호출 (서버는 구독 중인 종목의 지표만 허용). 같은 (종목, 타임프레임)을 다시 호출하면 지표 목록 교체
+  const subscribeIndicators = (symbol: string, timeframe: string, specs: string[], cbs: IndicatorCallbacks) => {
+    indicatorSubs.set(indicatorKey(symbol, timeframe), { symbol, timeframe, specs, cbs })
+    sendMessage({ type: 'subscribeIndicators', symbol, timeframe, indicators: specs })
+  }
+
+  const unsubscribeIndicators = (symbol: string, timeframe: string) => {
+    if (indicatorSubs.delete(indicatorKey(symbol, timeframe))) {
+      sendMessage({ type: 'unsubscribeIndicators', symbol, timeframe })
+    }
+  }
+
+  const subscribeMovers = (onMovers: (data: MoversSnapshot) => void) => {
+    const isNew = moversListener === null
+    moversListener = onMovers
+    if (isNew) sendMessage({ type: 'subscribeMovers' })
+  }
+
+  const unsubscribeMovers = () => {
+    if (moversListener === null) return
+    moversListener = null
+    sendMessage({ type: 'unsubscribeMovers' })
+  }
+
   return {
     isConnected,
     subscribe,
     unsubscribe,
-    requestChart
+    subscribeDepth,
+    unsubscribeDepth,
+    subscribeIndicators,
+    unsubscribeIndicators,
+    subscribeMovers,
+    unsubscribeMovers,
+    requestChart,
+    requestHistory
   }
 }